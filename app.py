@@ -1,10 +1,17 @@
+from datetime import datetime
 from html import escape
 
 from game.streamlit_compat import st
 
-from game.data import init_story_nodes
-from game.logic import validate_story_nodes
-from game.state import ensure_session_state, normalize_meta_state, start_game
+from game.content.campaign import use_campaign
+from game.content.registry import DEFAULT_CAMPAIGN_ID, campaign_ids
+from game.content.reload import content_reload_error, reload_content_if_changed
+from game.data import get_story_content_hash, get_story_validation_warnings, init_story_nodes
+from game.logic import apply_morality_flags, validate_story_nodes
+from game.saves.autosave import AUTOSAVE_DECISION_KEY, discard_autosaves
+from game.saves.replay import restore_autosave
+from game.snapshot_schema import prepare_snapshot
+from game.state import ensure_session_state, normalize_meta_state, session_campaign, start_game
 from game.ui import render_node, render_side_panel
 from game.ui_components.sprites import class_icon_svg
 
@@ -496,6 +503,11 @@ def _render_class_selection() -> None:
         unsafe_allow_html=True,
     )
 
+    campaign_id = DEFAULT_CAMPAIGN_ID
+    available_campaigns = campaign_ids()
+    if len(available_campaigns) > 1:
+        campaign_id = st.selectbox("Campaign", available_campaigns, key="selected_campaign")
+
     meta_state = normalize_meta_state(st.session_state.get("meta_state"))
     unlocked = meta_state.get("unlocked_items", [])
     if unlocked:
@@ -613,13 +625,29 @@ def _render_class_selection() -> None:
                 type="primary",
                 key=f"class_{class_name}",
             ):
-                start_game(class_name)
+                start_game(class_name, campaign_id)
                 st.rerun()
 
 
+def _apply_content_reload() -> None:
+    reloaded = reload_content_if_changed()
+    if reloaded is not None:
+        report, seconds = reloaded
+        st.toast(
+            f"Story reloaded: {len(report.recompiled)} node(s) recompiled, "
+            f"{report.revalidated} revalidated in {seconds * 1000:.0f} ms."
+        )
+    error = content_reload_error()
+    if error:
+        st.error(f"Story reload failed, still running the previous version: {error}")
+
+
 def _render_validation_warnings() -> None:
-    if "story_validation_warnings" not in st.session_state:
-        st.session_state.story_validation_warnings = validate_story_nodes()
+    # Keyed by content so a hot reload refreshes the warnings of every session.
+    content_hash = get_story_content_hash()
+    if st.session_state.get("story_validation_hash") != content_hash:
+        st.session_state.story_validation_warnings = list(get_story_validation_warnings())
+        st.session_state.story_validation_hash = content_hash
 
     warnings = st.session_state.story_validation_warnings
     if not warnings:
@@ -634,12 +662,49 @@ def _render_validation_warnings() -> None:
             st.write(f"- {warning}")
 
 
+def _render_autosave_offer() -> None:
+    offer = st.session_state.get("autosave_offer")
+    if not offer:
+        return
+    snapshot, _ = prepare_snapshot(offer["snapshot"])
+    if snapshot is None:
+        st.session_state.autosave_offer = None
+        return
+
+    saved_at = datetime.fromtimestamp(offer["saved_at"]).strftime("%Y-%m-%d %H:%M")
+    with st.container(border=True):
+        st.info(
+            f"An autosaved {snapshot['player_class']} run from {saved_at} "
+            f"({len(snapshot['decision_history']) + bool(snapshot.get(AUTOSAVE_DECISION_KEY))} decisions) is available."
+        )
+        col_restore, col_discard = st.columns(2)
+        with col_restore:
+            if st.button("Restore autosave", type="primary", key="autosave_restore", use_container_width=True):
+                restore_autosave(snapshot)
+                apply_morality_flags(st.session_state.flags)
+                st.session_state.autosave_offer = None
+                st.rerun()
+        with col_discard:
+            if st.button("Start fresh", key="autosave_discard", use_container_width=True):
+                discard_autosaves()
+                st.session_state.autosave_offer = None
+                st.rerun()
+
+
 def main() -> None:
     st.set_page_config(page_title="Oakrest: Deterministic Adventure", page_icon="shield", layout="wide")
     inject_game_theme()
-    init_story_nodes()
+    _apply_content_reload()
     ensure_session_state()
+    # Every story lookup in this run resolves through the session's campaign.
+    with use_campaign(session_campaign()):
+        _render_app()
+
+
+def _render_app() -> None:
+    init_story_nodes()
     _render_validation_warnings()
+    _render_autosave_offer()
 
     if st.session_state.player_class is None:
         render_game_header()
@@ -7,7 +7,18 @@ from game.content.constants import (
     STAT_KEYS,
     TRAIT_KEYS,
 )
-from game.content.story import STORY_NODES, get_choice_simplification_report, init_story_nodes
+from game.content.story import (
+    STORY_NODES,
+    get_choice_simplification_report,
+    get_node_hashes,
+    get_reverse_index,
+    get_story_content_hash,
+    get_story_graph,
+    get_story_indexes,
+    get_story_merkle_root,
+    get_story_validation_warnings,
+    init_story_nodes,
+)
 
 __all__ = [
     "CLASS_TEMPLATES",
@@ -19,5 +30,12 @@ __all__ = [
     "STORY_NODES",
     "TRAIT_KEYS",
     "get_choice_simplification_report",
+    "get_node_hashes",
+    "get_reverse_index",
+    "get_story_content_hash",
+    "get_story_graph",
+    "get_story_indexes",
+    "get_story_merkle_root",
+    "get_story_validation_warnings",
     "init_story_nodes",
 ]
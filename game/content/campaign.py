@@ -0,0 +1,677 @@
+"""Campaigns: story content split into independently loaded acts.
+
+A campaign is an ordered list of act sources plus an index from node id to
+act. Acts can be Python modules (the built-in story) or data files (JSON or
+TOML) listed in a ``campaign.json`` manifest. Nodes are served through the
+index, and an act is only imported or parsed - and simplified - the first
+time one of its nodes is requested, so memory and load time follow the acts
+sessions actually reach rather than the size of the campaign.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import importlib
+import importlib.util
+import itertools
+import json
+import os
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Mapping, Optional, Sequence
+
+from game.content.compiler import (
+    ActBundle,
+    StoryBundle,
+    _bundle_cache_enabled,
+    compiler_hash,
+    default_bundle_dir,
+    file_digest,
+    load_bundle,
+    module_source_path,
+    prune_superseded,
+    simplifier_hash,
+    write_bundle,
+)
+from game.content.frozen import Interner, StoryNode, deep_size, freeze_story_nodes
+from game.content.graph import StoryGraph, build_story_graph
+from game.content.image import MappedActNodes, StoryImage, open_story_image, story_image_path, write_story_image
+from game.content.merkle import NodeHashes, hash_story_nodes, merkle_root
+from game.content.reverse_index import ReverseIndex, build_reverse_index
+from game.content.story_utils import simplify_story_nodes
+from game.content.strings import (
+    StringTableBuilder,
+    extract_narrative,
+    memory_string_table,
+    open_string_table,
+    register_string_table,
+    unregister_string_table,
+    string_table,
+    write_string_table,
+)
+
+DATA_FILE_SUFFIXES = (".json", ".toml")
+
+
+@dataclass(frozen=True, slots=True)
+class ActSource:
+    """Where one act's raw nodes come from."""
+
+    name: str
+    path: Path
+    module: Optional[str] = None
+    attribute: Optional[str] = None
+
+    @classmethod
+    def from_module(cls, name: str, module: str, attribute: str) -> "ActSource":
+        path = module_source_path(module)
+        if path is None:
+            raise FileNotFoundError(f"Cannot locate source for story module '{module}'.")
+        return cls(name, path, module, attribute)
+
+    def source_hash(self) -> str:
+        return file_digest(self.path)
+
+    def read_nodes(self, *, reload: bool = False) -> Dict[str, Dict[str, Any]]:
+        """Import or parse the act's raw nodes; ``reload`` re-imports a module act."""
+        if self.module is not None:
+            module = importlib.import_module(self.module)
+            if reload:
+                # Bytecode is validated by whole-second mtime and size; drop it so quick edits are never missed.
+                Path(importlib.util.cache_from_source(str(self.path))).unlink(missing_ok=True)
+                module = importlib.reload(module)
+            return getattr(module, self.attribute)
+        suffix = self.path.suffix.lower()
+        if suffix == ".json":
+            return json.loads(self.path.read_text(encoding="utf-8"))
+        if suffix == ".toml":
+            import tomllib
+
+            return tomllib.loads(self.path.read_text(encoding="utf-8"))
+        raise ValueError(f"Unsupported act file type '{self.path.suffix}' for act '{self.name}'.")
+
+
+@dataclass(frozen=True, slots=True)
+class ActChange:
+    """Freshly read raw nodes of an edited act and which of them differ from before."""
+
+    nodes: Dict[str, Dict[str, Any]]
+    changed: frozenset[str]
+
+
+@dataclass(slots=True)
+class ReloadReport:
+    """What an incremental reload recompiled and revalidated."""
+
+    acts: tuple[str, ...]
+    recompiled: tuple[str, ...]
+    removed: tuple[str, ...]
+    revalidated: int
+    graph_rechecked: bool
+
+
+# Distinguishes string tables built by successive reloads of the same act.
+_RELOAD_GENERATION = itertools.count(1)
+
+
+class Campaign:
+    """A story made of lazily loaded acts."""
+
+    def __init__(
+        self,
+        name: str,
+        acts: Sequence[ActSource],
+        *,
+        node_index: Optional[Dict[str, str]] = None,
+        bundle_dir: Optional[Path] = None,
+        use_bundles: bool = True,
+    ) -> None:
+        self.name = name
+        self.acts = tuple(acts)
+        self._acts_by_name = {act.name: act for act in self.acts}
+        self.bundle_dir = bundle_dir
+        self.use_bundles = use_bundles
+        self._lock = threading.RLock()
+        self._node_index = dict(node_index) if node_index is not None else None
+        self._loaded: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        self._act_reports: Dict[str, tuple[str, ...]] = {}
+        self._act_hashes: Dict[str, Dict[str, NodeHashes]] = {}
+        self._all_nodes: Optional[Dict[str, Dict[str, Any]]] = None
+        self._source_hash: Optional[str] = None
+        self._content_hash: Optional[str] = None
+        self._summary: Optional[StoryBundle] = None
+        self._summary_checked = False
+        self._validation_warnings: Optional[tuple[str, ...]] = None
+        self._node_warnings: Optional[Dict[str, tuple[str, ...]]] = None
+        self._cycle_warnings: tuple[str, ...] = ()
+        self._validation_context: Any = None
+        self._indexes: Optional[Dict[str, tuple[str, ...]]] = None
+        self._graph: Optional[StoryGraph] = None
+        self._reverse_index: Optional[ReverseIndex] = None
+        self._footprints: Dict[str, int] = {}
+        self._string_keys: Dict[str, str] = {}
+        # node id -> in-memory string table of the reload that last compiled it.
+        self._reload_tables: Dict[str, str] = {}
+        self._image: Optional[StoryImage] = None
+        # Equal content fragments across the campaign's acts share one instance.
+        self._interner = Interner()
+
+    # -- hashing --------------------------------------------------------------
+
+    def source_hash(self) -> str:
+        """Digest of every act source plus the code that compiles them."""
+        if self._source_hash is None:
+            digest = hashlib.sha256(compiler_hash().encode("utf-8"))
+            for act in self.acts:
+                digest.update(f"{act.name}:{act.source_hash()}".encode("utf-8"))
+            self._source_hash = digest.hexdigest()
+        return self._source_hash
+
+    def content_hash(self) -> str:
+        """Digest of what determines the playable nodes; saves record it."""
+        summary = self._load_summary()
+        if summary is not None:
+            return summary.content_hash
+        if self._content_hash is None:
+            digest = hashlib.sha256(simplifier_hash().encode("utf-8"))
+            for act in self.acts:
+                digest.update(f"{act.name}:{act.source_hash()}".encode("utf-8"))
+            self._content_hash = digest.hexdigest()
+        return self._content_hash
+
+    # -- node access ----------------------------------------------------------
+
+    def node_index(self) -> Dict[str, str]:
+        """Return the node id -> act name index, loading acts only if no index exists."""
+        if self._node_index is None:
+            with self._lock:
+                if self._node_index is None:
+                    summary = self._load_summary()
+                    if summary is not None:
+                        self._node_index = summary.node_index
+                    else:
+                        index: Dict[str, str] = {}
+                        for act in self.acts:
+                            for node_id in self._act_nodes(act.name):
+                                index[node_id] = act.name
+                        self._node_index = index
+        return self._node_index
+
+    def get_node(self, node_id: str) -> Optional[Dict[str, Any]]:
+        act_name = self.node_index().get(node_id)
+        if act_name is None:
+            return None
+        return self._act_nodes(act_name).get(node_id)
+
+    def all_nodes(self) -> Dict[str, Dict[str, Any]]:
+        """Return every node, loading all acts. Prefer `get_node` on hot paths."""
+        if self._all_nodes is None:
+            with self._lock:
+                if self._all_nodes is None:
+                    self._all_nodes = {node_id: self.get_node(node_id) for node_id in self.node_index()}
+        return self._all_nodes
+
+    def loaded_acts(self) -> tuple[str, ...]:
+        """Names of the acts currently held in memory."""
+        return tuple(self._loaded)
+
+    def memory_footprint(self) -> int:
+        """Approximate bytes held by the compiled nodes of the loaded acts."""
+        mapped = 0
+        for act_name, nodes in list(self._loaded.items()):
+            if isinstance(nodes, MappedActNodes):
+                # Only decoded nodes are private to this process, and more are decoded over time.
+                mapped += nodes.decoded_size()
+            elif act_name not in self._footprints:
+                self._footprints[act_name] = deep_size(nodes)
+        return mapped + sum(self._footprints.values())
+
+    def _act_nodes(self, act_name: str) -> Dict[str, Dict[str, Any]]:
+        nodes = self._loaded.get(act_name)
+        if nodes is not None:
+            return nodes
+        self._load_summary()
+        with self._lock:
+            nodes = self._loaded.get(act_name)
+            if nodes is None and self._image is not None:
+                nodes = self._image.act_nodes(act_name)
+                self._act_reports[act_name] = self._image.act_report(act_name)
+                self._act_hashes[act_name] = self._image.act_hashes(act_name)
+                self._loaded[act_name] = nodes
+            elif nodes is None:
+                nodes, report, hashes = self._compile_act(self._acts_by_name[act_name])
+                self._act_reports[act_name] = report
+                self._act_hashes[act_name] = hashes
+                self._loaded[act_name] = nodes
+        return nodes
+
+    def _compile_act(self, act: ActSource) -> tuple[Dict[str, StoryNode], tuple[str, ...], Dict[str, NodeHashes]]:
+        act_hash = hashlib.sha256(f"{compiler_hash()}:{act.source_hash()}".encode("utf-8")).hexdigest()
+        strings_key = f"{act.name}-{act_hash[:16]}"
+        self._string_keys[act.name] = strings_key
+        bundle_dir = self.bundle_dir or default_bundle_dir()
+        if self.use_bundles:
+            bundle = load_bundle(f"act-{act.name}", act_hash, self.bundle_dir)
+            table = open_string_table(strings_key, bundle_dir) if isinstance(bundle, ActBundle) else None
+            if table is not None:
+                register_string_table(table)
+                return bundle.nodes, bundle.report, bundle.hashes
+        nodes, report = simplify_story_nodes(act.read_nodes())
+        # Prose moves to the act's string table; nodes keep TextRef handles.
+        strings = StringTableBuilder(strings_key)
+        extract_narrative(nodes, strings)
+        frozen = freeze_story_nodes(nodes, self._interner)
+        table = None
+        if self.use_bundles:
+            written = write_string_table(strings, bundle_dir)
+            if written is not None:
+                prune_superseded(written, f"strings-{act.name}", ".bin", 16)
+                table = open_string_table(strings_key, bundle_dir)
+        register_string_table(table or memory_string_table(strings))
+        compiled = (frozen, tuple(report), hash_story_nodes(frozen))
+        if table is not None:
+            write_bundle(f"act-{act.name}", ActBundle(act_hash, *compiled), self.bundle_dir)
+        return compiled
+
+    # -- content hashes -------------------------------------------------------
+
+    def node_hashes(self, node_id: str) -> Optional[NodeHashes]:
+        """Return the Merkle hashes of a node and its choices and requirements."""
+        act_name = self.node_index().get(node_id)
+        if act_name is None:
+            return None
+        self._act_nodes(act_name)
+        return self._act_hashes[act_name].get(node_id)
+
+    def act_root(self, act_name: str) -> str:
+        """Merkle root over an act's node hashes, in node order."""
+        summary = self._load_summary()
+        if summary is not None and act_name in summary.act_roots:
+            return summary.act_roots[act_name]
+        self._act_nodes(act_name)
+        index = self.node_index()
+        return merkle_root(
+            "act",
+            ((node_id, hashes.node) for node_id, hashes in self._act_hashes[act_name].items() if index.get(node_id) == act_name),
+        )
+
+    def merkle_root(self) -> str:
+        """Merkle root over every act; changes whenever any compiled node does."""
+        return merkle_root("campaign", ((act.name, self.act_root(act.name)) for act in self.acts))
+
+    # -- whole-campaign results -----------------------------------------------
+
+    def _image_path(self) -> Path:
+        return story_image_path(self.name, self.source_hash(), self.bundle_dir or default_bundle_dir())
+
+    def _load_summary(self) -> Optional[StoryBundle]:
+        if not self._summary_checked:
+            with self._lock:
+                if not self._summary_checked:
+                    if self.use_bundles:
+                        image = open_story_image(self._image_path())
+                        if image is not None and image.summary.source_hash == self.source_hash():
+                            # Acts, graph and prose are then served from the shared mapping.
+                            image.register_string_tables()
+                            self._image = image
+                            self._summary = image.summary
+                            self._graph = image.graph()
+                        else:
+                            bundle = load_bundle(f"story-{self.name}", self.source_hash(), self.bundle_dir)
+                            self._summary = bundle if isinstance(bundle, StoryBundle) else None
+                    self._summary_checked = True
+        return self._summary
+
+    def report(self) -> tuple[str, ...]:
+        """Return the simplification report for every node in the campaign."""
+        summary = self._load_summary()
+        if summary is not None:
+            return summary.report
+        index = self.node_index()
+        lines: List[str] = []
+        for act in self.acts:
+            self._act_nodes(act.name)
+            # Skip nodes a later act overrides; their lines describe unused content.
+            lines.extend(
+                line for line in self._act_reports[act.name] if index.get(line.split(":", 1)[0]) == act.name
+            )
+        return tuple(lines)
+
+    def validation_warnings(self) -> tuple[str, ...]:
+        """Return validation warnings for the whole campaign (loads every act once)."""
+        summary = self._load_summary()
+        if summary is not None:
+            return summary.validation_warnings
+        if self._validation_warnings is None:
+            self._validate()
+            self._write_summary()
+        return self._validation_warnings
+
+    def _validate(
+        self,
+        previous: Optional["Campaign"] = None,
+        recheck: frozenset[str] = frozenset(),
+        *,
+        recheck_graph: bool = True,
+    ) -> int:
+        """Validate node by node, reusing ``previous`` results outside ``recheck``.
+
+        Every node is rechecked when the story-wide facts (known flags,
+        obtainable items, stat caps) differ from ``previous``. Returns the
+        number of nodes validated.
+        """
+        # Deferred import: validation reads STORY_NODES, which resolves to this campaign here.
+        from game.validation import cycle_warnings, validate_node, validation_context
+
+        with use_campaign(self):
+            context = validation_context()
+            reusable: Dict[str, tuple[str, ...]] = {}
+            if previous is not None and previous._validation_context == context:
+                reusable = previous._node_warnings or {}
+            node_warnings: Dict[str, tuple[str, ...]] = {}
+            validated = 0
+            for node_id, node in self.all_nodes().items():
+                if node_id in reusable and node_id not in recheck:
+                    node_warnings[node_id] = reusable[node_id]
+                else:
+                    node_warnings[node_id] = tuple(validate_node(node_id, node, context))
+                    validated += 1
+            if recheck_graph or previous is None:
+                self._cycle_warnings = tuple(cycle_warnings(self.graph()))
+            else:
+                self._cycle_warnings = previous._cycle_warnings
+        self._node_warnings = node_warnings
+        self._validation_context = context
+        self._validation_warnings = tuple(
+            warning for warnings in node_warnings.values() for warning in warnings
+        ) + self._cycle_warnings
+        self._indexes = self._derive_indexes(context.known_flags, context.obtainable_items)
+        return validated
+
+    def indexes(self) -> Dict[str, tuple[str, ...]]:
+        """Return lookup sets derived from the story (known flags, obtainable items, endings)."""
+        summary = self._load_summary()
+        if summary is not None:
+            return summary.indexes
+        if self._indexes is None:
+            from game.validation import _collect_story_metadata
+
+            with use_campaign(self):
+                known_flags, obtainable_items = _collect_story_metadata()
+            self._indexes = self._derive_indexes(known_flags, obtainable_items)
+        return self._indexes
+
+    def _derive_indexes(self, known_flags: Iterable[str], obtainable_items: Iterable[str]) -> Dict[str, tuple[str, ...]]:
+        return {
+            "known_flags": tuple(sorted(known_flags)),
+            "obtainable_items": tuple(sorted(obtainable_items)),
+            "ending_nodes": tuple(sorted(node_id for node_id in self.node_index() if node_id.startswith("ending_"))),
+        }
+
+    def graph(self) -> StoryGraph:
+        """Return the integer-indexed adjacency of the whole campaign."""
+        summary = self._load_summary()
+        if summary is not None and summary.graph is not None:
+            return summary.graph
+        if self._graph is None:
+            with self._lock:
+                if self._graph is None:
+                    self._graph = build_story_graph(self.all_nodes())
+        return self._graph
+
+    def reverse_index(self) -> ReverseIndex:
+        """Return who sets, reads, grants, removes or requires what, and incoming edges per node."""
+        summary = self._load_summary()
+        if summary is not None and summary.reverse_index is not None:
+            return summary.reverse_index
+        if self._reverse_index is None:
+            with self._lock:
+                if self._reverse_index is None and self._image is not None:
+                    self._reverse_index = self._image.reverse_index()
+                elif self._reverse_index is None:
+                    self._reverse_index = build_reverse_index(self.all_nodes(), self.graph())
+        return self._reverse_index
+
+    def _write_summary(self) -> None:
+        if not self.use_bundles or self._summary is not None:
+            return
+        summary = StoryBundle(
+            source_hash=self.source_hash(),
+            node_index=self.node_index(),
+            report=self.report(),
+            content_hash=self.content_hash(),
+            validation_warnings=self.validation_warnings(),
+            indexes=self.indexes(),
+            graph=self.graph(),
+            act_roots={act.name: self.act_root(act.name) for act in self.acts},
+            reverse_index=self.reverse_index(),
+        )
+        write_bundle(f"story-{self.name}", summary, self.bundle_dir)
+        tables = [string_table(self._string_keys.get(act.name, "")) for act in self.acts]
+        if all(table is not None for table in tables):
+            image_path = write_story_image(
+                self._image_path(),
+                summary,
+                {act.name: self._act_nodes(act.name) for act in self.acts},
+                self._act_reports,
+                self._act_hashes,
+                tables,
+            )
+            if image_path is not None:
+                prune_superseded(image_path, f"image-{self.name}", ".bin", 32)
+
+    # -- incremental reload ---------------------------------------------------
+
+    def reloaded(self, changes: Mapping[str, ActChange]) -> tuple["Campaign", ReloadReport]:
+        """Return a copy with edited acts swapped in, redoing only the work they affect.
+
+        Only changed or added nodes are re-simplified. They are revalidated
+        together with the nodes that link to added or removed ones; the cycle
+        pass reruns only if some node's links changed. Everything else
+        (compiled nodes, string tables, warnings) is shared with this campaign.
+        The copy gets its own interner, seeded with the nodes it keeps, so
+        fragments only superseded nodes used are freed along with this one;
+        call `release_superseded` once the copy has replaced this campaign.
+        """
+        previous_nodes = self.all_nodes()
+        previous_graph = self.graph()
+        if self._node_warnings is None:
+            self._validate()
+
+        fresh = Campaign(self.name, self.acts, bundle_dir=self.bundle_dir, use_bundles=self.use_bundles)
+        # Bundles describe whole acts; a partially recompiled campaign never reads or writes them.
+        fresh._summary_checked = True
+        fresh._loaded = dict(self._loaded)
+        fresh._act_reports = dict(self._act_reports)
+        fresh._act_hashes = dict(self._act_hashes)
+        fresh._reload_tables = dict(self._reload_tables)
+        for act_name, nodes in self._loaded.items():
+            # Mapped acts are interned by their image; edited acts are seeded below.
+            if act_name not in changes and not isinstance(nodes, MappedActNodes):
+                for node in nodes.values():
+                    fresh._interner(node)
+        recompiled: List[str] = []
+        removed: List[str] = []
+        for act_name, change in changes.items():
+            old_nodes = self._act_nodes(act_name)
+            dirty = {
+                node_id: node
+                for node_id, node in change.nodes.items()
+                if node_id in change.changed or node_id not in old_nodes
+            }
+            for node_id in change.nodes:
+                if node_id in old_nodes and node_id not in dirty:
+                    fresh._interner(old_nodes[node_id])
+            simplified, report = simplify_story_nodes(dirty)
+            strings = StringTableBuilder(f"{act_name}-reload{next(_RELOAD_GENERATION)}")
+            extract_narrative(simplified, strings)
+            register_string_table(memory_string_table(strings))
+            compiled = freeze_story_nodes(simplified, fresh._interner)
+            for node_id in old_nodes.keys() - change.nodes.keys():
+                fresh._reload_tables.pop(node_id, None)
+            fresh._reload_tables.update(dict.fromkeys(compiled, strings.key))
+            fresh._loaded[act_name] = {
+                node_id: compiled[node_id] if node_id in compiled else old_nodes[node_id] for node_id in change.nodes
+            }
+            new_hashes = hash_story_nodes(compiled)
+            old_hashes = self._act_hashes[act_name]
+            fresh._act_hashes[act_name] = {
+                node_id: new_hashes[node_id] if node_id in compiled else old_hashes[node_id] for node_id in change.nodes
+            }
+            old_lines: Dict[str, List[str]] = {}
+            for line in self._act_reports.get(act_name, ()):
+                old_lines.setdefault(line.split(":", 1)[0], []).append(line)
+            new_lines: Dict[str, List[str]] = {}
+            for line in report:
+                new_lines.setdefault(line.split(":", 1)[0], []).append(line)
+            fresh._act_reports[act_name] = tuple(
+                line
+                for node_id in change.nodes
+                for line in (new_lines if node_id in compiled else old_lines).get(node_id, ())
+            )
+            recompiled.extend(compiled)
+            removed.extend(node_id for node_id in old_nodes if node_id not in change.nodes)
+
+        index: Dict[str, str] = {}
+        for act in self.acts:
+            for node_id in fresh._act_nodes(act.name):
+                index[node_id] = act.name
+        fresh._node_index = index
+        graph = fresh.graph()
+
+        # Nodes linking to an added id (new graph) or a removed one (old graph) may gain or lose warnings.
+        recheck = set(recompiled)
+        added = [node_id for node_id in recompiled if node_id not in previous_nodes]
+        for node_id in added:
+            recheck.update(graph.ids(graph.predecessors(graph.index[node_id])))
+        for node_id in removed:
+            recheck.update(previous_graph.ids(previous_graph.predecessors(previous_graph.index[node_id])))
+        graph_changed = bool(added or removed) or any(
+            previous_graph.ids(previous_graph.successors(previous_graph.index[node_id]))
+            != graph.ids(graph.successors(graph.index[node_id]))
+            or _is_terminal(previous_nodes[node_id]) != _is_terminal(fresh.get_node(node_id))
+            for node_id in recompiled
+            if node_id in previous_nodes
+        )
+        revalidated = fresh._validate(self, frozenset(recheck), recheck_graph=graph_changed)
+        report = ReloadReport(
+            acts=tuple(changes),
+            recompiled=tuple(recompiled),
+            removed=tuple(removed),
+            revalidated=revalidated,
+            graph_rechecked=graph_changed,
+        )
+        return fresh, report
+
+    def release_superseded(self, previous: "Campaign") -> None:
+        """Unregister string tables of ``previous``'s reloads that none of this campaign's nodes use."""
+        for key in set(previous._reload_tables.values()) - set(self._reload_tables.values()):
+            unregister_string_table(key)
+
+
+def _is_terminal(node: Mapping[str, Any]) -> bool:
+    return not node.get("choices") and not node.get("auto_choices")
+
+
+# ---------------------------------------------------------------------------
+# Campaign sources
+# ---------------------------------------------------------------------------
+
+
+_BUILTIN_ACTS = (
+    ("intro", "game.content.story_nodes_intro", "STORY_NODES_INTRO"),
+    ("act1", "game.content.story_nodes_act1", "STORY_NODES_ACT1"),
+    ("act2", "game.content.story_nodes_act2", "STORY_NODES_ACT2"),
+    ("act3", "game.content.story_nodes_act3", "STORY_NODES_ACT3"),
+)
+
+
+def builtin_campaign(**options: Any) -> Campaign:
+    """Return the campaign shipped as Python modules in this package."""
+    acts = [ActSource.from_module(name, module, attribute) for name, module, attribute in _BUILTIN_ACTS]
+    return Campaign("builtin", acts, **options)
+
+
+def load_campaign_manifest(manifest_path: Path, **options: Any) -> Campaign:
+    """Load a data-file campaign from its ``campaign.json`` manifest.
+
+    The manifest lists acts in order as ``{"name": ..., "file": ...}`` (paths
+    relative to the manifest) and may include an ``index`` mapping node ids to
+    act names; with an index, startup never has to parse an act.
+    """
+    manifest_path = Path(manifest_path)
+    manifest = json.loads(manifest_path.read_text(encoding="utf-8"))
+    acts = []
+    for entry in manifest["acts"]:
+        path = manifest_path.parent / entry["file"]
+        if path.suffix.lower() not in DATA_FILE_SUFFIXES:
+            raise ValueError(f"Act '{entry['name']}' must be one of {', '.join(DATA_FILE_SUFFIXES)} files.")
+        acts.append(ActSource(entry["name"], path))
+    name = manifest.get("name") or manifest_path.parent.name
+    return Campaign(name, acts, node_index=manifest.get("index"), **options)
+
+
+def export_campaign(campaign: Campaign, directory: Path) -> Path:
+    """Write a campaign's raw acts as JSON files plus an indexed manifest."""
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    index: Dict[str, str] = {}
+    entries = []
+    for act in campaign.acts:
+        nodes = act.read_nodes()
+        file_name = f"{act.name}.json"
+        (directory / file_name).write_text(json.dumps(nodes, indent=2, ensure_ascii=False), encoding="utf-8")
+        entries.append({"name": act.name, "file": file_name})
+        for node_id in nodes:
+            index[node_id] = act.name
+    manifest_path = directory / "campaign.json"
+    manifest = {"name": campaign.name, "acts": entries, "index": index}
+    manifest_path.write_text(json.dumps(manifest, indent=2), encoding="utf-8")
+    return manifest_path
+
+
+# ---------------------------------------------------------------------------
+# Active campaign
+# ---------------------------------------------------------------------------
+
+
+_DEFAULT_CAMPAIGN: Optional[Campaign] = None
+_DEFAULT_CAMPAIGN_LOCK = threading.Lock()
+_CURRENT_CAMPAIGN: ContextVar[Optional[Campaign]] = ContextVar("current_campaign", default=None)
+
+
+def default_campaign() -> Campaign:
+    """Return the process-wide campaign: ``CHOICE_GAME_CAMPAIGN`` if set, else the built-in story."""
+    global _DEFAULT_CAMPAIGN
+    if _DEFAULT_CAMPAIGN is None:
+        with _DEFAULT_CAMPAIGN_LOCK:
+            if _DEFAULT_CAMPAIGN is None:
+                options = {"use_bundles": _bundle_cache_enabled()}
+                manifest = os.environ.get("CHOICE_GAME_CAMPAIGN")
+                _DEFAULT_CAMPAIGN = load_campaign_manifest(Path(manifest), **options) if manifest else builtin_campaign(**options)
+    return _DEFAULT_CAMPAIGN
+
+
+def set_default_campaign(campaign: Campaign) -> None:
+    """Replace the process-wide campaign; sessions see it on their next lookup."""
+    global _DEFAULT_CAMPAIGN
+    with _DEFAULT_CAMPAIGN_LOCK:
+        _DEFAULT_CAMPAIGN = campaign
+
+
+def current_campaign() -> Campaign:
+    """Return the campaign `STORY_NODES` resolves to in this context."""
+    return _CURRENT_CAMPAIGN.get() or default_campaign()
+
+
+@contextmanager
+def use_campaign(campaign: Campaign) -> Iterator[Campaign]:
+    """Resolve `STORY_NODES` to ``campaign`` within the block (this thread only)."""
+    token = _CURRENT_CAMPAIGN.set(campaign)
+    try:
+        yield campaign
+    finally:
+        _CURRENT_CAMPAIGN.reset(token)
@@ -0,0 +1,184 @@
+"""Content-addressed compiled story bundles.
+
+Building the playable story means importing or parsing act sources, deep-copying
+and simplifying their nodes, and validating the whole graph. None of that
+changes unless the source files do, so the results are pickled into bundles
+named after a hash of those sources:
+
+- one ``act-*`` bundle per act with its simplified nodes, so an act can be
+  served without importing or parsing its source, next to the act's
+  ``strings-*`` narrative table (see `game.content.strings`);
+- one ``story-*`` summary per campaign with the node-to-act index, the
+  simplification report, validation results, derived indexes and Merkle act
+  roots, so a start with unchanged content needs none of the acts until a
+  session reaches them.
+
+Once a campaign is fully compiled it is also written as a story image (see
+`game.content.image`) that worker processes map instead of unpickling.
+
+Writing any of these files removes the ones compiled from older sources for
+the same act or campaign, so the cache holds one generation per name.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import importlib.util
+import os
+import pickle
+import re
+from dataclasses import dataclass, field
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, Optional, Union
+
+from game.content.frozen import StoryNode
+from game.content.graph import StoryGraph
+from game.content.merkle import NodeHashes
+from game.content.reverse_index import ReverseIndex
+from game.paths import user_cache_dir
+
+# Bump when the bundle layout or anything derived into it changes shape.
+BUNDLE_FORMAT_VERSION = 8
+
+# Code that shapes compiled output. Changing any of it invalidates every bundle.
+_COMPILER_MODULES = (
+    "game.content.story_utils",
+    "game.content.constants",
+    "game.content.classes",
+    "game.validation",
+    "game.content.campaign",
+    "game.content.compiler",
+    "game.content.frozen",
+    "game.content.graph",
+    "game.content.strings",
+    "game.content.merkle",
+    "game.content.reverse_index",
+    "game.content.image",
+)
+
+# Code that shapes the simplified nodes themselves, and therefore saves.
+_SIMPLIFIER_MODULES = (
+    "game.content.story_utils",
+    "game.content.constants",
+)
+
+
+@dataclass(slots=True)
+class ActBundle:
+    """Simplified, frozen nodes of one act and their content hashes."""
+
+    source_hash: str
+    nodes: Dict[str, StoryNode]
+    report: tuple[str, ...]
+    hashes: Dict[str, NodeHashes] = field(default_factory=dict)
+
+
+@dataclass(slots=True)
+class StoryBundle:
+    """Whole-campaign results that don't need the nodes themselves."""
+
+    source_hash: str
+    node_index: Dict[str, str]
+    report: tuple[str, ...]
+    content_hash: str
+    validation_warnings: tuple[str, ...]
+    indexes: Dict[str, tuple[str, ...]] = field(default_factory=dict)
+    graph: Optional[StoryGraph] = None
+    act_roots: Dict[str, str] = field(default_factory=dict)
+    reverse_index: Optional[ReverseIndex] = None
+
+
+Bundle = Union[ActBundle, StoryBundle]
+
+
+def _bundle_cache_enabled() -> bool:
+    return "PYTEST_CURRENT_TEST" not in os.environ and not os.environ.get("CHOICE_GAME_NO_STORY_CACHE")
+
+
+def default_bundle_dir() -> Path:
+    """Return the directory compiled story bundles are written to."""
+    return user_cache_dir() / "story"
+
+
+def module_source_path(module_name: str) -> Optional[Path]:
+    """Locate a module's source file without importing it."""
+    spec = importlib.util.find_spec(module_name)
+    origin = spec.origin if spec is not None else None
+    return Path(origin) if origin and os.path.exists(origin) else None
+
+
+def file_digest(path: Path) -> str:
+    """Return the SHA-256 of a file's bytes."""
+    return hashlib.sha256(path.read_bytes()).hexdigest()
+
+
+def _modules_digest(module_names: tuple[str, ...]) -> str:
+    digest = hashlib.sha256(f"bundle-format:{BUNDLE_FORMAT_VERSION}".encode("utf-8"))
+    for module_name in module_names:
+        digest.update(module_name.encode("utf-8"))
+        path = module_source_path(module_name)
+        if path is not None:
+            digest.update(path.read_bytes())
+    return digest.hexdigest()
+
+
+@lru_cache(maxsize=1)
+def compiler_hash() -> str:
+    """Digest of the code that produces bundles."""
+    return _modules_digest(_COMPILER_MODULES)
+
+
+@lru_cache(maxsize=1)
+def simplifier_hash() -> str:
+    """Digest of the code that turns raw nodes into playable ones."""
+    return _modules_digest(_SIMPLIFIER_MODULES)
+
+
+def bundle_path(name: str, source_hash: str, directory: Optional[Path] = None) -> Path:
+    """Return the bundle file for ``name`` compiled from ``source_hash``."""
+    return (directory or default_bundle_dir()) / f"{name}-{source_hash[:32]}.pickle"
+
+
+def prune_superseded(path: Path, name: str, suffix: str, digest_length: int) -> None:
+    """Delete files next to ``path`` written for ``name`` from other source hashes."""
+    pattern = re.compile(rf"{re.escape(name)}-[0-9a-f]{{{digest_length}}}{re.escape(suffix)}")
+    try:
+        candidates = list(path.parent.iterdir())
+    except OSError:
+        return
+    for candidate in candidates:
+        if candidate.name != path.name and pattern.fullmatch(candidate.name):
+            try:
+                # Processes that still map an old file keep their mapping.
+                candidate.unlink()
+            except OSError:
+                pass
+
+
+def load_bundle(name: str, source_hash: str, directory: Optional[Path] = None) -> Optional[Bundle]:
+    """Load a bundle compiled from ``source_hash``, or None if absent or unusable."""
+    path = bundle_path(name, source_hash, directory)
+    try:
+        with path.open("rb") as handle:
+            bundle = pickle.load(handle)
+    except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ImportError, TypeError):
+        return None
+    if not isinstance(bundle, (ActBundle, StoryBundle)) or bundle.source_hash != source_hash:
+        return None
+    return bundle
+
+
+def write_bundle(name: str, bundle: Bundle, directory: Optional[Path] = None) -> Optional[Path]:
+    """Atomically write ``bundle``; returns its path, or None if the cache is unwritable."""
+    path = bundle_path(name, bundle.source_hash, directory)
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        with tmp.open("wb") as handle:
+            pickle.dump(bundle, handle, protocol=pickle.HIGHEST_PROTOCOL)
+        tmp.replace(path)
+    except OSError:
+        return None
+    prune_superseded(path, name, ".pickle", 32)
+    return path
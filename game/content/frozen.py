@@ -0,0 +1,253 @@
+"""Deeply immutable story graph objects.
+
+The simplified story is shared by every session and thread in the process, so
+it is compiled into read-only objects: nodes, choices and effects become
+slotted `Mapping` types and every list becomes a tuple. They keep the dict
+read API the engine and UI already use (``node["choices"]``,
+``choice.get("effects", {})``), so nothing needs a defensive copy, and any
+attempt to mutate the graph fails loudly instead of leaking into other
+sessions.
+
+Nodes with the same key set share one key layout, so each object stores only
+a tuple of values - noticeably smaller than a dict per node/choice/effect.
+Compiled campaigns also hash-cons their content through an `Interner`: equal
+requirement, effect, choice and list sub-structures become one shared
+instance, so equal fragments compare by identity and hash once.
+"""
+
+from __future__ import annotations
+
+import sys
+from collections.abc import Mapping
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+from game.content.strings import TextRef
+
+# Shared key layouts: key tuple -> {key: position}. Interned so that every
+# mapping with the same keys in the same order points at one layout.
+_LAYOUTS: Dict[Tuple[str, ...], Dict[str, int]] = {}
+
+
+def _layout_for(keys: Tuple[str, ...]) -> Dict[str, int]:
+    layout = _LAYOUTS.get(keys)
+    if layout is None:
+        layout = _LAYOUTS.setdefault(keys, {key: position for position, key in enumerate(keys)})
+    return layout
+
+
+class FrozenMap(Mapping):
+    """Immutable, hashable mapping with a shared key layout."""
+
+    __slots__ = ("_layout", "_values", "_hash")
+
+    def __init__(self, items: Mapping[str, Any] | None = None) -> None:
+        items = dict(items or {})
+        object.__setattr__(self, "_layout", _layout_for(tuple(items)))
+        object.__setattr__(self, "_values", tuple(items.values()))
+
+    @classmethod
+    def _from_layout(cls, keys: Tuple[str, ...], values: Tuple[Any, ...]) -> "FrozenMap":
+        instance = cls.__new__(cls)
+        object.__setattr__(instance, "_layout", _layout_for(keys))
+        object.__setattr__(instance, "_values", values)
+        return instance
+
+    def __getitem__(self, key: str) -> Any:
+        return self._values[self._layout[key]]
+
+    def get(self, key: str, default: Any = None) -> Any:
+        position = self._layout.get(key)
+        return default if position is None else self._values[position]
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._layout
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._layout)
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+    def __hash__(self) -> int:
+        try:
+            return self._hash
+        except AttributeError:
+            # Order-independent, to agree with Mapping equality.
+            value = hash(frozenset(zip(self._layout, self._values)))
+            object.__setattr__(self, "_hash", value)
+            return value
+
+    def __eq__(self, other: object) -> bool:
+        if other is self:
+            return True
+        if isinstance(other, FrozenMap) and self._layout is other._layout:
+            return self._values == other._values
+        return Mapping.__eq__(self, other)
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    def __delattr__(self, name: str) -> None:
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({dict(self.items())!r})"
+
+    def __reduce__(self):
+        return (type(self)._from_layout, (tuple(self._layout), self._values))
+
+    def __copy__(self) -> "FrozenMap":
+        return self
+
+    def __deepcopy__(self, memo: Dict[int, Any]) -> "FrozenMap":
+        return self
+
+
+class StoryEffects(FrozenMap):
+    """Effects of a choice or conditional variant."""
+
+    __slots__ = ()
+
+
+class StoryChoice(FrozenMap):
+    """One choice (or auto choice) of a node."""
+
+    __slots__ = ()
+
+    @property
+    def label(self) -> str:
+        return self.get("label", "")
+
+    @property
+    def next(self) -> Any:
+        return self.get("next")
+
+    @property
+    def effects(self) -> StoryEffects:
+        return self.get("effects", EMPTY_EFFECTS)
+
+
+class StoryNode(FrozenMap):
+    """One story node."""
+
+    __slots__ = ()
+
+    @property
+    def id(self) -> str:
+        return self["id"]
+
+    @property
+    def choices(self) -> Tuple[StoryChoice, ...]:
+        return self.get("choices", ())
+
+
+EMPTY_EFFECTS = StoryEffects()
+
+_CHOICE_LIST_KEYS = frozenset({"choices", "auto_choices"})
+
+
+def _freeze(value: Any, mapping_type: type = FrozenMap, *, item_type: type = FrozenMap) -> Any:
+    if isinstance(value, Mapping) and not isinstance(value, FrozenMap):
+        return mapping_type({key: _freeze_field(key, item) for key, item in value.items()})
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(item, item_type) for item in value)
+    return value
+
+
+def _freeze_field(key: str, value: Any) -> Any:
+    if key == "effects":
+        return _freeze(value, StoryEffects)
+    if key in _CHOICE_LIST_KEYS:
+        return _freeze(value, item_type=StoryChoice)
+    return _freeze(value)
+
+
+def freeze_story_nodes(
+    nodes: Mapping[str, Mapping[str, Any]],
+    interner: Optional["Interner"] = None,
+) -> Dict[str, StoryNode]:
+    """Compile simplified nodes into deeply immutable story objects, sharing equal parts through ``interner``."""
+    frozen = {node_id: _freeze(node, StoryNode) for node_id, node in nodes.items()}
+    if interner is not None:
+        frozen = {node_id: interner(node) for node_id, node in frozen.items()}
+    return frozen
+
+
+def _member_key(value: Any) -> Any:
+    # Members are interned before their container, so equal containers have identical members.
+    if isinstance(value, (FrozenMap, tuple)):
+        return id(value)
+    if isinstance(value, TextRef):
+        return (TextRef, value.table, value.index)
+    # The type keeps True, 1 and 1.0 apart.
+    return (type(value), value)
+
+
+class Interner:
+    """Hash-consing pool: equal frozen story values come back as one shared instance.
+
+    Values are interned bottom-up and keyed by their type, key layout and the
+    identity of their (already interned) members, so lookups never compare
+    or hash nested content. The pool keeps every interned value alive.
+    """
+
+    __slots__ = ("_pool", "shared")
+
+    def __init__(self) -> None:
+        self._pool: Dict[Tuple[Any, ...], Any] = {}
+        self.shared = 0
+
+    def __len__(self) -> int:
+        return len(self._pool)
+
+    def __call__(self, value: Any) -> Any:
+        if isinstance(value, FrozenMap):
+            members = tuple(self(item) for item in value._values)
+            if any(new is not old for new, old in zip(members, value._values)):
+                value = type(value)._from_layout(tuple(value._layout), members)
+            key = (type(value), id(value._layout), *map(_member_key, members))
+        elif isinstance(value, tuple):
+            members = tuple(self(item) for item in value)
+            if any(new is not old for new, old in zip(members, value)):
+                value = members
+            key = (tuple, *map(_member_key, members))
+        else:
+            return value
+        try:
+            canonical = self._pool.setdefault(key, value)
+        except TypeError:
+            return value
+        if canonical is not value:
+            self.shared += 1
+        return canonical
+
+
+def thaw(value: Any) -> Any:
+    """Return a plain, mutable dict/list copy of a frozen story value, with text resolved."""
+    if isinstance(value, TextRef):
+        return str(value)
+    if isinstance(value, Mapping):
+        return {key: thaw(item) for key, item in value.items()}
+    if isinstance(value, tuple):
+        return [thaw(item) for item in value]
+    return value
+
+
+def deep_size(value: Any, seen: Optional[set[int]] = None) -> int:
+    """Bytes held by the containers reachable from ``value``, counting shared objects once.
+
+    Strings and numbers are skipped: they are shared with the sources and
+    string tables, so this measures what compiling a story adds.
+    """
+    if seen is None:
+        seen = set()
+    if id(value) in seen:
+        return 0
+    seen.add(id(value))
+    if isinstance(value, FrozenMap):
+        return sys.getsizeof(value) + deep_size(value._layout, seen) + deep_size(value._values, seen)
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(deep_size(item, seen) for item in value.values())
+    if isinstance(value, (list, tuple)):
+        return sys.getsizeof(value) + sum(deep_size(item, seen) for item in value)
+    return 0
@@ -0,0 +1,195 @@
+"""Integer-indexed adjacency for the story graph.
+
+Nodes are numbered densely in story order and edges are stored in CSR form:
+the edges leaving node ``i`` are ``targets[offsets[i]:offsets[i + 1]]``, and
+``edge_choices`` holds, for each edge, the position of the choice it comes
+from in the node's ``choices`` followed by its ``auto_choices``. A choice
+contributes one edge for its ``next`` and one for each conditional ``next``.
+The reverse adjacency is stored the same way, with ``reverse_edges`` pointing
+back at the forward edge. Graph passes over these flat arrays run in linear
+time and never hash node ids.
+"""
+
+from __future__ import annotations
+
+from array import array
+from collections.abc import Iterable, Mapping
+from dataclasses import dataclass
+from typing import Any, Dict, List, Tuple
+
+
+_CHOICE_KEYS = ("choices", "auto_choices")
+
+
+@dataclass(frozen=True, slots=True)
+class StoryGraph:
+    """CSR adjacency of a compiled story."""
+
+    node_ids: Tuple[str, ...]
+    index: Dict[str, int]
+    offsets: array
+    targets: array
+    edge_choices: array
+    reverse_offsets: array
+    reverse_sources: array
+    reverse_edges: array
+
+    @property
+    def node_count(self) -> int:
+        return len(self.node_ids)
+
+    @property
+    def edge_count(self) -> int:
+        return len(self.targets)
+
+    def successors(self, node: int) -> array:
+        return self.targets[self.offsets[node]:self.offsets[node + 1]]
+
+    def predecessors(self, node: int) -> array:
+        return self.reverse_sources[self.reverse_offsets[node]:self.reverse_offsets[node + 1]]
+
+    def ids(self, nodes: Iterable[int]) -> List[str]:
+        """Map node numbers back to node ids."""
+        return [self.node_ids[node] for node in nodes]
+
+
+def build_story_graph(nodes: Mapping[str, Mapping[str, Any]]) -> StoryGraph:
+    """Number ``nodes`` and build forward and reverse CSR adjacency.
+
+    Edges to ids that are not in ``nodes`` are dropped; validation reports them.
+    """
+    node_ids = tuple(nodes)
+    index = {node_id: position for position, node_id in enumerate(node_ids)}
+    lookup = index.get
+    offsets = [0]
+    targets: List[int] = []
+    edge_choices: List[int] = []
+    add_target, add_choice = targets.append, edge_choices.append
+    for node in nodes.values():
+        choice_index = 0
+        for key in _CHOICE_KEYS:
+            for choice in node.get(key, ()):
+                target = lookup(choice.get("next"))
+                if target is not None:
+                    add_target(target)
+                    add_choice(choice_index)
+                for variant in choice.get("conditional_effects", ()):
+                    target = lookup(variant.get("next"))
+                    if target is not None:
+                        add_target(target)
+                        add_choice(choice_index)
+                choice_index += 1
+        offsets.append(len(targets))
+
+    # Counting sort of the edges by target gives the reverse adjacency.
+    count = len(node_ids)
+    reverse_offsets = [0] * (count + 1)
+    for target in targets:
+        reverse_offsets[target + 1] += 1
+    for node in range(count):
+        reverse_offsets[node + 1] += reverse_offsets[node]
+    cursor = reverse_offsets[:-1]
+    reverse_sources = [0] * len(targets)
+    reverse_edges = [0] * len(targets)
+    for source in range(count):
+        for edge in range(offsets[source], offsets[source + 1]):
+            target = targets[edge]
+            slot = cursor[target]
+            reverse_sources[slot] = source
+            reverse_edges[slot] = edge
+            cursor[target] = slot + 1
+
+    return StoryGraph(
+        node_ids,
+        index,
+        array("l", offsets),
+        array("l", targets),
+        array("l", edge_choices),
+        array("l", reverse_offsets),
+        array("l", reverse_sources),
+        array("l", reverse_edges),
+    )
+
+
+def strongly_connected_components(graph: StoryGraph) -> List[List[int]]:
+    """Tarjan's algorithm over the CSR arrays, iterative, in O(nodes + edges)."""
+    count = graph.node_count
+    offsets, targets = graph.offsets, graph.targets
+    order = [-1] * count
+    lowlink = [0] * count
+    next_edge = [0] * count
+    on_stack = bytearray(count)
+    stack: List[int] = []
+    components: List[List[int]] = []
+    counter = 0
+
+    for root in range(count):
+        if order[root] != -1:
+            continue
+        order[root] = lowlink[root] = counter
+        counter += 1
+        stack.append(root)
+        on_stack[root] = 1
+        next_edge[root] = offsets[root]
+        call_stack = [root]
+        while call_stack:
+            node = call_stack[-1]
+            edge, end = next_edge[node], offsets[node + 1]
+            while edge < end:
+                target = targets[edge]
+                edge += 1
+                if order[target] == -1:
+                    next_edge[node] = edge
+                    order[target] = lowlink[target] = counter
+                    counter += 1
+                    stack.append(target)
+                    on_stack[target] = 1
+                    next_edge[target] = offsets[target]
+                    call_stack.append(target)
+                    break
+                if on_stack[target] and order[target] < lowlink[node]:
+                    lowlink[node] = order[target]
+            else:
+                call_stack.pop()
+                if lowlink[node] == order[node]:
+                    component: List[int] = []
+                    while True:
+                        member = stack.pop()
+                        on_stack[member] = 0
+                        component.append(member)
+                        if member == node:
+                            break
+                    components.append(component)
+                if call_stack:
+                    parent = call_stack[-1]
+                    if lowlink[node] < lowlink[parent]:
+                        lowlink[parent] = lowlink[node]
+    return components
+
+
+def reachable(graph: StoryGraph, sources: Iterable[int], *, reverse: bool = False) -> bytearray:
+    """Breadth-first search from ``sources``; returns a per-node visited mask.
+
+    With ``reverse=True`` edges are followed backwards, giving every node that
+    can reach one of the sources.
+    """
+    if reverse:
+        offsets, targets = graph.reverse_offsets, graph.reverse_sources
+    else:
+        offsets, targets = graph.offsets, graph.targets
+    seen = bytearray(graph.node_count)
+    frontier = []
+    for source in sources:
+        if not seen[source]:
+            seen[source] = 1
+            frontier.append(source)
+    while frontier:
+        next_frontier = []
+        for node in frontier:
+            for edge in range(offsets[node], offsets[node + 1]):
+                target = targets[edge]
+                if not seen[target]:
+                    seen[target] = 1
+                    next_frontier.append(target)
+        frontier = next_frontier
+    return seen
@@ -0,0 +1,266 @@
+"""Compiled story images shared by every worker process.
+
+Bundles are pickles, so each process that loads one gets a private copy of
+everything in it. Once a campaign is fully compiled and validated it is also
+written as one story image, which workers memory-map read-only instead::
+
+    b"CGSI" | section count: u32 | (offset: u64, length: u64) x count | sections
+
+Section 0 is a small pickle with the whole-campaign results (`StoryBundle`
+without graph or reverse index), node hashes, simplification reports and the
+layout of the other sections:
+
+- every compiled node pickled on its own, behind an offset table, so a worker
+  decodes only the nodes its sessions reach, one at a time;
+- the CSR arrays of the story graph, used in place through typed memoryviews;
+- the reverse index, unpickled only if a tool asks for it;
+- every act's string table, registered straight from the mapping.
+
+Mapped pages live in the OS page cache and are shared by all processes that
+open the same image, so the content a worker holds privately is limited to
+the nodes it has decoded.
+"""
+
+from __future__ import annotations
+
+import mmap
+import os
+import pickle
+import struct
+import threading
+from collections.abc import Mapping
+from dataclasses import dataclass, replace
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from game.content.compiler import StoryBundle
+from game.content.frozen import Interner, StoryNode, deep_size
+from game.content.graph import StoryGraph
+from game.content.merkle import NodeHashes
+from game.content.reverse_index import ReverseIndex
+from game.content.strings import StringTable, register_string_table
+
+_MAGIC = b"CGSI"
+_HEADER = struct.Struct("<4sI")
+_SECTION = struct.Struct("<QQ")
+_OFFSET = struct.Struct("<Q")
+_NODE_SPAN = struct.Struct("<QQ")
+# Sections start on this boundary so typed views over them are aligned.
+_ALIGNMENT = 8
+
+_GRAPH_ARRAYS = ("offsets", "targets", "edge_choices", "reverse_offsets", "reverse_sources", "reverse_edges")
+
+
+@dataclass(slots=True)
+class _ImageLayout:
+    """Contents of section 0."""
+
+    summary: StoryBundle
+    acts: Dict[str, Tuple[str, ...]]
+    reports: Dict[str, Tuple[str, ...]]
+    hashes: Dict[str, Dict[str, NodeHashes]]
+    nodes_section: int
+    graph_node_ids: Tuple[str, ...]
+    graph_sections: Dict[str, Tuple[int, str]]
+    reverse_index_section: int
+    string_sections: Dict[str, int]
+
+
+def story_image_path(name: str, source_hash: str, directory: Path) -> Path:
+    return Path(directory) / f"image-{name}-{source_hash[:32]}.bin"
+
+
+# ---------------------------------------------------------------------------
+# Writing
+# ---------------------------------------------------------------------------
+
+
+class _SectionWriter:
+    def __init__(self) -> None:
+        self.sections: List[bytes] = []
+
+    def add(self, data: bytes) -> int:
+        self.sections.append(data)
+        return len(self.sections)
+
+    def encode(self, layout: bytes) -> bytes:
+        sections = [layout, *self.sections]
+        position = _HEADER.size + len(sections) * _SECTION.size
+        table, chunks = [], []
+        for data in sections:
+            padding = -position % _ALIGNMENT
+            chunks.append(b"\0" * padding)
+            position += padding
+            table.append(_SECTION.pack(position, len(data)))
+            chunks.append(data)
+            position += len(data)
+        return _HEADER.pack(_MAGIC, len(sections)) + b"".join(table) + b"".join(chunks)
+
+
+def _encode_nodes(nodes: Sequence[StoryNode]) -> bytes:
+    blobs = [pickle.dumps(node, protocol=pickle.HIGHEST_PROTOCOL) for node in nodes]
+    offsets = [0]
+    for blob in blobs:
+        offsets.append(offsets[-1] + len(blob))
+    return struct.pack(f"<{len(offsets)}Q", *offsets) + b"".join(blobs)
+
+
+def write_story_image(
+    path: Path,
+    summary: StoryBundle,
+    acts: Mapping[str, Mapping[str, StoryNode]],
+    reports: Mapping[str, Tuple[str, ...]],
+    hashes: Mapping[str, Mapping[str, NodeHashes]],
+    string_tables: Sequence[StringTable],
+) -> Optional[Path]:
+    """Atomically write a story image; returns its path, or None if it could not be written."""
+    try:
+        writer = _SectionWriter()
+        nodes_section = writer.add(_encode_nodes([node for nodes in acts.values() for node in nodes.values()]))
+        graph = summary.graph
+        graph_sections = {
+            name: (writer.add(getattr(graph, name).tobytes()), getattr(graph, name).typecode) for name in _GRAPH_ARRAYS
+        }
+        reverse_index_section = writer.add(pickle.dumps(summary.reverse_index, protocol=pickle.HIGHEST_PROTOCOL))
+        string_sections = {table.key: writer.add(bytes(table.buffer)) for table in string_tables}
+        layout = _ImageLayout(
+            summary=replace(summary, graph=None, reverse_index=None),
+            acts={name: tuple(nodes) for name, nodes in acts.items()},
+            reports=dict(reports),
+            hashes={name: dict(act_hashes) for name, act_hashes in hashes.items()},
+            nodes_section=nodes_section,
+            graph_node_ids=graph.node_ids,
+            graph_sections=graph_sections,
+            reverse_index_section=reverse_index_section,
+            string_sections=string_sections,
+        )
+        encoded = writer.encode(pickle.dumps(layout, protocol=pickle.HIGHEST_PROTOCOL))
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        tmp.write_bytes(encoded)
+        tmp.replace(path)
+    except (OSError, pickle.PicklingError, TypeError, AttributeError):
+        return None
+    return path
+
+
+# ---------------------------------------------------------------------------
+# Reading
+# ---------------------------------------------------------------------------
+
+
+class MappedActNodes(Mapping):
+    """One act's nodes, each decoded from the image the first time it is read."""
+
+    def __init__(self, image: "StoryImage", node_ids: Tuple[str, ...], first: int) -> None:
+        self._image = image
+        self._positions = {node_id: first + offset for offset, node_id in enumerate(node_ids)}
+        self._decoded: Dict[str, StoryNode] = {}
+        # Sized as nodes are decoded, so reading the footprint never walks the act.
+        self._decoded_size = 0
+        self._sized: set[int] = set()
+        self._size_lock = threading.Lock()
+
+    def __getitem__(self, node_id: str) -> StoryNode:
+        node = self._decoded.get(node_id)
+        if node is None:
+            decoded = self._image._decode_node(self._positions[node_id])
+            with self._size_lock:
+                # Decoding twice under a race is harmless; only the kept object is sized.
+                node = self._decoded.setdefault(node_id, decoded)
+                if node is decoded:
+                    self._decoded_size += deep_size(node, self._sized)
+        return node
+
+    def get(self, node_id: str, default: Any = None) -> Any:
+        return self[node_id] if node_id in self._positions else default
+
+    def __contains__(self, node_id: object) -> bool:
+        return node_id in self._positions
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._positions)
+
+    def __len__(self) -> int:
+        return len(self._positions)
+
+    def decoded(self) -> Dict[str, StoryNode]:
+        """The nodes decoded so far; the only part of the act held outside the mapping."""
+        return self._decoded
+
+    def decoded_size(self) -> int:
+        """`deep_size` of the decoded nodes, kept up to date as they are decoded."""
+        return self._decoded_size
+
+
+class StoryImage:
+    """Read-only view over a mapped story image."""
+
+    def __init__(self, buffer: mmap.mmap) -> None:
+        magic, count = _HEADER.unpack_from(buffer, 0)
+        if magic != _MAGIC:
+            raise ValueError("Story image has an invalid header.")
+        self._buffer = buffer
+        self._view = memoryview(buffer)
+        self._sections = [_SECTION.unpack_from(buffer, _HEADER.size + index * _SECTION.size) for index in range(count)]
+        self._layout: _ImageLayout = pickle.loads(self._section(0))
+        if not isinstance(self._layout, _ImageLayout):
+            raise ValueError("Story image has an invalid layout.")
+        self._act_offsets: Dict[str, int] = {}
+        first = 0
+        for name, node_ids in self._layout.acts.items():
+            self._act_offsets[name] = first
+            first += len(node_ids)
+        self._node_data_start = (first + 1) * _OFFSET.size
+        # Nodes are pickled one by one; interning on decode restores the sharing between them.
+        self._interner = Interner()
+
+    def _section(self, index: int) -> memoryview:
+        offset, length = self._sections[index]
+        return self._view[offset:offset + length]
+
+    def _decode_node(self, position: int) -> StoryNode:
+        nodes = self._section(self._layout.nodes_section)
+        start, end = _NODE_SPAN.unpack_from(nodes, position * _OFFSET.size)
+        return self._interner(pickle.loads(nodes[self._node_data_start + start:self._node_data_start + end]))
+
+    @property
+    def summary(self) -> StoryBundle:
+        return self._layout.summary
+
+    def act_nodes(self, act_name: str) -> MappedActNodes:
+        return MappedActNodes(self, self._layout.acts[act_name], self._act_offsets[act_name])
+
+    def act_report(self, act_name: str) -> Tuple[str, ...]:
+        return self._layout.reports[act_name]
+
+    def act_hashes(self, act_name: str) -> Dict[str, NodeHashes]:
+        return self._layout.hashes[act_name]
+
+    def graph(self) -> StoryGraph:
+        """The story graph, with its CSR arrays read in place from the mapping."""
+        node_ids = self._layout.graph_node_ids
+        arrays = {
+            name: self._section(section).cast(typecode)
+            for name, (section, typecode) in self._layout.graph_sections.items()
+        }
+        return StoryGraph(node_ids, {node_id: position for position, node_id in enumerate(node_ids)}, **arrays)
+
+    def reverse_index(self) -> ReverseIndex:
+        return pickle.loads(self._section(self._layout.reverse_index_section))
+
+    def register_string_tables(self) -> None:
+        """Serve the campaign's `TextRef` handles from the tables inside the image."""
+        for key, section in self._layout.string_sections.items():
+            register_string_table(StringTable(key, self._section(section)))
+
+
+def open_story_image(path: Path) -> Optional[StoryImage]:
+    """Map a story image written by `write_story_image`, or None if absent or unusable."""
+    try:
+        with Path(path).open("rb") as handle:
+            # The mapping stays valid after the file is closed.
+            buffer = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+        return StoryImage(buffer)
+    except (OSError, ValueError, struct.error, pickle.UnpicklingError, EOFError, AttributeError, ImportError, TypeError):
+        return None
@@ -0,0 +1,107 @@
+"""Merkle hashes of compiled story content.
+
+Every requirement, choice and node gets a stable content hash, and the
+hashes nest: a choice hash covers its requirement hash, a node hash covers
+its choice hashes, an act root covers its nodes in order and the campaign
+root covers its acts. A cache keyed by a node hash is therefore valid exactly
+as long as that node's compiled content is, and comparing roots tells a tool
+whether anything changed at all without looking at individual nodes.
+
+Hashes are computed from the compiled (simplified) nodes with text resolved,
+so they agree across processes and between module and data-file acts.
+
+The same pass assigns every choice a compact id from its node id and label
+(plus a counter for repeated labels). Unlike the content hashes, ids survive
+edits to a choice's effects or requirements and reordering of the choices,
+so sessions, saves and caches refer to choices by id.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+from collections.abc import Iterable, Mapping
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Tuple
+
+from game.content.frozen import thaw
+
+# Hex digits kept from each SHA-256 digest (128 bits).
+_HASH_LENGTH = 32
+# Hex digits of a choice id; ids only need to be unique within their node.
+_CHOICE_ID_LENGTH = 10
+
+_CHOICE_LIST_KEYS = ("choices", "auto_choices")
+
+
+@dataclass(frozen=True, slots=True)
+class NodeHashes:
+    """Content hashes of one node and of its parts, in choice order."""
+
+    node: str
+    choices: Tuple[str, ...]
+    auto_choices: Tuple[str, ...]
+    requirements: Tuple[str, ...]  # one per entry in `choices`
+    choice_ids: Tuple[str, ...] = ()  # one per entry in `choices`
+
+    def choice_position(self, choice_id: str) -> Optional[int]:
+        """Position in ``choices`` of the choice with ``choice_id``, if any."""
+        try:
+            return self.choice_ids.index(choice_id)
+        except ValueError:
+            return None
+
+
+def _digest(kind: str, *parts: str) -> str:
+    digest = hashlib.sha256(kind.encode("utf-8"))
+    for part in parts:
+        digest.update(b"\0")
+        digest.update(part.encode("utf-8"))
+    return digest.hexdigest()[:_HASH_LENGTH]
+
+
+def _canonical(value: Any) -> str:
+    return json.dumps(thaw(value), sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=repr)
+
+
+def requirement_hash(requirements: Any) -> str:
+    return _digest("requirements", _canonical(requirements or {}))
+
+
+def choice_hash(choice: Mapping[str, Any]) -> str:
+    body = {key: value for key, value in choice.items() if key != "requirements"}
+    return _digest("choice", _canonical(body), requirement_hash(choice.get("requirements")))
+
+
+def choice_ids(node_id: str, choices: Iterable[Mapping[str, Any]]) -> Tuple[str, ...]:
+    """Stable ids of a node's ``choices``, in order."""
+    occurrences: Dict[str, int] = {}
+    ids = []
+    for choice in choices:
+        label = str(choice.get("label", ""))
+        occurrence = occurrences.get(label, 0)
+        occurrences[label] = occurrence + 1
+        ids.append(_digest("choice-id", node_id, label, str(occurrence))[:_CHOICE_ID_LENGTH])
+    return tuple(ids)
+
+
+def hash_node(node_id: str, node: Mapping[str, Any]) -> NodeHashes:
+    """Hash a compiled node and its choices, and assign the choices their ids."""
+    body = {key: value for key, value in node.items() if key not in _CHOICE_LIST_KEYS}
+    choices = tuple(choice_hash(choice) for choice in node.get("choices", ()))
+    auto_choices = tuple(choice_hash(choice) for choice in node.get("auto_choices", ()))
+    requirements = tuple(requirement_hash(choice.get("requirements")) for choice in node.get("choices", ()))
+    node_digest = _digest("node", _canonical(body), *choices, "auto", *auto_choices)
+    return NodeHashes(node_digest, choices, auto_choices, requirements, choice_ids(node_id, node.get("choices", ())))
+
+
+def hash_story_nodes(nodes: Mapping[str, Mapping[str, Any]]) -> Dict[str, NodeHashes]:
+    return {node_id: hash_node(node_id, node) for node_id, node in nodes.items()}
+
+
+def merkle_root(kind: str, entries: Iterable[Tuple[str, str]]) -> str:
+    """Root over ``(name, hash)`` pairs in order, e.g. an act's nodes or a campaign's acts."""
+    parts = []
+    for name, value in entries:
+        parts.extend((name, value))
+    return _digest(kind, *parts)
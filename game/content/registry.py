@@ -0,0 +1,164 @@
+"""Registry of the campaigns one server can host.
+
+Campaigns (the built-in story, seasonal variants, other stories) are
+registered by id with a factory and only built the first time a session asks
+for one. Built campaigns stay cached so every session on the same campaign
+shares one compiled graph; whenever a campaign is built and the loaded acts
+of all cached campaigns exceed the memory budget, the least recently used
+ones are dropped and rebuilt (from their bundles) on next use. Lookups of a
+cached campaign, which happen on every rerun, only touch the LRU order, and
+never wait for another campaign to build: builds run outside the registry
+lock, serialized per campaign id.
+
+The default campaign - ``CHOICE_GAME_CAMPAIGN`` or the built-in story, and the
+one dev hot reload swaps - is always available as ``"default"`` and is never
+evicted. ``CHOICE_GAME_CAMPAIGN_DIR`` registers every ``<id>/campaign.json``
+below it.
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Callable, Dict, Optional
+
+from game.content.campaign import Campaign, default_campaign, load_campaign_manifest
+from game.content.compiler import _bundle_cache_enabled, default_bundle_dir
+
+DEFAULT_CAMPAIGN_ID = "default"
+CAMPAIGN_DIR_ENV = "CHOICE_GAME_CAMPAIGN_DIR"
+CAMPAIGN_CACHE_ENV = "CHOICE_GAME_CAMPAIGN_CACHE_MB"
+DEFAULT_MEMORY_BUDGET = 64 * 1024 * 1024
+
+
+class CampaignRegistry:
+    """Builds campaigns by id on demand and keeps them in an LRU under a memory budget."""
+
+    def __init__(self, memory_budget: int = DEFAULT_MEMORY_BUDGET) -> None:
+        self.memory_budget = memory_budget
+        self.evictions = 0
+        self._factories: Dict[str, Callable[[], Campaign]] = {}
+        self._campaigns: OrderedDict[str, Campaign] = OrderedDict()
+        self._build_locks: Dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+
+    def register(self, campaign_id: str, factory: Callable[[], Campaign]) -> None:
+        """Register (or replace) how to build ``campaign_id``."""
+        if campaign_id == DEFAULT_CAMPAIGN_ID:
+            raise ValueError(f"Campaign id '{DEFAULT_CAMPAIGN_ID}' is reserved for the default campaign.")
+        with self._lock:
+            self._factories[campaign_id] = factory
+            self._campaigns.pop(campaign_id, None)
+
+    def unregister(self, campaign_id: str) -> None:
+        with self._lock:
+            self._factories.pop(campaign_id, None)
+            self._campaigns.pop(campaign_id, None)
+
+    def register_manifest(self, campaign_id: str, manifest_path: Path) -> None:
+        """Register a data-file campaign; its bundles live in their own directory."""
+
+        def build() -> Campaign:
+            return load_campaign_manifest(
+                manifest_path,
+                bundle_dir=default_bundle_dir() / "campaigns" / campaign_id,
+                use_bundles=_bundle_cache_enabled(),
+            )
+
+        self.register(campaign_id, build)
+
+    def campaign_ids(self) -> tuple[str, ...]:
+        return (DEFAULT_CAMPAIGN_ID, *self._factories)
+
+    def cached_ids(self) -> tuple[str, ...]:
+        """Ids of the built campaigns currently cached, least recently used first."""
+        return tuple(self._campaigns)
+
+    def get(self, campaign_id: Optional[str] = None) -> Campaign:
+        """Return the campaign for ``campaign_id`` (None means the default), building it if needed."""
+        if campaign_id is None or campaign_id == DEFAULT_CAMPAIGN_ID:
+            return default_campaign()
+        with self._lock:
+            campaign = self._cached(campaign_id)
+            if campaign is not None:
+                return campaign
+            factory = self._factories.get(campaign_id)
+            if factory is None:
+                raise KeyError(f"Unknown campaign '{campaign_id}'.")
+            build_lock = self._build_locks.setdefault(campaign_id, threading.Lock())
+        with build_lock:
+            with self._lock:
+                # Another session may have finished building it while this one waited.
+                campaign = self._cached(campaign_id)
+            if campaign is not None:
+                return campaign
+            campaign = factory()
+            campaign.node_index()
+            with self._lock:
+                # Publish only if the id was not re-registered or dropped during the build.
+                if self._factories.get(campaign_id) is factory:
+                    self._campaigns[campaign_id] = campaign
+                    # Acts load lazily after a campaign is returned; growth since the
+                    # last build is accounted for here, when a new campaign adds more.
+                    self._evict(keep=campaign_id)
+        return campaign
+
+    def memory_usage(self) -> int:
+        """Approximate bytes held by the cached campaigns' loaded acts."""
+        return sum(campaign.memory_footprint() for campaign in list(self._campaigns.values()))
+
+    def _cached(self, campaign_id: str) -> Optional[Campaign]:
+        campaign = self._campaigns.get(campaign_id)
+        if campaign is not None:
+            self._campaigns.move_to_end(campaign_id)
+        return campaign
+
+    def _evict(self, keep: str) -> None:
+        usage = {campaign_id: campaign.memory_footprint() for campaign_id, campaign in self._campaigns.items()}
+        total = sum(usage.values())
+        for campaign_id in list(self._campaigns):
+            if total <= self.memory_budget:
+                break
+            if campaign_id == keep:
+                continue
+            del self._campaigns[campaign_id]
+            total -= usage[campaign_id]
+            self.evictions += 1
+
+
+def _memory_budget_from_env() -> int:
+    try:
+        return int(float(os.environ[CAMPAIGN_CACHE_ENV]) * 1024 * 1024)
+    except (KeyError, ValueError):
+        return DEFAULT_MEMORY_BUDGET
+
+
+_REGISTRY: Optional[CampaignRegistry] = None
+_REGISTRY_LOCK = threading.Lock()
+
+
+def campaign_registry() -> CampaignRegistry:
+    """Return the process-wide registry, registering ``CHOICE_GAME_CAMPAIGN_DIR`` on first use."""
+    global _REGISTRY
+    if _REGISTRY is None:
+        with _REGISTRY_LOCK:
+            if _REGISTRY is None:
+                registry = CampaignRegistry(_memory_budget_from_env())
+                directory = os.environ.get(CAMPAIGN_DIR_ENV)
+                if directory:
+                    for manifest in sorted(Path(directory).glob("*/campaign.json")):
+                        registry.register_manifest(manifest.parent.name, manifest)
+                _REGISTRY = registry
+    return _REGISTRY
+
+
+def get_campaign(campaign_id: Optional[str] = None) -> Campaign:
+    """Return a registered campaign by id; None or ``"default"`` is the default campaign."""
+    return campaign_registry().get(campaign_id)
+
+
+def campaign_ids() -> tuple[str, ...]:
+    """Return the ids sessions can bind to, default first."""
+    return campaign_registry().campaign_ids()
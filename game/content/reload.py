@@ -0,0 +1,117 @@
+"""Development hot reload of story content.
+
+With ``CHOICE_GAME_DEV_RELOAD=1`` every script run (each Streamlit rerun)
+polls the act source files. When one changed, only that act is re-read; its
+nodes are compared with the previous read by digest, and the campaign is
+rebuilt incrementally (see `Campaign.reloaded`) and swapped in as the
+process-wide campaign. Sessions keep their state and see the new graph on
+their next lookup.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+from game.content.campaign import ActChange, Campaign, ReloadReport, default_campaign, set_default_campaign
+
+CONTENT_RELOAD_ENV = "CHOICE_GAME_DEV_RELOAD"
+
+
+def content_reload_enabled() -> bool:
+    return bool(os.environ.get(CONTENT_RELOAD_ENV))
+
+
+def _file_stamp(path: Path) -> Optional[Tuple[int, int]]:
+    try:
+        stat = path.stat()
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+def _node_digests(nodes: Dict[str, Any]) -> Dict[str, str]:
+    return {
+        node_id: hashlib.sha256(json.dumps(node, sort_keys=True, default=repr).encode("utf-8")).hexdigest()
+        for node_id, node in nodes.items()
+    }
+
+
+class ContentWatcher:
+    """Polls a campaign's act sources and rebuilds the campaign when they change."""
+
+    def __init__(self, campaign: Campaign) -> None:
+        self.campaign = campaign
+        self.last_error: Optional[str] = None
+        self._stamps = {act.name: _file_stamp(act.path) for act in campaign.acts}
+        self._digests = {act.name: _node_digests(act.read_nodes()) for act in campaign.acts}
+        self._lock = threading.Lock()
+
+    def poll(self) -> Optional[ReloadReport]:
+        """Reload edited acts; returns what was redone, or None if nothing changed.
+
+        A source that fails to load (e.g. saved mid-edit) keeps the current
+        campaign and is recorded in `last_error`.
+        """
+        with self._lock:
+            stamps = {act.name: _file_stamp(act.path) for act in self.campaign.acts}
+            edited = [act for act in self.campaign.acts if stamps[act.name] != self._stamps[act.name]]
+            if not edited:
+                return None
+            self._stamps.update(stamps)
+            changes: Dict[str, ActChange] = {}
+            digests: Dict[str, Dict[str, str]] = {}
+            for act in edited:
+                try:
+                    nodes = act.read_nodes(reload=True)
+                except Exception as exc:  # noqa: BLE001 - any authoring error must not take the app down
+                    self.last_error = f"{act.path.name}: {exc}"
+                    return None
+                digests[act.name] = _node_digests(nodes)
+                previous = self._digests[act.name]
+                changed = frozenset(node_id for node_id, digest in digests[act.name].items() if previous.get(node_id) != digest)
+                if changed or digests[act.name].keys() != previous.keys():
+                    changes[act.name] = ActChange(nodes, changed)
+            self._digests.update(digests)
+            self.last_error = None
+            if not changes:
+                return None
+            previous = self.campaign
+            self.campaign, report = self.campaign.reloaded(changes)
+            self.campaign.release_superseded(previous)
+            return report
+
+
+_WATCHER: Optional[ContentWatcher] = None
+_WATCHER_LOCK = threading.Lock()
+
+
+def reload_content_if_changed() -> Optional[Tuple[ReloadReport, float]]:
+    """In dev mode, swap in a rebuilt campaign if its sources changed.
+
+    Returns the reload report and the seconds it took, or None.
+    """
+    global _WATCHER
+    if not content_reload_enabled():
+        return None
+    if _WATCHER is None:
+        with _WATCHER_LOCK:
+            if _WATCHER is None:
+                _WATCHER = ContentWatcher(default_campaign())
+                return None
+    started = time.perf_counter()
+    report = _WATCHER.poll()
+    if report is None:
+        return None
+    set_default_campaign(_WATCHER.campaign)
+    return report, time.perf_counter() - started
+
+
+def content_reload_error() -> Optional[str]:
+    """Return the last source that failed to reload, if any."""
+    return _WATCHER.last_error if _WATCHER is not None else None
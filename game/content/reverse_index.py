@@ -0,0 +1,148 @@
+"""Reverse indexes over compiled story content.
+
+Questions like "which choices set flag X", "which choices require item Y" or
+"which nodes lead into Z" are answered from maps built in one pass when a
+campaign is compiled, instead of each caller walking every node again.
+
+Choices are referenced by `ContentRef`: the node id plus the choice's
+position in ``choices`` followed by ``auto_choices`` (the numbering
+`StoryGraph.edge_choices` uses). A reference with ``choice=None`` is the
+node's own ``requirements``. A choice counts as a setter, granter, remover
+or reader when its base effects/requirements or any conditional variant
+(including ``any_of`` options) mention the flag or item.
+"""
+
+from __future__ import annotations
+
+from collections.abc import Mapping
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+from game.content.constants import STAT_KEYS
+from game.content.graph import StoryGraph
+
+Refs = Tuple["ContentRef", ...]
+
+
+@dataclass(frozen=True, slots=True)
+class ContentRef:
+    """A choice (or, with ``choice=None``, a node's own requirements) in the story."""
+
+    node_id: str
+    choice: Optional[int] = None
+
+
+@dataclass(frozen=True, slots=True)
+class StatGain:
+    """A positive stat effect and the requirements gating it, outermost first."""
+
+    ref: ContentRef
+    stat: str
+    amount: int
+    requirements: Tuple[Mapping[str, Any], ...]
+
+
+@dataclass(frozen=True, slots=True)
+class ReverseIndex:
+    """Who sets, reads, grants, removes or requires what, and who links where."""
+
+    flag_setters: Dict[str, Refs]
+    flag_readers: Dict[str, Refs]
+    item_granters: Dict[str, Refs]
+    item_removers: Dict[str, Refs]
+    item_requirers: Dict[str, Refs]
+    incoming: Dict[str, Refs]
+    stat_gains: Tuple[StatGain, ...]
+
+    def setters(self, flag: str) -> Refs:
+        return self.flag_setters.get(flag, ())
+
+    def readers(self, flag: str) -> Refs:
+        return self.flag_readers.get(flag, ())
+
+    def granters(self, item: str) -> Refs:
+        return self.item_granters.get(item, ())
+
+    def removers(self, item: str) -> Refs:
+        return self.item_removers.get(item, ())
+
+    def requirers(self, item: str) -> Refs:
+        return self.item_requirers.get(item, ())
+
+    def sources(self, node_id: str) -> Refs:
+        """Choices whose ``next`` (or a conditional ``next``) leads into ``node_id``."""
+        return self.incoming.get(node_id, ())
+
+
+def _requirement_options(requirements: Any) -> List[Mapping[str, Any]]:
+    """The requirement mapping plus every nested ``any_of`` option."""
+    if not requirements:
+        return []
+    options = [requirements]
+    for option in requirements.get("any_of", ()) or ():
+        options.extend(_requirement_options(option))
+    return options
+
+
+class _Builder:
+    def __init__(self) -> None:
+        self.maps: Dict[str, Dict[str, List[ContentRef]]] = {
+            name: {} for name in ("flag_setters", "flag_readers", "item_granters", "item_removers", "item_requirers")
+        }
+        self.stat_gains: List[StatGain] = []
+
+    def add(self, name: str, keys: Any, ref: ContentRef) -> None:
+        refs_by_key = self.maps[name]
+        for key in keys or ():
+            refs = refs_by_key.setdefault(key, [])
+            if not refs or refs[-1] != ref:
+                refs.append(ref)
+
+    def requirements(self, requirements: Any, ref: ContentRef) -> None:
+        for option in _requirement_options(requirements):
+            self.add("flag_readers", option.get("flag_true"), ref)
+            self.add("flag_readers", option.get("flag_false"), ref)
+            self.add("item_requirers", option.get("items"), ref)
+
+    def effects(self, effects: Any, ref: ContentRef, gates: Tuple[Mapping[str, Any], ...]) -> None:
+        if not effects:
+            return
+        self.add("flag_setters", effects.get("set_flags"), ref)
+        self.add("item_granters", effects.get("add_items"), ref)
+        self.add("item_removers", effects.get("remove_items"), ref)
+        for stat in STAT_KEYS:
+            amount = effects.get(stat)
+            if isinstance(amount, int) and amount > 0:
+                self.stat_gains.append(StatGain(ref, stat, amount, gates))
+
+
+def build_reverse_index(nodes: Mapping[str, Mapping[str, Any]], graph: StoryGraph) -> ReverseIndex:
+    """Index ``nodes`` in one pass; incoming edges come from ``graph``'s reverse adjacency."""
+    builder = _Builder()
+    for node_id, node in nodes.items():
+        builder.requirements(node.get("requirements"), ContentRef(node_id))
+        choices = list(node.get("choices", ())) + list(node.get("auto_choices", ()))
+        for position, choice in enumerate(choices):
+            ref = ContentRef(node_id, position)
+            requirements = choice.get("requirements") or {}
+            builder.requirements(requirements, ref)
+            builder.effects(choice.get("effects"), ref, (requirements,))
+            for variant in choice.get("conditional_effects", ()) or ():
+                variant_requirements = variant.get("requirements") or {}
+                builder.requirements(variant_requirements, ref)
+                builder.effects(variant.get("effects"), ref, (requirements, variant_requirements))
+
+    incoming: Dict[str, Refs] = {}
+    for target, node_id in enumerate(graph.node_ids):
+        start, end = graph.reverse_offsets[target], graph.reverse_offsets[target + 1]
+        if start == end:
+            continue
+        refs: List[ContentRef] = []
+        for position in range(start, end):
+            ref = ContentRef(graph.node_ids[graph.reverse_sources[position]], graph.edge_choices[graph.reverse_edges[position]])
+            if ref not in refs:
+                refs.append(ref)
+        incoming[node_id] = tuple(refs)
+
+    maps = {name: {key: tuple(refs) for key, refs in refs_by_key.items()} for name, refs_by_key in builder.maps.items()}
+    return ReverseIndex(incoming=incoming, stat_gains=tuple(builder.stat_gains), **maps)
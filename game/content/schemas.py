@@ -137,3 +137,5 @@ class Snapshot(TypedDict, total=False):
     visited_nodes: List[str]
     visited_edges: List[Dict[str, str]]
     pending_choice_confirmation: Dict[str, Any] | None
+    meta_state: Dict[str, List[str]]
+    starting_meta_state: Dict[str, List[str]]
@@ -1,77 +1,102 @@
 from __future__ import annotations
 
 from collections.abc import Iterator, Mapping
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, Optional
 
-from game.content.story_nodes_act1 import STORY_NODES_ACT1
-from game.content.story_nodes_act2 import STORY_NODES_ACT2
-from game.content.story_nodes_act3 import STORY_NODES_ACT3
-from game.content.story_nodes_intro import STORY_NODES_INTRO
-from game.content.story_utils import simplify_story_nodes
-
-_RAW_STORY_NODES: Dict[str, Dict[str, Any]] = {
-    **STORY_NODES_INTRO,
-    **STORY_NODES_ACT1,
-    **STORY_NODES_ACT2,
-    **STORY_NODES_ACT3,
-}
-
-_CACHED_STORY_NODES: Optional[Dict[str, Dict[str, Any]]] = None
-_CACHED_SIMPLIFICATION_REPORT: tuple[str, ...] = ()
+from game.content.campaign import current_campaign
+from game.content.graph import StoryGraph
+from game.content.merkle import NodeHashes
+from game.content.reverse_index import ReverseIndex
 
 
 def get_choice_simplification_report() -> tuple[str, ...]:
     """Return the report generated by the story simplification pass."""
-    init_story_nodes()
-    return _CACHED_SIMPLIFICATION_REPORT
+    return current_campaign().report()
 
 
 def init_story_nodes() -> None:
-    """Build the simplified story graph once (no mutation of the raw story dict)."""
-    global _CACHED_STORY_NODES, _CACHED_SIMPLIFICATION_REPORT
-    if _CACHED_STORY_NODES is not None:
-        return
-    nodes, report = simplify_story_nodes(_RAW_STORY_NODES)
-    _CACHED_STORY_NODES = nodes
-    _CACHED_SIMPLIFICATION_REPORT = tuple(report)
+    """Make the story index available (no mutation of the raw story dicts).
+
+    Acts themselves are simplified lazily, the first time one of their nodes
+    is requested; with a compiled bundle for the current sources, this loads
+    no act at all.
+    """
+    current_campaign().node_index()
+
+
+def get_story_content_hash() -> str:
+    """Return a stable SHA-256 digest of the story sources and simplification rules.
+
+    Saves record it so that loading can tell when the story changed underneath them.
+    """
+    return current_campaign().content_hash()
+
+
+def get_story_validation_warnings() -> tuple[str, ...]:
+    """Return story validation warnings, computed once per content version."""
+    return current_campaign().validation_warnings()
+
+
+def get_story_indexes() -> Dict[str, tuple[str, ...]]:
+    """Return lookup sets derived from the story (known flags, obtainable items, endings)."""
+    return current_campaign().indexes()
+
+
+def get_story_graph() -> StoryGraph:
+    """Return the integer-indexed adjacency (CSR) of the current story."""
+    return current_campaign().graph()
+
+
+def get_node_hashes(node_id: str) -> Optional[NodeHashes]:
+    """Return the content hashes of a node, its choices and their requirements."""
+    return current_campaign().node_hashes(node_id)
+
+
+def get_story_merkle_root() -> str:
+    """Return the Merkle root of the current story; it changes whenever any node does."""
+    return current_campaign().merkle_root()
 
 
-def _get_story_nodes_cached() -> Dict[str, Dict[str, Any]]:
-    init_story_nodes()
-    assert _CACHED_STORY_NODES is not None
-    return _CACHED_STORY_NODES
+def get_reverse_index() -> ReverseIndex:
+    """Return the current story's reverse indexes (flag setters/readers, item users, incoming edges)."""
+    return current_campaign().reverse_index()
 
 
 class _LazyStoryNodes(Mapping[str, Dict[str, Any]]):
-    """Mapping facade that lazily initializes the simplified story graph on first access.
+    """Mapping facade over the current campaign's lazily loaded acts.
 
-    This keeps call sites ergonomic (`STORY_NODES[...]`, `STORY_NODES.items()`), while
-    ensuring we don't mutate a module-level dict in-place during simplification.
+    This keeps call sites ergonomic (`STORY_NODES[...]`, `STORY_NODES.items()`).
+    Lookups and membership only consult the node index and the one act a node
+    lives in; `items()` and `values()` load every act.
     """
 
     def __getitem__(self, key: str) -> Dict[str, Any]:
-        return _get_story_nodes_cached()[key]
+        node = current_campaign().get_node(key)
+        if node is None:
+            raise KeyError(key)
+        return node
 
     def __iter__(self) -> Iterator[str]:
-        return iter(_get_story_nodes_cached())
+        return iter(current_campaign().node_index())
 
     def __len__(self) -> int:
-        return len(_get_story_nodes_cached())
+        return len(current_campaign().node_index())
 
     def get(self, key: str, default: Any = None) -> Any:
-        return _get_story_nodes_cached().get(key, default)
+        node = current_campaign().get_node(key)
+        return default if node is None else node
 
     def items(self):
-        return _get_story_nodes_cached().items()
+        return current_campaign().all_nodes().items()
 
     def keys(self):
-        return _get_story_nodes_cached().keys()
+        return current_campaign().node_index().keys()
 
     def values(self):
-        return _get_story_nodes_cached().values()
+        return current_campaign().all_nodes().values()
 
     def __contains__(self, key: object) -> bool:
-        return key in _get_story_nodes_cached()
+        return key in current_campaign().node_index()
 
 
 # Public, import-friendly mapping used everywhere else in the app.
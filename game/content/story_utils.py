@@ -1,10 +1,214 @@
+"""Choice simplification: a pipeline of registered per-node passes.
+
+Each pass takes one node and rewrites its choice lists, appending
+human-readable messages to the node's report; the runner tags every message
+with the node id and the pass name (``"<node>: [<pass>] <message>"``) and
+times each pass. Passes see a shallow copy of the node and must replace
+choices rather than mutate them, so nothing is deep-copied and the input is
+never modified. Every built-in pass is linear in the number of choices.
+
+Nodes are independent, so large campaigns are simplified on a process pool,
+one chunk of nodes per task.
+"""
+
 from __future__ import annotations
 
-import copy
-from typing import Any, Dict, List, Tuple
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Sequence
 
 from game.content.constants import MAX_CHOICES_PER_NODE
 
+# Below this many choices in total, a process pool costs more than it saves.
+PARALLEL_MIN_CHOICES = 200_000
+# Node chunks handed to each worker; more chunks balance uneven node sizes.
+_CHUNKS_PER_WORKER = 4
+
+PassFunction = Callable[[str, Dict[str, Any], List[str]], None]
+
+
+@dataclass(frozen=True, slots=True)
+class SimplificationPass:
+    """One named step of the pipeline, applied to each node in turn."""
+
+    name: str
+    apply: PassFunction
+
+
+@dataclass(slots=True)
+class SimplificationResult:
+    """Simplified nodes, the tagged report, and seconds spent in each pass."""
+
+    nodes: Dict[str, Dict[str, Any]]
+    report: List[str]
+    timings: Dict[str, float] = field(default_factory=dict)
+
+
+# Passes in the order they run. Register new ones with `simplification_pass`.
+SIMPLIFICATION_PASSES: List[SimplificationPass] = []
+
+
+def simplification_pass(name: str) -> Callable[[PassFunction], PassFunction]:
+    """Register a module-level function as the next pass of the pipeline."""
+
+    def register(function: PassFunction) -> PassFunction:
+        SIMPLIFICATION_PASSES.append(SimplificationPass(name, function))
+        return function
+
+    return register
+
+
+def _label(choice: Dict[str, Any]) -> str:
+    return choice.get("label", "unnamed choice")
+
+
+# ---------------------------------------------------------------------------
+# Built-in passes
+# ---------------------------------------------------------------------------
+
+
+@simplification_pass("auto-apply")
+def _auto_apply(node_id: str, node: Dict[str, Any], report: List[str]) -> None:
+    """Move ``auto_apply`` choices into ``auto_choices``."""
+    auto_choices: List[Dict[str, Any]] = []
+    keep: List[Dict[str, Any]] = []
+    for choice in node.get("choices", []):
+        if choice.get("auto_apply"):
+            auto_choice = dict(choice)
+            auto_choice.pop("auto_apply", None)
+            auto_choices.append(auto_choice)
+            report.append(f"auto-applied '{_label(choice)}'")
+            continue
+        keep.append(choice)
+    if auto_choices:
+        node["auto_choices"] = auto_choices
+    node["choices"] = keep
+
+
+# Serialises in C; sort_keys makes mapping key order irrelevant.
+_encode_outcome = json.JSONEncoder(sort_keys=True, separators=(",", ":"), default=repr).encode
+
+
+def _outcome_key(choice: Dict[str, Any]) -> str:
+    return _encode_outcome(
+        [choice.get("next"), choice.get("requirements", {}), choice.get("effects", {}), choice.get("conditional_effects", [])]
+    )
+
+
+@simplification_pass("dedup")
+def _dedup(node_id: str, node: Dict[str, Any], report: List[str]) -> None:
+    """Drop choices with the same destination, requirements and effects as an earlier one."""
+    deduped: List[Dict[str, Any]] = []
+    seen: set[str] = set()
+    for choice in node["choices"]:
+        key = _outcome_key(choice)
+        if key in seen:
+            report.append(f"removed duplicate '{_label(choice)}'")
+            continue
+        seen.add(key)
+        deduped.append(choice)
+    node["choices"] = deduped
+
+
+@simplification_pass("destination-grouping")
+def _destination_grouping(node_id: str, node: Dict[str, Any], report: List[str]) -> None:
+    """On nodes over the choice cap, report destinations the UI can group."""
+    if len(node["choices"]) <= MAX_CHOICES_PER_NODE:
+        return
+    destination_counts: Dict[str | None, int] = {}
+    for choice in node["choices"]:
+        destination_counts[choice.get("next")] = destination_counts.get(choice.get("next"), 0) + 1
+    for destination, count in destination_counts.items():
+        if count > 1:
+            report.append(f"{count} choices lead to '{destination}' (groupable destination)")
+
+
+def _is_low_impact(choice: Dict[str, Any]) -> bool:
+    effects = choice.get("effects", {})
+    return set(effects.keys()) <= {"log"} and not choice.get("conditional_effects")
+
+
+@simplification_pass("low-impact-pruning")
+def _low_impact_pruning(node_id: str, node: Dict[str, Any], report: List[str]) -> None:
+    """Drop the earliest log-only choices until the node is within the choice cap."""
+    choices = node["choices"]
+    excess = len(choices) - MAX_CHOICES_PER_NODE
+    if excess <= 0:
+        return
+    kept: List[Dict[str, Any]] = []
+    for choice in choices:
+        if excess > 0 and _is_low_impact(choice):
+            excess -= 1
+            report.append(f"pruned low-impact '{_label(choice)}'")
+            continue
+        kept.append(choice)
+    node["choices"] = kept
+
+
+# ---------------------------------------------------------------------------
+# Runner
+# ---------------------------------------------------------------------------
+
+
+def _run_passes(
+    story_nodes: Sequence[tuple[str, Dict[str, Any]]],
+    passes: Sequence[SimplificationPass],
+) -> SimplificationResult:
+    timings = {simplification.name: 0.0 for simplification in passes}
+    nodes: Dict[str, Dict[str, Any]] = {}
+    report: List[str] = []
+    clock = time.perf_counter
+    for node_id, raw_node in story_nodes:
+        node = dict(raw_node)
+        node["choices"] = list(node.get("choices", []))
+        for simplification in passes:
+            messages: List[str] = []
+            started = clock()
+            simplification.apply(node_id, node, messages)
+            timings[simplification.name] += clock() - started
+            report.extend(f"{node_id}: [{simplification.name}] {message}" for message in messages)
+        nodes[node_id] = node
+    return SimplificationResult(nodes, report, timings)
+
+
+def _chunks(items: List[Any], count: int) -> List[List[Any]]:
+    size = max(1, -(-len(items) // count))
+    return [items[start:start + size] for start in range(0, len(items), size)]
+
+
+def run_simplification(
+    story_nodes: Dict[str, Dict[str, Any]],
+    *,
+    passes: Optional[Sequence[SimplificationPass]] = None,
+    workers: Optional[int] = None,
+    min_parallel_choices: int = PARALLEL_MIN_CHOICES,
+) -> SimplificationResult:
+    """Run ``passes`` (default: every registered pass) over each node.
+
+    With at least ``min_parallel_choices`` choices in total, nodes are split
+    across ``workers`` processes (default: one per CPU; 1 forces a serial
+    run). Output and report order are the same either way.
+    """
+    passes = tuple(SIMPLIFICATION_PASSES if passes is None else passes)
+    items = list(story_nodes.items())
+    workers = workers or os.cpu_count() or 1
+    total_choices = sum(len(node.get("choices", ())) for _, node in items)
+    if workers == 1 or total_choices < min_parallel_choices:
+        return _run_passes(items, passes)
+
+    chunks = _chunks(items, workers * _CHUNKS_PER_WORKER)
+    merged = SimplificationResult({}, [], {simplification.name: 0.0 for simplification in passes})
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for result in executor.map(_run_passes, chunks, [passes] * len(chunks)):
+            merged.nodes.update(result.nodes)
+            merged.report.extend(result.report)
+            for name, seconds in result.timings.items():
+                merged.timings[name] += seconds
+    return merged
+
 
 def simplify_story_nodes(
     story_nodes: Dict[str, Dict[str, Any]],
@@ -13,67 +217,5 @@ def simplify_story_nodes(
 
     This function is intentionally pure: it never mutates the input mapping.
     """
-    report: List[str] = []
-    simplified_nodes: Dict[str, Dict[str, Any]] = copy.deepcopy(story_nodes)
-
-    def freeze(value: Any) -> Any:
-        if isinstance(value, dict):
-            return tuple((key, freeze(value[key])) for key in sorted(value))
-        if isinstance(value, list):
-            return tuple(freeze(item) for item in value)
-        return value
-
-    def is_low_impact(choice: Dict[str, Any]) -> bool:
-        effects = choice.get("effects", {})
-        return set(effects.keys()) <= {"log"} and not choice.get("conditional_effects")
-
-    for node_id, node in simplified_nodes.items():
-        choices = list(node.get("choices", []))
-        auto_choices: List[Dict[str, Any]] = []
-        keep: List[Dict[str, Any]] = []
-
-        for choice in choices:
-            if choice.get("auto_apply"):
-                auto_choice = dict(choice)
-                auto_choice.pop("auto_apply", None)
-                auto_choices.append(auto_choice)
-                report.append(f"{node_id}: auto-applied '{choice.get('label', 'unnamed choice')}'")
-                continue
-            keep.append(choice)
-
-        if auto_choices:
-            node["auto_choices"] = auto_choices
-
-        deduped: List[Dict[str, Any]] = []
-        seen: Dict[Tuple[Any, ...], Dict[str, Any]] = {}
-        for choice in keep:
-            key = (
-                choice.get("next"),
-                freeze(choice.get("requirements", {})),
-                freeze(choice.get("effects", {})),
-                freeze(choice.get("conditional_effects", [])),
-            )
-            if key in seen:
-                report.append(f"{node_id}: removed duplicate '{choice.get('label', 'unnamed choice')}'")
-                continue
-            seen[key] = choice
-            deduped.append(choice)
-
-        if len(deduped) > MAX_CHOICES_PER_NODE:
-            destination_counts: Dict[str | None, int] = {}
-            for choice in deduped:
-                destination_counts[choice.get("next")] = destination_counts.get(choice.get("next"), 0) + 1
-            for destination, count in destination_counts.items():
-                if count > 1:
-                    report.append(f"{node_id}: {count} choices lead to '{destination}' (groupable destination)")
-
-            low_impact = [choice for choice in deduped if is_low_impact(choice)]
-            while len(deduped) > MAX_CHOICES_PER_NODE and low_impact:
-                removed = low_impact.pop(0)
-                deduped.remove(removed)
-                report.append(f"{node_id}: pruned low-impact '{removed.get('label', 'unnamed choice')}'")
-
-        node["choices"] = deduped
-
-    return simplified_nodes, report
-
+    result = run_simplification(story_nodes)
+    return result.nodes, result.report
@@ -0,0 +1,233 @@
+"""Narrative string tables.
+
+Node prose (``text``, dialogue lines and ``conditional_narrative`` text) is
+most of the story's bytes, but only the node view ever reads it. When an act
+is compiled its prose is moved into a string table and the nodes keep small
+`TextRef` handles instead; the text is decoded only when ``str()`` is called
+on a handle, i.e. when a node is rendered.
+
+A table is a single file, memory-mapped read-only::
+
+    b"CGST" | count: u32 | offsets: (count + 1) x u32 | UTF-8 data
+
+String ``i`` is ``data[offsets[i]:offsets[i + 1]]``. Mapped pages belong to
+the OS page cache, not the Python heap, and are shared by every process that
+opens the same table; a story image (`game.content.image`) embeds its
+tables and serves them from its own mapping. Without a bundle directory (tests, disabled cache) the
+same layout is kept in one in-memory ``bytes`` object instead.
+"""
+
+from __future__ import annotations
+
+import mmap
+import os
+import struct
+import threading
+from pathlib import Path
+from typing import Any, Dict, Mapping, Optional, Union
+
+_MAGIC = b"CGST"
+_HEADER = struct.Struct("<4sI")
+_OFFSET = struct.Struct("<I")
+
+# Node and narrative-variant keys whose values are prose.
+_TEXT_KEYS = ("text", "text_replace", "text_append")
+_DIALOGUE_KEYS = ("dialogue", "dialogue_replace", "dialogue_append")
+
+# Loaded tables by key; `TextRef` handles resolve through this.
+_TABLES: Dict[str, "StringTable"] = {}
+_TABLES_LOCK = threading.Lock()
+
+
+class StringTable:
+    """Read-only view over an encoded string table."""
+
+    __slots__ = ("key", "_buffer", "_count", "_data_start")
+
+    def __init__(self, key: str, buffer: Union[bytes, mmap.mmap, memoryview]) -> None:
+        magic, count = _HEADER.unpack_from(buffer, 0)
+        if magic != _MAGIC:
+            raise ValueError(f"String table '{key}' has an invalid header.")
+        self.key = key
+        self._buffer = buffer
+        self._count = count
+        self._data_start = _HEADER.size + (count + 1) * _OFFSET.size
+
+    def __len__(self) -> int:
+        return self._count
+
+    def text(self, index: int) -> str:
+        """Decode string ``index``."""
+        if not 0 <= index < self._count:
+            raise IndexError(index)
+        position = _HEADER.size + index * _OFFSET.size
+        start = _OFFSET.unpack_from(self._buffer, position)[0]
+        end = _OFFSET.unpack_from(self._buffer, position + _OFFSET.size)[0]
+        return str(self._buffer[self._data_start + start:self._data_start + end], "utf-8")
+
+    @property
+    def buffer(self) -> Union[bytes, mmap.mmap, memoryview]:
+        """The encoded table."""
+        return self._buffer
+
+    @property
+    def is_mapped(self) -> bool:
+        return not isinstance(self._buffer, bytes)
+
+
+class StringTableBuilder:
+    """Collects prose while an act is compiled; identical strings share one entry."""
+
+    def __init__(self, key: str) -> None:
+        self.key = key
+        self._indexes: Dict[str, int] = {}
+
+    def add(self, text: str) -> "TextRef":
+        index = self._indexes.get(text)
+        if index is None:
+            index = self._indexes.setdefault(text, len(self._indexes))
+        return TextRef(self.key, index)
+
+    def encode(self) -> bytes:
+        encoded = [text.encode("utf-8") for text in self._indexes]
+        offsets = [0]
+        for chunk in encoded:
+            offsets.append(offsets[-1] + len(chunk))
+        header = _HEADER.pack(_MAGIC, len(encoded))
+        return header + struct.pack(f"<{len(offsets)}I", *offsets) + b"".join(encoded)
+
+
+class TextRef:
+    """Handle to one string in a table; behaves like that string for ``str``, ``==`` and ``hash``."""
+
+    __slots__ = ("table", "index")
+
+    def __init__(self, table: str, index: int) -> None:
+        self.table = table
+        self.index = index
+
+    def __str__(self) -> str:
+        return _TABLES[self.table].text(self.index)
+
+    def __repr__(self) -> str:
+        return f"TextRef({self.table!r}, {self.index})"
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, TextRef):
+            if other.table == self.table:
+                return other.index == self.index
+            return str(other) == str(self)
+        if isinstance(other, str):
+            return other == str(self)
+        return NotImplemented
+
+    def __hash__(self) -> int:
+        return hash(str(self))
+
+    def __reduce__(self):
+        return (TextRef, (self.table, self.index))
+
+
+def story_text(value: Any) -> str:
+    """Return the text behind a `TextRef` (or any value) as a plain string."""
+    return "" if value is None else str(value)
+
+
+# ---------------------------------------------------------------------------
+# Extraction
+# ---------------------------------------------------------------------------
+
+
+def _extract_dialogue(lines: Any, builder: StringTableBuilder) -> Any:
+    if not isinstance(lines, list):
+        return lines
+    extracted = []
+    for line in lines:
+        if isinstance(line, Mapping) and isinstance(line.get("line"), str):
+            line = {**line, "line": builder.add(line["line"])}
+        extracted.append(line)
+    return extracted
+
+
+def _extract_prose(entry: Dict[str, Any], builder: StringTableBuilder) -> None:
+    for key in _TEXT_KEYS:
+        # Empty text stays inline so truthiness checks keep working.
+        if isinstance(entry.get(key), str) and entry[key]:
+            entry[key] = builder.add(entry[key])
+    for key in _DIALOGUE_KEYS:
+        if key in entry:
+            entry[key] = _extract_dialogue(entry[key], builder)
+
+
+def extract_narrative(nodes: Mapping[str, Dict[str, Any]], builder: StringTableBuilder) -> None:
+    """Replace the prose in simplified ``nodes`` with `TextRef` handles.
+
+    The node dicts are updated in place; nested variants are copied first.
+    """
+    for node in nodes.values():
+        _extract_prose(node, builder)
+        variants = node.get("conditional_narrative")
+        if isinstance(variants, list):
+            # Variants may still be shared with the raw act; extract into copies.
+            extracted = []
+            for variant in variants:
+                if isinstance(variant, dict):
+                    variant = dict(variant)
+                    _extract_prose(variant, builder)
+                extracted.append(variant)
+            node["conditional_narrative"] = extracted
+
+
+# ---------------------------------------------------------------------------
+# Storage and registry
+# ---------------------------------------------------------------------------
+
+
+def string_table_path(key: str, directory: Path) -> Path:
+    return Path(directory) / f"strings-{key}.bin"
+
+
+def write_string_table(builder: StringTableBuilder, directory: Path) -> Optional[Path]:
+    """Atomically write a table; returns its path, or None if the directory is unwritable."""
+    path = string_table_path(builder.key, directory)
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        tmp.write_bytes(builder.encode())
+        tmp.replace(path)
+    except OSError:
+        return None
+    return path
+
+
+def open_string_table(key: str, directory: Path) -> Optional[StringTable]:
+    """Memory-map a table written by `write_string_table`, or None if absent or unusable."""
+    try:
+        with string_table_path(key, directory).open("rb") as handle:
+            # The mapping stays valid after the file is closed.
+            buffer = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+        return StringTable(key, buffer)
+    except (OSError, ValueError, struct.error):
+        return None
+
+
+def memory_string_table(builder: StringTableBuilder) -> StringTable:
+    """Build a table held in memory, for when no bundle directory is used."""
+    return StringTable(builder.key, builder.encode())
+
+
+def register_string_table(table: StringTable) -> None:
+    """Make ``table`` the one `TextRef` handles with its key resolve through."""
+    with _TABLES_LOCK:
+        _TABLES[table.key] = table
+
+
+def unregister_string_table(key: str) -> None:
+    """Drop the table registered under ``key``; its `TextRef` handles stop resolving."""
+    with _TABLES_LOCK:
+        _TABLES.pop(key, None)
+
+
+def string_table(key: str) -> Optional[StringTable]:
+    """Return the registered table with ``key``, if any."""
+    return _TABLES.get(key)
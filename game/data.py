@@ -13,6 +13,13 @@ from game.content import (
     STORY_NODES,
     TRAIT_KEYS,
     get_choice_simplification_report,
+    get_node_hashes,
+    get_reverse_index,
+    get_story_content_hash,
+    get_story_graph,
+    get_story_indexes,
+    get_story_merkle_root,
+    get_story_validation_warnings,
     init_story_nodes,
 )
 
@@ -26,5 +33,12 @@ __all__ = [
     "STORY_NODES",
     "TRAIT_KEYS",
     "get_choice_simplification_report",
+    "get_node_hashes",
+    "get_reverse_index",
+    "get_story_content_hash",
+    "get_story_graph",
+    "get_story_indexes",
+    "get_story_merkle_root",
+    "get_story_validation_warnings",
     "init_story_nodes",
 ]
@@ -1,6 +1,7 @@
 """Core engine helpers that operate independently of the Streamlit UI."""
 
-from game.engine.requirements import check_requirements
+from game.engine.cache import CacheStats, LRUCache
+from game.engine.requirements import StateProjection, check_requirements, requirements_projection
 from game.engine.state import GameState, state_from_session
 from game.engine.state_machine import (
     Rule,
@@ -14,8 +15,11 @@ from game.engine.state_machine import (
 )
 
 __all__ = [
+    "CacheStats",
     "GameState",
+    "LRUCache",
     "Rule",
+    "StateProjection",
     "StateMachine",
     "TransitionContext",
     "TransitionResult",
@@ -24,5 +28,6 @@ __all__ = [
     "evaluate_transition",
     "get_phase",
     "get_state_machine",
+    "requirements_projection",
     "state_from_session",
 ]
@@ -1,9 +1,12 @@
 from __future__ import annotations
 
-from typing import Any, Dict, List
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, List, Tuple
 
 from game.engine.state import GameState
 
+RequirementPredicate = Callable[[GameState], bool]
+
 
 # Stat/trait requirement specs: (requirement_key, value_key, label)
 # "min" checks: current < required  →  fail
@@ -110,6 +113,142 @@ def check_requirements(requirements: Dict[str, Any] | None, state: GameState) ->
     return True, ""
 
 
+def _always(state: GameState) -> bool:
+    return True
+
+
+def compile_requirements(requirements: Dict[str, Any] | None) -> RequirementPredicate:
+    """Compile requirements into a predicate agreeing with `check_requirements`'s verdict.
+
+    Only the checks the requirements actually use are kept, and no failure
+    reasons are built, so content evaluated on every rerun can be compiled
+    once and tested cheaply.
+    """
+    if not requirements:
+        return _always
+
+    if "any_of" in requirements:
+        options = tuple(compile_requirements(option) for option in requirements["any_of"])
+        return lambda state: any(option(state) for option in options)
+
+    checks: List[RequirementPredicate] = []
+    if "class" in requirements:
+        classes = frozenset(requirements["class"])
+        checks.append(lambda state: state.player_class in classes)
+    for req_key, stat_key, _label in _MIN_REQUIREMENT_CHECKS:
+        if req_key in requirements:
+            checks.append(lambda state, key=stat_key, minimum=requirements[req_key]: state.stats.get(key, 0) >= minimum)
+    for req_key, trait_key, _label, direction in _TRAIT_RANGE_CHECKS:
+        if req_key not in requirements:
+            continue
+        if direction == "min":
+            checks.append(lambda state, key=trait_key, bound=requirements[req_key]: state.traits.get(key, 0) >= bound)
+        else:
+            checks.append(lambda state, key=trait_key, bound=requirements[req_key]: state.traits.get(key, 0) <= bound)
+
+    items = tuple(requirements.get("items", ()))
+    if items:
+        checks.append(lambda state: all(item in state.inventory for item in items))
+    missing_items = tuple(requirements.get("missing_items", ()))
+    if missing_items:
+        checks.append(lambda state: not any(item in state.inventory for item in missing_items))
+    flags_true = tuple(requirements.get("flag_true", ()))
+    if flags_true:
+        checks.append(lambda state: all(state.flags.get(flag, False) for flag in flags_true))
+    flags_false = tuple(requirements.get("flag_false", ()))
+    if flags_false:
+        checks.append(lambda state: not any(state.flags.get(flag, False) for flag in flags_false))
+    meta_items = tuple(requirements.get("meta_items", ()))
+    if meta_items:
+        checks.append(lambda state: all(item in state.meta_state.get("unlocked_items", []) for item in meta_items))
+    meta_missing_items = tuple(requirements.get("meta_missing_items", ()))
+    if meta_missing_items:
+        checks.append(lambda state: not any(item in state.meta_state.get("unlocked_items", []) for item in meta_missing_items))
+    meta_nodes = tuple(requirements.get("meta_nodes_present", ()))
+    if meta_nodes:
+        checks.append(lambda state: not any(node_id in state.meta_state.get("removed_nodes", []) for node_id in meta_nodes))
+
+    if not checks:
+        return _always
+    if len(checks) == 1:
+        return checks[0]
+    checks_tuple = tuple(checks)
+    return lambda state: all(check(state) for check in checks_tuple)
+
+
+@dataclass(frozen=True, slots=True)
+class StateProjection:
+    """The parts of the game state a set of requirements reads.
+
+    Two states with the same `project` value get the same verdict and the
+    same failure reason from every requirement the projection was built from.
+    """
+
+    player_class: bool = False
+    stats: Tuple[str, ...] = ()
+    traits: Tuple[str, ...] = ()
+    items: Tuple[str, ...] = ()
+    flags: Tuple[str, ...] = ()
+    meta_items: Tuple[str, ...] = ()
+    meta_nodes: Tuple[str, ...] = ()
+
+    def project(self, state: GameState) -> Tuple[Any, ...]:
+        """Return the read fields of ``state`` (or any object with its attributes) as a hashable key."""
+        meta_state = state.meta_state if self.meta_items or self.meta_nodes else {}
+        unlocked = meta_state.get("unlocked_items", [])
+        removed = meta_state.get("removed_nodes", [])
+        return (
+            state.player_class if self.player_class else None,
+            tuple(state.stats.get(key, 0) for key in self.stats),
+            tuple(state.traits.get(key, 0) for key in self.traits),
+            tuple(item in state.inventory for item in self.items),
+            tuple(bool(state.flags.get(flag, False)) for flag in self.flags),
+            tuple(item in unlocked for item in self.meta_items),
+            tuple(node_id in removed for node_id in self.meta_nodes),
+        )
+
+
+def _collect_reads(requirements: Dict[str, Any] | None, reads: Dict[str, Dict[str, None]]) -> None:
+    if not requirements:
+        return
+    if "any_of" in requirements:
+        for option in requirements["any_of"]:
+            _collect_reads(option, reads)
+        return
+    if "class" in requirements:
+        reads["player_class"][""] = None
+    for req_key, stat_key, _label in _MIN_REQUIREMENT_CHECKS:
+        if req_key in requirements:
+            reads["stats"][stat_key] = None
+    for req_key, trait_key, _label, _direction in _TRAIT_RANGE_CHECKS:
+        if req_key in requirements:
+            reads["traits"][trait_key] = None
+    for req_key, field in (
+        ("items", "items"),
+        ("missing_items", "items"),
+        ("flag_true", "flags"),
+        ("flag_false", "flags"),
+        ("meta_items", "meta_items"),
+        ("meta_missing_items", "meta_items"),
+        ("meta_nodes_present", "meta_nodes"),
+    ):
+        for name in requirements.get(req_key, ()):
+            reads[field][name] = None
+
+
+def requirements_projection(requirement_sets: Iterable[Dict[str, Any] | None]) -> StateProjection:
+    """Return the projection of state that all of ``requirement_sets`` read, fields in first-seen order."""
+    reads: Dict[str, Dict[str, None]] = {
+        name: {} for name in ("player_class", "stats", "traits", "items", "flags", "meta_items", "meta_nodes")
+    }
+    for requirements in requirement_sets:
+        _collect_reads(requirements, reads)
+    return StateProjection(
+        player_class=bool(reads.pop("player_class")),
+        **{name: tuple(names) for name, names in reads.items()},
+    )
+
+
 def _summarize_requirements(requirements: Dict[str, Any] | None) -> str:
     if not requirements:
         return ""
@@ -3,6 +3,7 @@ from __future__ import annotations
 from dataclasses import dataclass
 from typing import Any, Dict, List, Mapping
 
+from game.content.constants import STAT_KEYS
 from game.state import normalize_meta_state
 
 
@@ -32,3 +33,88 @@ def state_from_session(session: Mapping[str, Any]) -> GameState:
             "removed_nodes": list(meta_state.get("removed_nodes", [])),
         },
     )
+
+
+def sync_morality_flags(flags: Dict[str, Any]) -> None:
+    """Keep legacy reputation flags in sync with the canonical ``morality`` flag."""
+    morality = flags.get("morality")
+    if morality == "merciful":
+        flags["mercy_reputation"] = True
+        flags["cruel_reputation"] = False
+    elif morality == "ruthless":
+        flags["mercy_reputation"] = False
+        flags["cruel_reputation"] = True
+
+
+def apply_effects_to_state(state: GameState, effects: Mapping[str, Any]) -> List[str]:
+    """Apply the stat, item, flag, trait and legacy parts of ``effects`` to ``state`` in place.
+
+    The one home of these rules: `game.logic.apply_effects` runs it on the
+    session's own containers and `fork_state` on a copy. Returns the
+    feedback lines for the changes.
+    """
+    feedback: List[str] = []
+    stats = state.stats
+    for stat in STAT_KEYS:
+        if stat in effects:
+            stats[stat] += effects[stat]
+    # Stat floors: prevent negative values from leaking into the UI/state machine.
+    # HP <= 0 is still meaningful (death routing), but we clamp at 0 for display/storage.
+    for stat in STAT_KEYS:
+        if stats.get(stat, 0) < 0:
+            stats[stat] = 0
+
+    inventory = state.inventory
+    for item in effects.get("add_items", []):
+        if item not in inventory:
+            inventory.append(item)
+    for item in effects.get("remove_items", []):
+        if item in inventory:
+            inventory.remove(item)
+
+    flags = state.flags
+    for key, value in effects.get("set_flags", {}).items():
+        flags[key] = value
+        feedback.append(f"World state changed: {key} -> {value}")
+    if any(name.startswith("branch_") and name.endswith("_completed") and done for name, done in flags.items()):
+        flags["any_branch_completed"] = True
+
+    for trait, delta in effects.get("trait_delta", {}).items():
+        if trait in state.traits:
+            state.traits[trait] += delta
+            sign = "+" if delta >= 0 else ""
+            feedback.append(f"Trait shift: {trait} {sign}{delta}")
+
+    unlocked = state.meta_state.setdefault("unlocked_items", [])
+    for item in effects.get("unlock_meta_items", []):
+        if item not in unlocked:
+            unlocked.append(item)
+            feedback.append(f"Legacy item unlocked: {item}")
+    removed = state.meta_state.setdefault("removed_nodes", [])
+    for node_id in effects.get("remove_meta_nodes", []):
+        if node_id not in removed:
+            removed.append(node_id)
+
+    sync_morality_flags(flags)
+    return feedback
+
+
+def fork_state(state: GameState, effects: Mapping[str, Any] | None) -> GameState:
+    """Return a copy of ``state`` with ``effects`` applied by `apply_effects_to_state`.
+
+    No logs, surprise events or session side effects, so a likely next
+    state can be predicted off the script thread.
+    """
+    forked = GameState(
+        player_class=state.player_class,
+        stats=dict(state.stats),
+        inventory=list(state.inventory),
+        flags=dict(state.flags),
+        traits=dict(state.traits),
+        meta_state={
+            "unlocked_items": list(state.meta_state.get("unlocked_items", [])),
+            "removed_nodes": list(state.meta_state.get("removed_nodes", [])),
+        },
+    )
+    apply_effects_to_state(forked, effects or {})
+    return forked
@@ -1,13 +1,17 @@
+import os
 from typing import Any, Dict, List, Tuple
 
 from game.streamlit_compat import st
 
-from game.data import FACTION_KEYS, HIGH_COST_GOLD_LOSS, HIGH_COST_HP_LOSS, STAT_KEYS, STORY_NODES, TRAIT_KEYS
+from game.data import FACTION_KEYS, HIGH_COST_GOLD_LOSS, HIGH_COST_HP_LOSS, STAT_KEYS, STORY_NODES, TRAIT_KEYS, get_node_hashes
+from game.content.merkle import NodeHashes, choice_ids
 from game.content.surprise_events import SURPRISE_EVENTS
+from game.engine.cache import CacheStats, LRUCache
+from game.engine.requirements import StateProjection, requirements_projection
 from game.engine.requirements import check_requirements as check_requirements_engine
-from game.engine.state import state_from_session
+from game.engine.state import GameState, apply_effects_to_state, state_from_session, sync_morality_flags
 from game.engine.state_machine import evaluate_transition, get_phase
-from game.state import add_log, normalize_meta_state, persist_meta_state, snapshot_state
+from game.state import add_log, normalize_meta_state, persist_meta_state, record_replay_checkpoint, snapshot_state
 from game.validation import validate_story_nodes
 
 def transition_to_failure(failure_type: str) -> None:
@@ -33,15 +37,32 @@ def transition_to_failure(failure_type: str) -> None:
     add_log(failure_logs.get(failure_type, failure_logs["injured"]))
 
 
-def execute_choice(node_id: str, label: str, choice: Dict[str, Any]) -> None:
+def execute_choice(node_id: str, label: str, choice: Dict[str, Any], choice_id: str | None = None) -> None:
     """Apply a selected choice and transition to its next node.
 
     Uses the state machine to evaluate transitions, applying rules for
     HP death, missing nodes, phase-specific logic, and cross-cutting concerns.
+    ``choice_id`` (see `get_node_choice_ids`) is recorded in the decision
+    history when given. The undo snapshot, together with the decision, is
+    queued for a background autosave.
     """
+    # Deferred import: the saves package builds on this module.
+    from game.saves.autosave import autosave_session
+
     st.session_state.pending_choice_confirmation = None
-    st.session_state.history.append(snapshot_state())
-    st.session_state.decision_history.append({"node": node_id, "choice": label})
+    # Taken once and shared by undo, the replay checkpoint and the autosave.
+    snapshot = snapshot_state()
+    st.session_state.history.append(snapshot)
+    record_replay_checkpoint(snapshot)
+    decision = {"node": node_id, "choice": label}
+    if choice_id is not None:
+        decision["choice_id"] = choice_id
+    st.session_state.decision_history.append(dict(decision))
+    _apply_choice(node_id, label, choice)
+    autosave_session(snapshot, decision)
+
+
+def _apply_choice(node_id: str, label: str, choice: Dict[str, Any]) -> None:
     resolved_effects, resolved_next = resolve_choice_outcome(choice)
     summary = apply_effects(resolved_effects, label=label)
     st.session_state.last_outcome_summary = summary
@@ -83,6 +104,11 @@ def execute_choice(node_id: str, label: str, choice: Dict[str, Any]) -> None:
     st.session_state.current_phase = get_phase(actual_next)
 
 
+def should_force_injury_redirect(node_id: str, hp: int) -> bool:
+    """Return whether the current state should auto-redirect into the injured setback."""
+    return hp <= 0 and not node_id.startswith("failure_") and node_id != "death"
+
+
 def get_choice_warnings(choice: Dict[str, Any]) -> List[str]:
     """Return warning messages for irreversible or high-cost choices."""
     effects, _ = resolve_choice_outcome(choice)
@@ -107,13 +133,7 @@ def get_choice_warnings_with_effects(choice: Dict[str, Any], effects: Dict[str,
 
 def apply_morality_flags(flags: Dict[str, Any]) -> None:
     """Keep legacy reputation flags in sync with canonical morality value."""
-    morality = flags.get("morality")
-    if morality == "merciful":
-        flags["mercy_reputation"] = True
-        flags["cruel_reputation"] = False
-    elif morality == "ruthless":
-        flags["mercy_reputation"] = False
-        flags["cruel_reputation"] = True
+    sync_morality_flags(flags)
 
 
 def check_requirements(requirements: Dict[str, Any] | None) -> tuple[bool, str]:
@@ -123,11 +143,15 @@ def check_requirements(requirements: Dict[str, Any] | None) -> tuple[bool, str]:
 
 def resolve_choice_outcome(choice: Dict[str, Any]) -> tuple[Dict[str, Any], str]:
     """Return the effective effects and next node for a choice based on current state."""
-    effects = dict(choice.get("effects", {}))
+    return _resolve_choice_outcome(choice, state_from_session(st.session_state))
+
+
+def _resolve_choice_outcome(choice: Dict[str, Any], state: GameState) -> tuple[Dict[str, Any], str]:
+    effects = choice.get("effects", {})
     next_node = choice.get("next")
 
     for variant in choice.get("conditional_effects", []):
-        ok, _ = check_requirements(variant.get("requirements"))
+        ok, _ = check_requirements_engine(variant.get("requirements"), state)
         if not ok:
             continue
         effects = merge_effects(effects, variant.get("effects", {}))
@@ -169,15 +193,16 @@ def merge_effects(base: Dict[str, Any], incoming: Dict[str, Any]) -> Dict[str, A
             merged.setdefault(key, [])
             merged[key] = _merge_unique_list_preserve_order(merged[key], incoming[key])
 
+    # Nested dicts are rebuilt rather than updated: ``base`` may be frozen story content.
     if incoming.get("set_flags"):
-        merged.setdefault("set_flags", {})
-        merged["set_flags"].update(incoming["set_flags"])
+        merged["set_flags"] = {**merged.get("set_flags", {}), **incoming["set_flags"]}
 
     for key in _MERGE_ADDITIVE_DICT_KEYS:
         if incoming.get(key):
-            merged.setdefault(key, {})
+            combined = dict(merged.get(key, {}))
             for name, delta in incoming[key].items():
-                merged[key][name] = merged[key].get(name, 0) + delta
+                combined[name] = combined.get(name, 0) + delta
+            merged[key] = combined
 
     if "log" in incoming:
         merged["log"] = incoming["log"]
@@ -198,49 +223,15 @@ def apply_effects(
     stats = st.session_state.stats
     inventory = st.session_state.inventory
     flags = st.session_state.flags
-    traits = st.session_state.traits
     factions = st.session_state.factions
     meta_state = normalize_meta_state(st.session_state.get("meta_state"))
-    feedback: List[str] = []
     before_stats = dict(stats)
     before_inventory = list(inventory)
     before_flags = dict(flags)
 
-    for stat in STAT_KEYS:
-        if stat in effects:
-            stats[stat] += effects[stat]
-
-    # Stat floors: prevent negative values from leaking into the UI/state machine.
-    # HP <= 0 is still meaningful (death routing), but we clamp at 0 for display/storage.
-    for stat in ("hp", "gold", "strength", "dexterity"):
-        if stats.get(stat, 0) < 0:
-            stats[stat] = 0
-
-    for item in effects.get("add_items", []):
-        if item not in inventory:
-            inventory.append(item)
-
-    for item in effects.get("remove_items", []):
-        if item in inventory:
-            inventory.remove(item)
-
-    for key, value in effects.get("set_flags", {}).items():
-        flags[key] = value
-        feedback.append(f"World state changed: {key} -> {value}")
-
-    completed_branches = [
-        flag_name
-        for flag_name, is_done in flags.items()
-        if flag_name.startswith("branch_") and flag_name.endswith("_completed") and is_done
-    ]
-    if completed_branches:
-        flags["any_branch_completed"] = True
-
-    for trait, delta in effects.get("trait_delta", {}).items():
-        if trait in traits:
-            traits[trait] += delta
-            sign = "+" if delta >= 0 else ""
-            feedback.append(f"Trait shift: {trait} {sign}{delta}")
+    # Shared with fork_state, so prefetch predicts exactly what a click does.
+    state = GameState(st.session_state.player_class, stats, inventory, flags, st.session_state.traits, meta_state)
+    feedback = apply_effects_to_state(state, effects)
 
     for faction, delta in effects.get("faction_delta", {}).items():
         if faction in factions:
@@ -253,19 +244,9 @@ def apply_effects(
             st.session_state.seen_events.append(event)
             feedback.append(f"Key event recorded: {event}")
 
-    for item in effects.get("unlock_meta_items", []):
-        if item not in meta_state["unlocked_items"]:
-            meta_state["unlocked_items"].append(item)
-            feedback.append(f"Legacy item unlocked: {item}")
-
-    for node_id in effects.get("remove_meta_nodes", []):
-        if node_id not in meta_state["removed_nodes"]:
-            meta_state["removed_nodes"].append(node_id)
     st.session_state.meta_state = meta_state
     persist_meta_state(meta_state)
 
-    apply_morality_flags(flags)
-
     if trigger_surprises:
         if "auto_event_summary" not in st.session_state:
             st.session_state.auto_event_summary = []
@@ -362,19 +343,6 @@ def _freeze_state_value(value: Any) -> Any:
     return value
 
 
-def _choice_eval_state_signature() -> Tuple[Any, ...]:
-    meta_state = normalize_meta_state(st.session_state.get("meta_state"))
-    return (
-        st.session_state.player_class,
-        tuple((k, st.session_state.stats.get(k, 0)) for k in STAT_KEYS),
-        tuple(st.session_state.inventory),
-        tuple((k, st.session_state.traits.get(k, 0)) for k in TRAIT_KEYS),
-        _freeze_state_value(st.session_state.flags),
-        tuple(meta_state.get("unlocked_items", [])),
-        tuple(meta_state.get("removed_nodes", [])),
-    )
-
-
 def _choice_identity(choice: Dict[str, Any]) -> Tuple[Any, ...]:
     return (
         choice.get("label"),
@@ -388,24 +356,136 @@ def _choice_identity(choice: Dict[str, Any]) -> Tuple[Any, ...]:
     )
 
 
-def _node_content_signature(node: Dict[str, Any]) -> Tuple[Any, ...]:
+def _story_node_hashes(node_id: str, node: Dict[str, Any]) -> NodeHashes | None:
+    return get_node_hashes(node_id) if STORY_NODES.get(node_id) is node else None
+
+
+def _node_content_signature(node_id: str, node: Dict[str, Any]) -> Any:
+    # Story nodes carry a precomputed content hash; ad-hoc nodes are fingerprinted here.
+    hashes = _story_node_hashes(node_id, node)
+    if hashes is not None:
+        return hashes.node
     return tuple(_choice_identity(choice) for choice in node.get("choices", []))
 
 
-def get_node_choice_evaluations(node_id: str, node: Dict[str, Any]) -> List[Dict[str, Any]]:
-    """Return cached evaluations for a node's visible choices during this rerun."""
-    cache = st.session_state.setdefault("_choice_eval_cache", {})
-    cache_key = (node_id, _choice_eval_state_signature(), _node_content_signature(node))
-    cached = cache.get(cache_key)
-    if cached is not None:
-        return cached
+def get_node_choice_ids(node_id: str, node: Dict[str, Any]) -> Tuple[str, ...]:
+    """Return the stable ids of a node's choices, precomputed at compile time for story nodes."""
+    hashes = _story_node_hashes(node_id, node)
+    if hashes is not None:
+        return hashes.choice_ids
+    return choice_ids(node_id, node.get("choices", []))
 
-    evaluations: List[Dict[str, Any]] = []
+
+CHOICE_EVAL_CACHE_ENV = "CHOICE_GAME_CHOICE_CACHE_SIZE"
+DEFAULT_CHOICE_EVAL_CACHE_SIZE = 64
+SHARED_CHOICE_EVAL_CACHE_ENV = "CHOICE_GAME_SHARED_CHOICE_CACHE_SIZE"
+DEFAULT_SHARED_CHOICE_EVAL_CACHE_SIZE = 4096
+
+# Projections kept; keyed by node content hash, so entries never go stale.
+_PROJECTION_CACHE_LIMIT = 512
+_NODE_PROJECTIONS = LRUCache(_PROJECTION_CACHE_LIMIT)
+
+
+def _cache_capacity(env_name: str, default: int) -> int:
+    try:
+        return max(1, int(os.environ[env_name]))
+    except (KeyError, ValueError):
+        return default
+
+
+def _choice_eval_cache_capacity() -> int:
+    return _cache_capacity(CHOICE_EVAL_CACHE_ENV, DEFAULT_CHOICE_EVAL_CACHE_SIZE)
+
+
+def _choice_eval_cache() -> LRUCache:
+    """Return this session's evaluation cache, shared by every view rendered in a rerun."""
+    cache = st.session_state.get("_choice_eval_cache")
+    if not isinstance(cache, LRUCache):
+        cache = LRUCache(_choice_eval_cache_capacity())
+        st.session_state["_choice_eval_cache"] = cache
+    return cache
+
+
+# Process-wide, keyed by node content and the projection of state the node reads.
+_SHARED_CHOICE_EVAL_CACHE = LRUCache(
+    _cache_capacity(SHARED_CHOICE_EVAL_CACHE_ENV, DEFAULT_SHARED_CHOICE_EVAL_CACHE_SIZE)
+)
+
+
+def get_choice_eval_cache_stats() -> CacheStats:
+    """Return hit, miss and eviction counts of this session's evaluation cache."""
+    return _choice_eval_cache().stats()
+
+
+def get_shared_choice_eval_cache_stats() -> CacheStats:
+    """Return counts of the cache shared by every session in this process.
+
+    It is only consulted when a session's own cache misses, so its hits are
+    evaluations computed for another session (or an equivalent earlier state).
+    """
+    return _SHARED_CHOICE_EVAL_CACHE.stats()
+
+
+def _choices_projection(node: Dict[str, Any]) -> StateProjection:
+    requirement_sets = []
     for choice in node.get("choices", []):
-        is_valid, reason = check_requirements(choice.get("requirements"))
-        effects, resolved_next = resolve_choice_outcome(choice)
+        requirement_sets.append(choice.get("requirements"))
+        requirement_sets.extend(variant.get("requirements") for variant in choice.get("conditional_effects", []))
+    return requirements_projection(requirement_sets)
+
+
+def _node_state_projection(hashes: NodeHashes, node: Dict[str, Any]) -> StateProjection:
+    """Return the state a story node's choices read, built once per node content."""
+    projection = _NODE_PROJECTIONS.get(hashes.node)
+    if projection is None:
+        projection = _choices_projection(node)
+        _NODE_PROJECTIONS.put(hashes.node, projection)
+    return projection
+
+
+class _SessionFields:
+    """The session seen through `GameState`'s attributes, so a projection reads it without copying."""
+
+    __slots__ = ("_session",)
+
+    def __init__(self, session: Any) -> None:
+        self._session = session
+
+    @property
+    def player_class(self) -> Any:
+        return self._session.get("player_class")
+
+    @property
+    def stats(self) -> Dict[str, Any]:
+        return self._session.get("stats", {})
+
+    @property
+    def traits(self) -> Dict[str, Any]:
+        return self._session.get("traits", {})
+
+    @property
+    def inventory(self) -> List[str]:
+        return self._session.get("inventory", [])
+
+    @property
+    def flags(self) -> Dict[str, Any]:
+        return self._session.get("flags", {})
+
+    @property
+    def meta_state(self) -> Dict[str, List[str]]:
+        return normalize_meta_state(self._session.get("meta_state"))
+
+
+def _evaluate_node_choices(node_id: str, node: Dict[str, Any], state: GameState) -> List[Dict[str, Any]]:
+    evaluations: List[Dict[str, Any]] = []
+    ids = get_node_choice_ids(node_id, node)
+    for position, choice in enumerate(node.get("choices", [])):
+        is_valid, reason = check_requirements_engine(choice.get("requirements"), state)
+        effects, resolved_next = _resolve_choice_outcome(choice, state)
         evaluations.append(
             {
+                "position": position,
+                "choice_id": ids[position],
                 "choice": choice,
                 "is_available": is_valid,
                 "locked_reason": reason,
@@ -413,11 +493,71 @@ def get_node_choice_evaluations(node_id: str, node: Dict[str, Any]) -> List[Dict
                 "resolved_next": resolved_next,
             }
         )
+    return evaluations
+
+
+def shared_choice_eval_key(node_id: str, node: Dict[str, Any], state: GameState) -> Tuple[Any, ...] | None:
+    """Return the shared-cache key of a story node's evaluations for ``state`` (None for other nodes)."""
+    hashes = _story_node_hashes(node_id, node)
+    if hashes is None:
+        return None
+    return (node_id, hashes.node, _node_state_projection(hashes, node).project(state))
+
+
+def is_shared_choice_eval_cached(key: Tuple[Any, ...]) -> bool:
+    """Return whether the shared cache holds ``key``, without counting a lookup."""
+    return key in _SHARED_CHOICE_EVAL_CACHE
+
+
+def prefetch_choice_evaluations(node_id: str, node: Dict[str, Any], state: GameState) -> bool:
+    """Evaluate a story node's choices for ``state`` into the shared cache, ahead of a visit.
+
+    Safe off the script thread: reads neither the session nor its cache.
+    Returns False for nodes outside the story or states already cached.
+    """
+    shared_key = shared_choice_eval_key(node_id, node, state)
+    if shared_key is None or shared_key in _SHARED_CHOICE_EVAL_CACHE:
+        return False
+    _SHARED_CHOICE_EVAL_CACHE.put(shared_key, _evaluate_node_choices(node_id, node, state))
+    return True
+
+
+def get_node_choice_evaluations(node_id: str, node: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Return evaluations for a node's visible choices, cached per node, content and state.
+
+    Entries are kept in a per-session LRU keyed, like the shared one, by the
+    node's content and the state fields its requirements read (projected
+    straight from the session), so revisiting a hub or undoing a choice finds
+    the earlier results instead of re-evaluating them. On a miss,
+    story nodes fall back to a process-wide LRU keyed by the node's content
+    and only the state fields its requirements read, so sessions whose states
+    differ elsewhere share one evaluation. Entries are shared: treat them as
+    read-only.
+    """
+    cache = _choice_eval_cache()
+    hashes = _story_node_hashes(node_id, node)
+    session = _SessionFields(st.session_state)
+    if hashes is not None:
+        # The same key as the shared cache: node content plus only the fields its requirements read.
+        cache_key = (node_id, hashes.node, _node_state_projection(hashes, node).project(session))
+    else:
+        cache_key = (node_id, _node_content_signature(node_id, node), _choices_projection(node).project(session))
+    cached = cache.get(cache_key)
+    if cached is not None:
+        return cached
 
-    cache[cache_key] = evaluations
-    if len(cache) > 24:
-        cache.clear()
-        cache[cache_key] = evaluations
+    state = state_from_session(st.session_state)
+    shared_key = cache_key if hashes is not None else None
+    if shared_key is not None:
+        evaluations = _SHARED_CHOICE_EVAL_CACHE.get(shared_key)
+        if evaluations is not None:
+            cache.put(cache_key, evaluations)
+            return evaluations
+
+    evaluations = _evaluate_node_choices(node_id, node, state)
+    cache.put(cache_key, evaluations)
+    if shared_key is not None:
+        _SHARED_CHOICE_EVAL_CACHE.put(shared_key, evaluations)
     return evaluations
 
 
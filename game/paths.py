@@ -0,0 +1,18 @@
+"""Per-user locations for persistent game data and rebuildable caches."""
+
+from __future__ import annotations
+
+import os
+from pathlib import Path
+
+
+def user_data_dir() -> Path:
+    """Return the per-user directory that holds persistent game data."""
+    base = os.environ.get("LOCALAPPDATA") or os.environ.get("APPDATA")
+    root = Path(base) if base else Path.home()
+    return root / "choice-game"
+
+
+def user_cache_dir() -> Path:
+    """Return the directory for derived data that is safe to delete."""
+    return user_data_dir() / "cache"
@@ -0,0 +1,44 @@
+"""Save formats and persistence built on top of game-state snapshots."""
+
+from game.saves.autosave import (
+    AutosaveService,
+    autosave_session,
+    discard_autosaves,
+    find_autosave_offer,
+    get_autosave_service,
+    session_id,
+)
+from game.saves.replay import (
+    REPLAY_SAVE_FORMAT,
+    REPLAY_SAVE_VERSION,
+    build_replay_save,
+    content_hashes,
+    is_replay_save,
+    load_replay_save,
+    replay_state_hash,
+    restore_autosave,
+    validate_replay_save,
+)
+from game.saves.store import SaveStore, SlotInfo, default_save_store_path, get_save_store
+
+__all__ = [
+    "AutosaveService",
+    "REPLAY_SAVE_FORMAT",
+    "REPLAY_SAVE_VERSION",
+    "SaveStore",
+    "SlotInfo",
+    "autosave_session",
+    "build_replay_save",
+    "content_hashes",
+    "default_save_store_path",
+    "discard_autosaves",
+    "find_autosave_offer",
+    "get_autosave_service",
+    "get_save_store",
+    "is_replay_save",
+    "load_replay_save",
+    "replay_state_hash",
+    "restore_autosave",
+    "session_id",
+    "validate_replay_save",
+]
@@ -0,0 +1,338 @@
+"""Background autosave with per-session delta journals.
+
+Every `execute_choice` hands the snapshot it already took for undo (the state
+the choice was made in, tagged with the decision) to a single writer thread
+and returns immediately; restoring re-takes that decision through the engine
+(see `game.saves.replay.restore_autosave`). The writer coalesces queued snapshots per session (only the
+newest one in each flush window is written), appends just the fields that
+changed since that session's last write to its journal, and rewrites the
+journal as a single base entry once enough deltas pile up. Disk I/O is
+therefore bounded by the number of active sessions per flush window, not by
+how fast players click.
+
+Journals are JSON lines: one ``base`` entry holding a full snapshot followed
+by ``delta`` entries. List fields that only grew (decision history, event
+log, visited nodes) are stored as their appended tail.
+
+The writer remembers the last snapshot of only the most recently written
+sessions (a forgotten one simply starts its journal over with a base entry),
+and journals untouched for `AUTOSAVE_MAX_AGE` are deleted, so neither memory
+nor disk grows with the total number of sessions ever seen.
+
+Autosaves are keyed by the ``session`` query parameter alone: whoever opens
+a URL carrying it is offered that session's autosave. Treat the URL like a
+password and do not share it.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import queue
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from game.streamlit_compat import st
+
+from game.engine.cache import LRUCache
+from game.paths import user_data_dir
+from game.state import persistence_suspended, snapshot_state
+
+# Seconds the writer waits to coalesce further snapshots into one batch.
+AUTOSAVE_FLUSH_INTERVAL = 0.5
+# Snapshot key holding the decision taken on an autosaved state, re-taken on restore.
+AUTOSAVE_DECISION_KEY = "autosave_decision"
+# Journals are compacted back to a single base entry after this many deltas.
+AUTOSAVE_COMPACT_EVERY = 25
+# Sessions whose last written snapshot is kept in memory for delta encoding.
+AUTOSAVE_TRACKED_SESSIONS = 256
+# Journals not written for this many seconds are deleted.
+AUTOSAVE_MAX_AGE = 30 * 24 * 60 * 60
+# Seconds between sweeps for expired journals.
+AUTOSAVE_PRUNE_INTERVAL = 60 * 60
+
+
+def _autosave_enabled() -> bool:
+    return "PYTEST_CURRENT_TEST" not in os.environ
+
+
+def default_autosave_dir() -> Path:
+    """Return the directory holding per-session autosave journals."""
+    return user_data_dir() / "autosaves"
+
+
+def _compute_delta(previous: Dict[str, Any], current: Dict[str, Any]) -> Dict[str, Any]:
+    changed: Dict[str, Any] = {}
+    extended: Dict[str, List[Any]] = {}
+    for key, value in current.items():
+        old = previous.get(key)
+        if key in previous and old == value:
+            continue
+        if isinstance(old, list) and isinstance(value, list) and len(value) > len(old) and value[: len(old)] == old:
+            extended[key] = value[len(old):]
+        else:
+            changed[key] = value
+    delta: Dict[str, Any] = {}
+    if changed:
+        delta["set"] = changed
+    if extended:
+        delta["extend"] = extended
+    removed = [key for key in previous if key not in current]
+    if removed:
+        delta["remove"] = removed
+    return delta
+
+
+def _apply_delta(state: Dict[str, Any], delta: Dict[str, Any]) -> None:
+    state.update(delta.get("set", {}))
+    for key, tail in delta.get("extend", {}).items():
+        state[key] = list(state.get(key, [])) + tail
+    for key in delta.get("remove", []):
+        state.pop(key, None)
+
+
+def read_journal(path: Path) -> Optional[Dict[str, Any]]:
+    """Rebuild the latest snapshot from a journal, or None if it is unusable.
+
+    A torn final line (e.g. from a crash mid-write) is ignored.
+    """
+    try:
+        lines = path.read_text(encoding="utf-8").splitlines()
+    except OSError:
+        return None
+    state: Optional[Dict[str, Any]] = None
+    for line in lines:
+        try:
+            entry = json.loads(line)
+        except json.JSONDecodeError:
+            break
+        if entry.get("op") == "base":
+            state = entry["state"]
+        elif entry.get("op") == "delta" and state is not None:
+            _apply_delta(state, entry)
+    return state
+
+
+class AutosaveService:
+    """Single background writer shared by every session in the process."""
+
+    def __init__(
+        self,
+        directory: Path,
+        *,
+        flush_interval: float = AUTOSAVE_FLUSH_INTERVAL,
+        tracked_sessions: int = AUTOSAVE_TRACKED_SESSIONS,
+        max_age: float = AUTOSAVE_MAX_AGE,
+    ) -> None:
+        self.directory = Path(directory)
+        self.flush_interval = flush_interval
+        self.max_age = max_age
+        self._queue: "queue.Queue[tuple[str, Any]]" = queue.Queue()
+        # key -> (last written snapshot, deltas since the base entry)
+        self._journals = LRUCache(tracked_sessions)
+        self._last_pruned = 0.0
+        self._thread: Optional[threading.Thread] = None
+        self._thread_lock = threading.Lock()
+
+    def journal_path(self, key: str) -> Path:
+        """Return the journal file for a session or player key."""
+        digest = hashlib.sha256(key.encode("utf-8")).hexdigest()[:24]
+        return self.directory / f"{digest}.jsonl"
+
+    def submit(self, key: str, snapshot: Dict[str, Any]) -> None:
+        """Queue a snapshot for ``key`` without blocking the caller."""
+        self._ensure_thread()
+        self._queue.put((key, snapshot))
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Block until everything queued so far has been written."""
+        done = threading.Event()
+        self._ensure_thread()
+        self._queue.put(("", done))
+        return done.wait(timeout)
+
+    def latest(self, key: str) -> Optional[tuple[Dict[str, Any], float]]:
+        """Return the newest autosave for ``key`` and its modification time."""
+        path = self.journal_path(key)
+        try:
+            mtime = path.stat().st_mtime
+        except OSError:
+            return None
+        state = read_journal(path)
+        return (state, mtime) if state is not None else None
+
+    def discard(self, key: str) -> None:
+        """Delete the journal for ``key``; later saves start a fresh base."""
+        self._queue.put((key, None))
+
+    def prune_journals(self) -> int:
+        """Delete journals not written for `max_age` seconds; returns how many were removed."""
+        cutoff = time.time() - self.max_age
+        removed = 0
+        try:
+            journals = list(self.directory.glob("*.jsonl"))
+        except OSError:
+            return 0
+        for path in journals:
+            try:
+                if path.stat().st_mtime < cutoff:
+                    path.unlink()
+                    removed += 1
+            except OSError:
+                continue
+        return removed
+
+    def _ensure_thread(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._thread_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="autosave-writer", daemon=True)
+                self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.flush_interval
+            waiters: List[threading.Event] = []
+            while True:
+                if isinstance(batch[-1][1], threading.Event):
+                    # A flush request ends the window early.
+                    waiters.append(batch.pop()[1])
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+
+            pending: Dict[str, Optional[Dict[str, Any]]] = {}
+            for key, snapshot in batch:
+                pending[key] = snapshot
+            for key, snapshot in pending.items():
+                try:
+                    if snapshot is None:
+                        self._discard(key)
+                    else:
+                        self._write(key, snapshot)
+                except OSError:
+                    # Autosave is best effort; a failed write must never surface in gameplay.
+                    self._journals.pop(key)
+            if time.monotonic() - self._last_pruned >= AUTOSAVE_PRUNE_INTERVAL:
+                self._last_pruned = time.monotonic()
+                self.prune_journals()
+            for waiter in waiters:
+                waiter.set()
+
+    def _write(self, key: str, snapshot: Dict[str, Any]) -> None:
+        path = self.journal_path(key)
+        tracked = self._journals.get(key)
+        # Untracked (new or forgotten) sessions and pruned journals start over with a base.
+        if tracked is None or tracked[1] >= AUTOSAVE_COMPACT_EVERY or not path.exists():
+            self._write_base(path, key, snapshot)
+            count = 0
+        else:
+            previous, count = tracked
+            delta = _compute_delta(previous, snapshot)
+            if not delta:
+                return
+            with path.open("a", encoding="utf-8") as handle:
+                handle.write(json.dumps({"op": "delta", "at": time.time(), **delta}, separators=(",", ":")) + "\n")
+            count += 1
+        self._journals.put(key, (snapshot, count))
+
+    def _write_base(self, path: Path, key: str, snapshot: Dict[str, Any]) -> None:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        entry = {"op": "base", "key": key, "at": time.time(), "state": snapshot}
+        tmp = path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(entry, separators=(",", ":")) + "\n", encoding="utf-8")
+        tmp.replace(path)
+
+    def _discard(self, key: str) -> None:
+        self._journals.pop(key)
+        self.journal_path(key).unlink(missing_ok=True)
+
+
+_SERVICE: Optional[AutosaveService] = None
+_SERVICE_LOCK = threading.Lock()
+
+
+def get_autosave_service() -> AutosaveService:
+    """Return the process-wide autosave writer."""
+    global _SERVICE
+    if _SERVICE is None:
+        with _SERVICE_LOCK:
+            if _SERVICE is None:
+                _SERVICE = AutosaveService(default_autosave_dir())
+    return _SERVICE
+
+
+# ---------------------------------------------------------------------------
+# Session integration
+# ---------------------------------------------------------------------------
+
+
+def session_id() -> str:
+    """Return an id for this browser session that survives a page refresh.
+
+    The id is mirrored into the ``session`` query parameter when Streamlit is
+    available, so reloading the page resolves to the same autosave and save
+    slots. It is the only thing scoping them: whoever has the URL has both.
+    """
+    session_id = st.session_state.get("autosave_session_id")
+    if session_id:
+        return session_id
+    params = getattr(st, "query_params", None)
+    if params is not None:
+        session_id = params.get("session")
+    if not session_id:
+        session_id = uuid.uuid4().hex
+        if params is not None:
+            params["session"] = session_id
+    st.session_state.autosave_session_id = session_id
+    return session_id
+
+
+def _autosave_key() -> str:
+    return f"session:{session_id()}"
+
+
+def autosave_session(snapshot: Optional[Dict[str, Any]] = None, decision: Optional[Dict[str, Any]] = None) -> None:
+    """Queue the run for a background autosave (skipped under `suspend_persistence`).
+
+    `execute_choice` passes the snapshot it took for undo and the decision
+    taken on it, so no second snapshot is needed; without them the current
+    state is snapshotted. The snapshot is shared, not copied: never mutate it.
+    """
+    if not _autosave_enabled() or persistence_suspended() or not st.session_state.get("player_class"):
+        return
+    if snapshot is None:
+        snapshot = snapshot_state()
+    if decision is not None:
+        snapshot = {**snapshot, AUTOSAVE_DECISION_KEY: decision}
+    get_autosave_service().submit(_autosave_key(), snapshot)
+
+
+def find_autosave_offer() -> Optional[Dict[str, Any]]:
+    """Return this session's autosave, if any."""
+    if not _autosave_enabled():
+        return None
+    key = _autosave_key()
+    found = get_autosave_service().latest(key)
+    if found is None:
+        return None
+    state, saved_at = found
+    return {"key": key, "saved_at": saved_at, "snapshot": state}
+
+
+def discard_autosaves() -> None:
+    """Forget this session's autosave, e.g. after the player declines a restore."""
+    if not _autosave_enabled():
+        return
+    get_autosave_service().discard(_autosave_key())
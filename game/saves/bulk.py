@@ -0,0 +1,235 @@
+"""Bulk validation and migration of stored saves.
+
+Used after content changes to check every stored save against the current
+story: each save is migrated and schema-validated, then checked for
+references the story no longer has (unknown flags, removed nodes); replay
+saves are checked against the story and copied through unchanged. Saves are
+streamed from a directory of JSON files or a save-slot database and fanned
+out over a process pool with a bounded number of saves in flight, so memory
+stays flat regardless of how many saves there are.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import re
+import sqlite3
+from collections import Counter
+from concurrent.futures import FIRST_COMPLETED, Executor, Future, ProcessPoolExecutor, wait
+from dataclasses import dataclass, field
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+
+from game.data import STORY_NODES, get_story_indexes
+from game.saves.replay import is_replay_save, validate_replay_save
+from game.saves.store import SaveStore
+from game.snapshot_schema import prepare_snapshot
+
+# Example save references kept per distinct error/warning in the report.
+_MAX_EXAMPLES = 5
+# Saves queued per worker; bounds memory when the source is huge.
+_IN_FLIGHT_PER_WORKER = 8
+# Rows fetched per database round trip when streaming a save-slot database.
+_DB_FETCH_SIZE = 256
+
+
+@dataclass(slots=True)
+class SaveAudit:
+    """Outcome of checking one save against the current content."""
+
+    ref: str
+    status: str  # "ok", "migrated", "invalid" or "unreadable"
+    from_version: Optional[int] = None
+    errors: List[str] = field(default_factory=list)
+    warnings: List[str] = field(default_factory=list)
+    migrated: Optional[Dict[str, Any]] = None
+    slot: Optional[tuple[str, str]] = None  # (player_key, slot_name) for database saves
+
+
+@lru_cache(maxsize=1)
+def _known_flags() -> frozenset[str]:
+    return frozenset(get_story_indexes()["known_flags"])
+
+
+def audit_snapshot(ref: str, payload: Any) -> SaveAudit:
+    """Migrate and validate one parsed save, flagging stale content references."""
+    if is_replay_save(payload):
+        # Replay saves have no snapshot to migrate; they only need matching content
+        # and are copied to the output unchanged.
+        ok, errors = validate_replay_save(payload)
+        return SaveAudit(ref, "ok" if ok else "invalid", errors=errors, migrated=payload if ok else None)
+
+    from_version = payload.get("save_version", 1) if isinstance(payload, dict) else None
+    migrated, errors = prepare_snapshot(payload)
+    if migrated is None:
+        return SaveAudit(ref, "invalid", from_version, errors)
+
+    warnings: List[str] = []
+    known_flags = _known_flags()
+    for flag in migrated["flags"]:
+        if flag not in known_flags:
+            warnings.append(f"$.flags.{flag}: Flag is not set anywhere in the story.")
+    for index, node_id in enumerate(migrated.get("visited_nodes", [])):
+        if node_id not in STORY_NODES:
+            warnings.append(f"$.visited_nodes[{index}]: Visited node no longer exists in story.")
+    pending = migrated.get("pending_choice_confirmation")
+    if pending and pending.get("node") not in STORY_NODES:
+        errors.append("$.pending_choice_confirmation.node: Pending choice node no longer exists in story.")
+        return SaveAudit(ref, "invalid", from_version, errors, warnings)
+
+    status = "ok" if from_version == migrated["save_version"] else "migrated"
+    return SaveAudit(ref, status, from_version, errors, warnings, migrated)
+
+
+# ---------------------------------------------------------------------------
+# Workers (module-level so they can be pickled into the process pool)
+# ---------------------------------------------------------------------------
+
+
+def _audit_file(path: str, root: str, out_dir: Optional[str]) -> SaveAudit:
+    relative = Path(path).relative_to(root)
+    try:
+        payload = json.loads(Path(path).read_text(encoding="utf-8"))
+    except (OSError, UnicodeDecodeError, json.JSONDecodeError) as exc:
+        return SaveAudit(str(relative), "unreadable", errors=[f"$: Could not read save: {exc}."])
+    audit = audit_snapshot(str(relative), payload)
+    if out_dir is not None and audit.migrated is not None:
+        target = Path(out_dir) / relative
+        target.parent.mkdir(parents=True, exist_ok=True)
+        target.write_text(json.dumps(audit.migrated, indent=2), encoding="utf-8")
+    # The output is on disk already; don't ship the payload back to the parent.
+    audit.migrated = None
+    return audit
+
+
+def _audit_blob(player_key: str, slot_name: str, text: str) -> SaveAudit:
+    ref = f"{player_key}/{slot_name}"
+    try:
+        payload = json.loads(text)
+    except json.JSONDecodeError as exc:
+        return SaveAudit(ref, "unreadable", errors=[f"$: Could not parse save: {exc}."])
+    audit = audit_snapshot(ref, payload)
+    audit.slot = (player_key, slot_name)
+    return audit
+
+
+# ---------------------------------------------------------------------------
+# Report
+# ---------------------------------------------------------------------------
+
+
+_INDEX_PATTERN = re.compile(r"\[\d+\]")
+
+
+@dataclass(slots=True)
+class BulkReport:
+    """Aggregate results; per-save detail is limited to a few examples."""
+
+    total: int = 0
+    statuses: Counter = field(default_factory=Counter)
+    source_versions: Counter = field(default_factory=Counter)
+    errors: Counter = field(default_factory=Counter)
+    warnings: Counter = field(default_factory=Counter)
+    examples: Dict[str, List[str]] = field(default_factory=dict)
+
+    def add(self, audit: SaveAudit) -> None:
+        self.total += 1
+        self.statuses[audit.status] += 1
+        self.source_versions[str(audit.from_version)] += 1
+        for counter, messages in ((self.errors, audit.errors), (self.warnings, audit.warnings)):
+            # Collapse list indices so the same problem in different entries aggregates.
+            for message in dict.fromkeys(_INDEX_PATTERN.sub("[*]", message) for message in messages):
+                counter[message] += 1
+                refs = self.examples.setdefault(message, [])
+                if len(refs) < _MAX_EXAMPLES:
+                    refs.append(audit.ref)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "total": self.total,
+            "statuses": dict(self.statuses),
+            "source_versions": dict(self.source_versions),
+            "errors": [
+                {"message": message, "count": count, "examples": self.examples[message]}
+                for message, count in self.errors.most_common()
+            ],
+            "warnings": [
+                {"message": message, "count": count, "examples": self.examples[message]}
+                for message, count in self.warnings.most_common()
+            ],
+        }
+
+
+# ---------------------------------------------------------------------------
+# Drivers
+# ---------------------------------------------------------------------------
+
+
+def _bounded_map(executor: Executor, fn: Callable[..., SaveAudit], jobs: Iterable[tuple], limit: int) -> Iterator[SaveAudit]:
+    """Like ``executor.map`` but never holds more than ``limit`` pending jobs."""
+    pending: set[Future] = set()
+    for job in jobs:
+        pending.add(executor.submit(fn, *job))
+        if len(pending) >= limit:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield future.result()
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            yield future.result()
+
+
+def _iter_store_rows(db_path: Path) -> Iterator[tuple[str, str, str]]:
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    try:
+        cursor = conn.execute(
+            """
+            SELECT save_slots.player_key, save_slots.slot_name, save_blobs.payload
+            FROM save_slots JOIN save_blobs ON save_blobs.slot_id = save_slots.id
+            ORDER BY save_slots.id
+            """
+        )
+        while True:
+            rows = cursor.fetchmany(_DB_FETCH_SIZE)
+            if not rows:
+                return
+            yield from rows
+    finally:
+        conn.close()
+
+
+def migrate_save_directory(source: Path, out_dir: Optional[Path], *, workers: Optional[int] = None) -> BulkReport:
+    """Audit every ``*.json`` save under ``source``, writing migrated copies to ``out_dir``."""
+    report = BulkReport()
+    root = str(source)
+    out = str(out_dir) if out_dir is not None else None
+    skip = out_dir.resolve() if out_dir is not None else None
+    jobs = (
+        (str(path), root, out)
+        for path in source.rglob("*.json")
+        if skip is None or not path.resolve().is_relative_to(skip)
+    )
+    workers = workers or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        limit = _IN_FLIGHT_PER_WORKER * workers
+        for audit in _bounded_map(executor, _audit_file, jobs, limit):
+            report.add(audit)
+    return report
+
+
+def migrate_save_store(db_path: Path, out_store: Optional[SaveStore], *, workers: Optional[int] = None) -> BulkReport:
+    """Audit every slot in a save-slot database, writing migrated slots to ``out_store``."""
+    report = BulkReport()
+    jobs = _iter_store_rows(db_path)
+    workers = workers or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        limit = _IN_FLIGHT_PER_WORKER * workers
+        for audit in _bounded_map(executor, _audit_blob, jobs, limit):
+            if out_store is not None and audit.migrated is not None:
+                out_store.save_slot(*audit.slot, audit.migrated)
+            audit.migrated = None
+            report.add(audit)
+    return report
@@ -0,0 +1,303 @@
+"""Replay-based saves.
+
+The game is fully deterministic, so a run is defined by its class, the meta
+state it started with, and the decisions taken since. A replay save stores
+only those inputs, the content hashes they were recorded against, and the
+full checkpoints kept every ``REPLAY_CHECKPOINT_INTERVAL`` decisions. Loading
+restores the nearest checkpoint and replays the remaining decisions through
+the engine, so it never replays more than one interval.
+
+The story is identified by the Merkle root of its compiled nodes, so only
+edits that change a node invalidate saves; reformatting a source or the
+simplifier does not. A save carries its decision list and one checkpoint,
+which puts it at roughly the size of a snapshot export: what it adds is
+content verification and a bounded load, not a smaller file.
+"""
+
+from __future__ import annotations
+
+import copy
+import hashlib
+import json
+from typing import Any, Dict, List, Optional
+
+from game.streamlit_compat import st
+
+from game.content.surprise_events import SURPRISE_EVENTS
+from game.data import CLASS_TEMPLATES, STORY_NODES, get_story_merkle_root
+from game.logic import (
+    apply_node_auto_choices,
+    check_requirements,
+    execute_choice,
+    get_node_choice_ids,
+    should_force_injury_redirect,
+    transition_to,
+    transition_to_failure,
+)
+from game.saves.autosave import AUTOSAVE_DECISION_KEY, autosave_session
+from game.snapshot_schema import prepare_snapshot
+from game.state import (
+    REPLAY_CHECKPOINT_INTERVAL,
+    _SNAPSHOT_FIELDS,
+    _merge_meta_state,
+    begin_run,
+    load_snapshot,
+    normalize_meta_state,
+    persist_meta_state,
+    snapshot_state,
+    suspend_persistence,
+)
+
+REPLAY_SAVE_FORMAT = "replay"
+REPLAY_SAVE_VERSION = 1
+
+# Fields a replay must reproduce exactly; the rest is presentation state.
+_VERIFIED_FIELDS = (
+    "player_class", "current_node", "stats", "inventory", "flags", "traits",
+    "factions", "seen_events", "decision_history", "visited_nodes", "visited_edges",
+)
+
+# Upper bound on automatic redirects settled between two decisions.
+_MAX_SETTLE_STEPS = 8
+
+
+def _digest(value: Any) -> str:
+    encoded = json.dumps(value, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+def content_hashes() -> Dict[str, str]:
+    """Return digests of every content source that influences a replay."""
+    return {
+        "story": get_story_merkle_root(),
+        "classes": _digest(CLASS_TEMPLATES),
+        "surprise_events": _digest(SURPRISE_EVENTS),
+    }
+
+
+def replay_state_hash(snapshot: Dict[str, Any]) -> str:
+    """Digest the gameplay fields of a snapshot that a replay must reproduce."""
+    return _digest({key: snapshot.get(key) for key in _VERIFIED_FIELDS})
+
+
+def build_replay_save(*, max_checkpoints: int = 1) -> Dict[str, Any]:
+    """Build a compact replay save for the current run.
+
+    Loading only ever needs the nearest checkpoint, so by default just the most
+    recent one is embedded; raise ``max_checkpoints`` to keep more of them.
+    """
+    decisions = copy.deepcopy(st.session_state.decision_history)
+    checkpoints: List[Dict[str, Any]] = []
+    for checkpoint in st.session_state.get("replay_checkpoints", []):
+        index = checkpoint["decision_index"]
+        state = checkpoint["state"]
+        # Skip checkpoints left over from branches that were undone.
+        if index > len(decisions) or state.get("decision_history") != decisions[:index]:
+            continue
+        # The decision prefix is implied by the decision list; don't store it twice.
+        compact = {key: copy.deepcopy(value) for key, value in state.items() if key != "decision_history"}
+        checkpoints.append({"decision_index": index, "state": compact})
+    checkpoints = checkpoints[-max_checkpoints:] if max_checkpoints > 0 else []
+
+    return {
+        "format": REPLAY_SAVE_FORMAT,
+        "version": REPLAY_SAVE_VERSION,
+        "content_hashes": content_hashes(),
+        "player_class": st.session_state.player_class,
+        "starting_meta_state": normalize_meta_state(st.session_state.get("starting_meta_state")),
+        "decisions": decisions,
+        "checkpoint_interval": REPLAY_CHECKPOINT_INTERVAL,
+        "checkpoints": checkpoints,
+        "state_hash": replay_state_hash(snapshot_state()),
+    }
+
+
+def is_replay_save(payload: Any) -> bool:
+    """Return whether a parsed save payload uses the replay format."""
+    return isinstance(payload, dict) and payload.get("format") == REPLAY_SAVE_FORMAT
+
+
+def validate_replay_save(payload: Dict[str, Any]) -> tuple[bool, list[str]]:
+    """Validate a replay save's structure and that it matches the loaded content."""
+    errors: list[str] = []
+    if payload.get("version") != REPLAY_SAVE_VERSION:
+        errors.append(f"Unsupported replay save version: {payload.get('version')!r}.")
+        return False, errors
+    if payload.get("player_class") not in CLASS_TEMPLATES:
+        errors.append("Unknown player_class in save payload.")
+
+    recorded_hashes = payload.get("content_hashes")
+    if not isinstance(recorded_hashes, dict):
+        errors.append("Replay save is missing its content hashes.")
+    else:
+        for name, digest in content_hashes().items():
+            if recorded_hashes.get(name) != digest:
+                errors.append(f"Story content changed since this save was made ({name} hash mismatch).")
+
+    decisions = payload.get("decisions")
+    if not isinstance(decisions, list):
+        errors.append("Decisions payload must be a list.")
+    elif any(
+        not isinstance(entry, dict) or not isinstance(entry.get("node"), str) or not isinstance(entry.get("choice"), str)
+        for entry in decisions
+    ):
+        errors.append("Decision entries must be objects with string 'node' and 'choice'.")
+
+    if not isinstance(payload.get("starting_meta_state"), dict):
+        errors.append("Starting meta state payload must be an object.")
+    if not isinstance(payload.get("state_hash"), str):
+        errors.append("Replay save is missing its state hash.")
+
+    checkpoints = payload.get("checkpoints", [])
+    if not isinstance(checkpoints, list):
+        errors.append("Checkpoints payload must be a list.")
+    elif isinstance(decisions, list):
+        for checkpoint in checkpoints:
+            index = checkpoint.get("decision_index") if isinstance(checkpoint, dict) else None
+            if not isinstance(index, int) or not 0 <= index <= len(decisions) or not isinstance(checkpoint.get("state"), dict):
+                errors.append("Checkpoint entries must have a valid decision_index and state.")
+                break
+
+    return not errors, errors
+
+
+def _settle_current_node() -> None:
+    """Apply the automatic steps `render_node` performs before offering choices."""
+    for _ in range(_MAX_SETTLE_STEPS):
+        node_id = st.session_state.current_node
+        if node_id not in STORY_NODES:
+            transition_to("death")
+            return
+        node = STORY_NODES[node_id]
+        node_ok, _ = check_requirements(node.get("requirements"))
+        if not node_ok:
+            transition_to_failure("traitor")
+            continue
+        if st.session_state.pending_auto_death:
+            return
+        apply_node_auto_choices(node_id, node)
+        if st.session_state.pending_auto_death:
+            return
+        if should_force_injury_redirect(node_id, st.session_state.stats["hp"]):
+            transition_to_failure("injured")
+            continue
+        return
+
+
+def _find_decision_choice(node_id: str, decision: Dict[str, str]) -> Optional[Dict[str, Any]]:
+    node = STORY_NODES.get(node_id)
+    if node is None:
+        return None
+    # Decisions recorded with a choice id match on it; older ones match on the label.
+    choice_id = decision.get("choice_id")
+    ids = get_node_choice_ids(node_id, node) if choice_id is not None else ()
+    for position, choice in enumerate(node.get("choices", [])):
+        matches = ids[position] == choice_id if choice_id is not None else choice.get("label") == decision["choice"]
+        if not matches:
+            continue
+        is_valid, _ = check_requirements(choice.get("requirements"))
+        if is_valid:
+            return choice
+    return None
+
+
+def _restore_checkpoint(payload: Dict[str, Any], decisions: List[Dict[str, str]]) -> int:
+    """Restore the nearest usable checkpoint and return its decision index."""
+    candidates = [
+        checkpoint
+        for checkpoint in payload.get("checkpoints", [])
+        if checkpoint["decision_index"] <= len(decisions)
+    ]
+    for checkpoint in sorted(candidates, key=lambda entry: entry["decision_index"], reverse=True):
+        index = checkpoint["decision_index"]
+        state, _ = prepare_snapshot({**copy.deepcopy(checkpoint["state"]), "decision_history": copy.deepcopy(decisions[:index])})
+        if state is None:
+            continue
+        for key in _SNAPSHOT_FIELDS:
+            if key in state:
+                setattr(st.session_state, key, state[key])
+        # Replays must see the exact meta state the run had, not a merged one.
+        st.session_state.meta_state = normalize_meta_state(state.get("meta_state"))
+        st.session_state.history = []
+        st.session_state.replay_checkpoints = [
+            {
+                "decision_index": entry["decision_index"],
+                "state": {**copy.deepcopy(entry["state"]), "decision_history": copy.deepcopy(decisions[: entry["decision_index"]])},
+            }
+            for entry in sorted(candidates, key=lambda entry: entry["decision_index"])
+            if entry["decision_index"] <= index
+        ]
+        return index
+
+    begin_run(payload["player_class"], payload["starting_meta_state"])
+    return 0
+
+
+def load_replay_save(payload: Dict[str, Any]) -> tuple[bool, list[str]]:
+    """Rebuild run state from a replay save.
+
+    Nothing reaches disk while decisions replay: meta progression is
+    persisted and the run autosaved once, on success. On any failure the
+    session is left exactly as it was before the call.
+    """
+    ok, errors = validate_replay_save(payload)
+    if not ok:
+        return False, errors
+
+    previous_state = snapshot_state()
+    previous_history = st.session_state.get("history", [])
+    previous_checkpoints = st.session_state.get("replay_checkpoints", [])
+    previous_meta = normalize_meta_state(st.session_state.get("meta_state"))
+
+    def rollback() -> None:
+        load_snapshot(previous_state)
+        # load_snapshot merges meta state; unlocks from the failed replay must not survive.
+        st.session_state.meta_state = previous_meta
+        st.session_state.history = previous_history
+        st.session_state.replay_checkpoints = previous_checkpoints
+
+    with suspend_persistence():
+        error = _replay_decisions(payload)
+    if error is not None:
+        rollback()
+        return False, [error]
+
+    st.session_state.meta_state = _merge_meta_state(previous_meta, st.session_state.meta_state)
+    persist_meta_state(st.session_state.meta_state)
+    st.session_state.history = []
+    st.session_state.pending_choice_confirmation = None
+    autosave_session()
+    return True, []
+
+
+def _replay_decisions(payload: Dict[str, Any]) -> Optional[str]:
+    """Replay the save's decisions onto the session; returns why it failed, or None."""
+    decisions: List[Dict[str, str]] = payload["decisions"]
+    start_index = _restore_checkpoint(payload, decisions)
+    for position, decision in enumerate(decisions[start_index:], start=start_index + 1):
+        _settle_current_node()
+        node_id = st.session_state.current_node
+        if node_id != decision["node"]:
+            return f"Replay diverged at decision {position}: expected node '{decision['node']}', reached '{node_id}'."
+        choice = _find_decision_choice(node_id, decision)
+        if choice is None:
+            return f"Replay diverged at decision {position}: '{decision['choice']}' is unavailable in '{node_id}'."
+        execute_choice(node_id, decision["choice"], choice, decision.get("choice_id"))
+    _settle_current_node()
+
+    if replay_state_hash(snapshot_state()) != payload["state_hash"]:
+        return "Replay finished in a different state than the one that was saved."
+    return None
+
+
+def restore_autosave(snapshot: Dict[str, Any]) -> None:
+    """Load a validated autosave, then re-take the decision it was saved with (see `autosave_session`)."""
+    load_snapshot(snapshot)
+    decision = snapshot.get(AUTOSAVE_DECISION_KEY)
+    if not isinstance(decision, dict) or not isinstance(decision.get("choice"), str):
+        return
+    node_id = st.session_state.current_node
+    choice = _find_decision_choice(node_id, decision) if decision.get("node") == node_id else None
+    # Content that changed since the save leaves the player on the node, to choose again.
+    if choice is not None:
+        execute_choice(node_id, decision["choice"], choice, decision.get("choice_id"))
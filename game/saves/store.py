@@ -0,0 +1,209 @@
+"""SQLite-backed named save slots.
+
+Slot metadata (class, node, phase, decision count, timestamp) lives in its
+own indexed table so listing slots never touches save payloads; payloads sit
+in a separate blob table and are only parsed when a slot is loaded.
+
+The database runs in WAL mode and every thread gets its own connection, so
+concurrent Streamlit sessions can list while others write.
+"""
+
+from __future__ import annotations
+
+import json
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from game.engine.state_machine import get_phase
+from game.paths import user_data_dir
+
+_SCHEMA = (
+    """
+    CREATE TABLE IF NOT EXISTS save_slots (
+        id INTEGER PRIMARY KEY,
+        player_key TEXT NOT NULL,
+        slot_name TEXT NOT NULL,
+        player_class TEXT,
+        current_node TEXT,
+        phase TEXT,
+        decision_count INTEGER NOT NULL DEFAULT 0,
+        updated_at REAL NOT NULL,
+        UNIQUE (player_key, slot_name)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS save_blobs (
+        slot_id INTEGER PRIMARY KEY REFERENCES save_slots(id) ON DELETE CASCADE,
+        payload TEXT NOT NULL
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_save_slots_player_updated ON save_slots (player_key, updated_at DESC)",
+    "CREATE INDEX IF NOT EXISTS idx_save_slots_class ON save_slots (player_class)",
+    "CREATE INDEX IF NOT EXISTS idx_save_slots_node ON save_slots (current_node)",
+    "CREATE INDEX IF NOT EXISTS idx_save_slots_phase ON save_slots (phase)",
+    "CREATE INDEX IF NOT EXISTS idx_save_slots_decisions ON save_slots (decision_count)",
+    "CREATE INDEX IF NOT EXISTS idx_save_slots_updated ON save_slots (updated_at)",
+)
+
+# How long a writer waits for another session's transaction before failing.
+_BUSY_TIMEOUT_SECONDS = 5.0
+
+
+@dataclass(frozen=True, slots=True)
+class SlotInfo:
+    """Metadata row describing one save slot (no payload)."""
+
+    player_key: str
+    slot_name: str
+    player_class: Optional[str]
+    current_node: Optional[str]
+    phase: Optional[str]
+    decision_count: int
+    updated_at: float
+
+
+class SaveStore:
+    """Named save slots per player in a local SQLite database."""
+
+    def __init__(self, path: Path) -> None:
+        self.path = Path(path)
+        self._local = threading.local()
+        self._init_lock = threading.Lock()
+        self._initialized = False
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=_BUSY_TIMEOUT_SECONDS, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA foreign_keys=ON")
+            self._local.conn = conn
+        if not self._initialized:
+            with self._init_lock:
+                if not self._initialized:
+                    for statement in _SCHEMA:
+                        conn.execute(statement)
+                    self._initialized = True
+        return conn
+
+    def close(self) -> None:
+        """Close this thread's connection, if any."""
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    def save_slot(self, player_key: str, slot_name: str, snapshot: Dict[str, Any]) -> SlotInfo:
+        """Create or overwrite a slot with a snapshot payload."""
+        current_node = snapshot.get("current_node")
+        info = SlotInfo(
+            player_key=player_key,
+            slot_name=slot_name,
+            player_class=snapshot.get("player_class"),
+            current_node=current_node,
+            phase=get_phase(current_node) if current_node else None,
+            decision_count=len(snapshot.get("decision_history", [])),
+            updated_at=time.time(),
+        )
+        payload = json.dumps(snapshot, separators=(",", ":"))
+        conn = self._connection()
+        # BEGIN IMMEDIATE takes the write lock up front so two sessions saving
+        # at once serialize instead of failing mid-transaction.
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute(
+                """
+                INSERT INTO save_slots
+                    (player_key, slot_name, player_class, current_node, phase, decision_count, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (player_key, slot_name) DO UPDATE SET
+                    player_class = excluded.player_class,
+                    current_node = excluded.current_node,
+                    phase = excluded.phase,
+                    decision_count = excluded.decision_count,
+                    updated_at = excluded.updated_at
+                """,
+                (
+                    info.player_key,
+                    info.slot_name,
+                    info.player_class,
+                    info.current_node,
+                    info.phase,
+                    info.decision_count,
+                    info.updated_at,
+                ),
+            )
+            (slot_id,) = conn.execute(
+                "SELECT id FROM save_slots WHERE player_key = ? AND slot_name = ?",
+                (player_key, slot_name),
+            ).fetchone()
+            conn.execute(
+                "INSERT INTO save_blobs (slot_id, payload) VALUES (?, ?) "
+                "ON CONFLICT (slot_id) DO UPDATE SET payload = excluded.payload",
+                (slot_id, payload),
+            )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return info
+
+    def list_slots(self, player_key: str) -> List[SlotInfo]:
+        """Return a player's slots, newest first, without reading any payload."""
+        rows = self._connection().execute(
+            """
+            SELECT player_key, slot_name, player_class, current_node, phase, decision_count, updated_at
+            FROM save_slots
+            WHERE player_key = ?
+            ORDER BY updated_at DESC
+            """,
+            (player_key,),
+        ).fetchall()
+        return [SlotInfo(*row) for row in rows]
+
+    def load_slot(self, player_key: str, slot_name: str) -> Optional[Dict[str, Any]]:
+        """Return the parsed payload for a slot, or None if it doesn't exist."""
+        row = self._connection().execute(
+            """
+            SELECT save_blobs.payload
+            FROM save_slots JOIN save_blobs ON save_blobs.slot_id = save_slots.id
+            WHERE save_slots.player_key = ? AND save_slots.slot_name = ?
+            """,
+            (player_key, slot_name),
+        ).fetchone()
+        if row is None:
+            return None
+        return json.loads(row[0])
+
+    def delete_slot(self, player_key: str, slot_name: str) -> bool:
+        """Delete a slot and its payload. Returns whether a slot was removed."""
+        cursor = self._connection().execute(
+            "DELETE FROM save_slots WHERE player_key = ? AND slot_name = ?",
+            (player_key, slot_name),
+        )
+        return cursor.rowcount > 0
+
+
+def default_save_store_path() -> Path:
+    """Return the on-disk location of the shared save database."""
+    return user_data_dir() / "saves.sqlite3"
+
+
+_STORE: Optional[SaveStore] = None
+_STORE_LOCK = threading.Lock()
+
+
+def get_save_store() -> SaveStore:
+    """Return the process-wide SaveStore shared by all sessions."""
+    global _STORE
+    if _STORE is None:
+        with _STORE_LOCK:
+            if _STORE is None:
+                _STORE = SaveStore(default_save_store_path())
+    return _STORE
@@ -0,0 +1,313 @@
+"""Versioned snapshot schema and migration chain for save imports.
+
+The schema is declared once as a tree of `Field` specs and compiled into a
+validator that checks a payload in a single pass, collecting every error
+with the path it was found at. Older saves are brought up to date by an
+ordered chain of `Migration` steps before validation, so a format change
+means adding one migration instead of another validation branch.
+"""
+
+from __future__ import annotations
+
+import copy
+import math
+from dataclasses import dataclass, field
+from typing import Any, Callable, Container, Dict, List, Mapping, Optional
+
+from game.content.campaign import current_campaign, use_campaign
+from game.content.registry import campaign_ids, get_campaign
+from game.data import CLASS_TEMPLATES, FACTION_KEYS, STAT_KEYS, STORY_NODES, TRAIT_KEYS
+
+# Current save format version; bump it together with a new entry in MIGRATIONS.
+SNAPSHOT_VERSION = 6
+
+Validator = Callable[[Any, str, List[str]], None]
+
+_TYPE_NAMES = {dict: "an object", list: "a list", str: "a string", int: "an integer", bool: "a boolean"}
+
+
+# ---------------------------------------------------------------------------
+# Declarative schema
+# ---------------------------------------------------------------------------
+
+
+@dataclass(frozen=True, slots=True)
+class Field:
+    """Declarative description of one value in a snapshot payload."""
+
+    label: str
+    kind: Optional[type] = None
+    nullable: bool = False
+    required: tuple[str, ...] = ()
+    fields: Mapping[str, Field] = field(default_factory=dict)
+    items: Optional[Field] = None
+    values: Optional[Field] = None
+    one_of: Optional[Callable[[], Container[Any]]] = None
+    one_of_message: str = ""
+
+
+def _meta_state_field(label: str) -> Field:
+    return Field(
+        label,
+        dict,
+        fields={
+            "unlocked_items": Field(f"{label} unlocked_items", list),
+            "removed_nodes": Field(f"{label} removed_nodes", list),
+        },
+    )
+
+
+SNAPSHOT_SCHEMA = Field(
+    "Save payload",
+    dict,
+    required=(
+        "player_class", "current_node", "stats", "inventory", "flags", "event_log",
+        "traits", "seen_events", "factions", "decision_history", "last_choice_feedback",
+    ),
+    fields={
+        "save_version": Field("Save version", int),
+        "campaign_id": Field(
+            "Campaign", str, nullable=True, one_of=campaign_ids, one_of_message="is not a registered campaign"
+        ),
+        "player_class": Field(
+            "Player class", one_of=lambda: CLASS_TEMPLATES, one_of_message="is not a known class"
+        ),
+        "current_node": Field(
+            "Current node", str, one_of=lambda: STORY_NODES, one_of_message="does not exist in story"
+        ),
+        "stats": Field("Stats", dict, required=STAT_KEYS, values=Field("Stat value", int)),
+        "traits": Field("Traits", dict, required=TRAIT_KEYS, values=Field("Trait value", int)),
+        "factions": Field("Factions", dict, required=FACTION_KEYS, values=Field("Faction value", int)),
+        "inventory": Field("Inventory", list, items=Field("Inventory item", str)),
+        "flags": Field("Flags", dict),
+        "seen_events": Field("Seen events", list, items=Field("Seen event", str)),
+        "decision_history": Field("Decision history", list, items=Field("Decision history entry", dict)),
+        "last_choice_feedback": Field("Choice feedback", list),
+        "event_log": Field("Event log", list, items=Field("Event log entry", str)),
+        "visited_nodes": Field("Visited nodes", list, items=Field("Visited node", str)),
+        "visited_edges": Field(
+            "Visited edges",
+            list,
+            items=Field(
+                "Visited edges entry",
+                dict,
+                required=("from", "to"),
+                fields={"from": Field("Visited edge endpoint", str), "to": Field("Visited edge endpoint", str)},
+            ),
+        ),
+        "history": Field("History", list),
+        "pending_choice_confirmation": Field(
+            "Pending choice confirmation",
+            dict,
+            nullable=True,
+            fields={
+                "node": Field("Pending choice confirmation node", str),
+                "choice_id": Field("Pending choice confirmation choice_id", str),
+                "choice_index": Field("Pending choice confirmation choice_index", int),
+                "label": Field("Pending choice confirmation label", str),
+                "warnings": Field("Pending choice confirmation warnings", list),
+            },
+        ),
+        "auto_event_summary": Field("Auto event summary", list),
+        "last_outcome_summary": Field("Last outcome summary", dict, nullable=True),
+        "pending_auto_death": Field("Pending auto death", bool),
+        "meta_state": _meta_state_field("Meta state"),
+        "starting_meta_state": _meta_state_field("Starting meta state"),
+    },
+)
+
+
+def compile_schema(spec: Field) -> Validator:
+    """Compile a `Field` tree into a single-pass validator closure.
+
+    The returned callable takes ``(value, path, errors)`` and appends one
+    message per problem found, prefixed with the value's path.
+    """
+    kind = spec.kind
+    type_name = _TYPE_NAMES.get(kind, kind.__name__ if kind else "")
+    required = spec.required
+    field_checks = [(key, compile_schema(sub)) for key, sub in spec.fields.items()]
+    item_check = compile_schema(spec.items) if spec.items else None
+    value_check = compile_schema(spec.values) if spec.values else None
+    label = spec.label
+    nullable = spec.nullable
+    one_of = spec.one_of
+    one_of_message = spec.one_of_message
+
+    def check(value: Any, path: str, errors: List[str]) -> None:
+        if value is None and nullable:
+            return
+        # bool is an int subclass, but True is no stat value.
+        if kind is not None and (not isinstance(value, kind) or (kind is int and isinstance(value, bool))):
+            qualifier = " or null" if nullable else ""
+            errors.append(f"{path}: {label} must be {type_name}{qualifier}.")
+            return
+        if one_of is not None:
+            try:
+                known = value in one_of()
+            except TypeError:
+                known = False
+            if not known:
+                errors.append(f"{path}: {label} {one_of_message}.")
+        if required:
+            missing = [key for key in required if key not in value]
+            if missing:
+                errors.append(f"{path}: {label} is missing required keys: {', '.join(missing)}.")
+        for key, sub_check in field_checks:
+            if key in value:
+                sub_check(value[key], f"{path}.{key}", errors)
+        if value_check is not None:
+            for key, sub_value in value.items():
+                value_check(sub_value, f"{path}.{key}", errors)
+        if item_check is not None:
+            for index, item in enumerate(value):
+                item_check(item, f"{path}[{index}]", errors)
+
+    return check
+
+
+_VALIDATE_SNAPSHOT = compile_schema(SNAPSHOT_SCHEMA)
+
+
+# ---------------------------------------------------------------------------
+# Migrations
+# ---------------------------------------------------------------------------
+
+
+@dataclass(slots=True)
+class Migration:
+    """One step of the save format history.
+
+    ``apply`` mutates a private copy of a payload at ``version - 1`` so that
+    it conforms to ``version``.
+    """
+
+    version: int
+    description: str
+    apply: Callable[[Dict[str, Any]], None]
+
+
+_LEGACY_META_KEYS = {
+    "unlocked_items": ("legacy_items", "meta_items"),
+    "removed_nodes": ("removed_meta_nodes", "removed_locations"),
+}
+
+
+def _legacy_meta_list(value: Any) -> Any:
+    """Wrap legacy scalar/dict meta values into the list shape the schema requires."""
+    # Older saves stored these as a single name or a name -> bool mapping;
+    # normalize_meta_state accepted both, so the migration must as well.
+    if isinstance(value, str):
+        return [value]
+    if isinstance(value, dict):
+        return list(value.keys())
+    if isinstance(value, (tuple, set)):
+        return list(value)
+    return value
+
+
+def _migrate_legacy_meta_keys(snapshot: Dict[str, Any]) -> None:
+    meta = snapshot.get("meta_state")
+    if not isinstance(meta, dict):
+        return
+    meta = dict(meta)
+    for canonical, legacy_keys in _LEGACY_META_KEYS.items():
+        for legacy in legacy_keys:
+            if legacy in meta:
+                value = meta.pop(legacy)
+                if canonical not in meta:
+                    meta[canonical] = _legacy_meta_list(value)
+    snapshot["meta_state"] = meta
+
+
+def _migrate_visited_nodes(snapshot: Dict[str, Any]) -> None:
+    if "visited_nodes" not in snapshot and isinstance(snapshot.get("current_node"), str):
+        snapshot["visited_nodes"] = [snapshot["current_node"]]
+
+
+def _migrate_visited_edges(snapshot: Dict[str, Any]) -> None:
+    snapshot.setdefault("visited_edges", [])
+
+
+def _migrate_starting_meta_state(snapshot: Dict[str, Any]) -> None:
+    snapshot.setdefault("starting_meta_state", {"unlocked_items": [], "removed_nodes": []})
+
+
+def _legacy_int(value: Any) -> Any:
+    if isinstance(value, bool):
+        return int(value)
+    if isinstance(value, str):
+        try:
+            value = float(value.strip())
+        except ValueError:
+            return value
+    if isinstance(value, float) and math.isfinite(value):
+        return round(value)
+    return value
+
+
+def _legacy_strings(values: Any) -> Any:
+    if not isinstance(values, list):
+        return values
+    return [value if isinstance(value, str) else str(value) for value in values if value is not None]
+
+
+def _migrate_value_kinds(snapshot: Dict[str, Any]) -> None:
+    # The pre-schema validator only checked containers; coerce what it let through.
+    for key in ("stats", "traits", "factions"):
+        if isinstance(snapshot.get(key), dict):
+            snapshot[key] = {name: _legacy_int(value) for name, value in snapshot[key].items()}
+    for key in ("inventory", "seen_events", "event_log"):
+        if key in snapshot:
+            snapshot[key] = _legacy_strings(snapshot[key])
+    if isinstance(snapshot.get("decision_history"), list):
+        # Entries that are not objects name no node or choice; nothing can use them.
+        snapshot["decision_history"] = [entry for entry in snapshot["decision_history"] if isinstance(entry, dict)]
+
+
+MIGRATIONS: List[Migration] = [
+    Migration(2, "Rename legacy meta_state keys to unlocked_items/removed_nodes", _migrate_legacy_meta_keys),
+    Migration(3, "Default missing visited_nodes to the current node", _migrate_visited_nodes),
+    Migration(4, "Default missing visited_edges to an empty list", _migrate_visited_edges),
+    Migration(5, "Record the run's starting meta state", _migrate_starting_meta_state),
+    Migration(6, "Coerce loosely typed stats, lists and history entries to their schema kinds", _migrate_value_kinds),
+]
+
+assert MIGRATIONS[-1].version == SNAPSHOT_VERSION, "Bump SNAPSHOT_VERSION alongside new migrations."
+
+
+def migrate_snapshot(snapshot: Dict[str, Any]) -> tuple[Dict[str, Any], list[str]]:
+    """Return a copy of ``snapshot`` migrated to the current save version.
+
+    Payloads without ``save_version`` predate versioning and start at 1.
+    """
+    version = snapshot.get("save_version", 1)
+    if not isinstance(version, int) or version < 1:
+        return snapshot, [f"$.save_version: Save version must be a positive integer, got {version!r}."]
+    if version > SNAPSHOT_VERSION:
+        return snapshot, [f"$.save_version: Save version {version} is newer than supported version {SNAPSHOT_VERSION}."]
+
+    migrated = copy.copy(snapshot)
+    for migration in MIGRATIONS:
+        if migration.version > version:
+            migration.apply(migrated)
+    migrated["save_version"] = SNAPSHOT_VERSION
+    return migrated, []
+
+
+def prepare_snapshot(payload: Any) -> tuple[Optional[Dict[str, Any]], list[str]]:
+    """Migrate and validate an imported payload.
+
+    Returns the migrated snapshot (or None when invalid) and every error found.
+    """
+    if not isinstance(payload, dict):
+        return None, ["$: Save payload must be an object."]
+    migrated, errors = migrate_snapshot(payload)
+    if errors:
+        return None, errors
+    # Node ids are checked against the campaign the save was made in.
+    campaign_id = migrated.get("campaign_id")
+    campaign = get_campaign(campaign_id) if campaign_id in campaign_ids() else current_campaign()
+    with use_campaign(campaign):
+        _VALIDATE_SNAPSHOT(migrated, "$", errors)
+    return (None if errors else migrated), errors
@@ -1,12 +1,19 @@
+import atexit
 import copy
 import json
 import os
+import threading
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Any, Dict
+from typing import Any, Callable, Dict, Iterator, Optional
 
 from game.streamlit_compat import st
 
-from game.data import CLASS_TEMPLATES, FACTION_KEYS, STAT_KEYS, STORY_NODES, TRAIT_KEYS
+from game.content.campaign import Campaign
+from game.content.registry import DEFAULT_CAMPAIGN_ID, get_campaign
+from game.data import CLASS_TEMPLATES, FACTION_KEYS, STORY_NODES, TRAIT_KEYS
+from game.paths import user_data_dir
+from game.snapshot_schema import SNAPSHOT_VERSION, prepare_snapshot
 
 INTRO_NODE_BY_CLASS = {
     "Warrior": "intro_warrior",
@@ -17,6 +24,7 @@ INTRO_NODE_BY_CLASS = {
 # Canonical default values for all game-state fields.
 # Used by reset, ensure, snapshot, and load to stay in sync.
 _DEFAULT_STATE_FIELDS: Dict[str, Any] = {
+    "campaign_id": None,
     "player_class": None,
     "current_node": None,
     "stats": lambda: {"hp": 0, "gold": 0, "strength": 0, "dexterity": 0},
@@ -39,17 +47,24 @@ _DEFAULT_STATE_FIELDS: Dict[str, Any] = {
     "visited_nodes": lambda: [],
     "visited_edges": lambda: [],
     "meta_state": lambda: {"unlocked_items": [], "removed_nodes": []},
+    "starting_meta_state": lambda: {"unlocked_items": [], "removed_nodes": []},
+    "replay_checkpoints": lambda: [],
+    "autosave_offer": None,
 }
 
 # Fields that are captured in snapshots for save/load and undo.
 _SNAPSHOT_FIELDS = (
-    "player_class", "current_node", "stats", "inventory", "flags",
+    "campaign_id", "player_class", "current_node", "stats", "inventory", "flags",
     "traits", "seen_events", "factions", "decision_history",
     "last_choice_feedback", "last_outcome_summary", "auto_event_summary",
     "pending_auto_death", "event_log", "pending_choice_confirmation",
-    "visited_nodes", "visited_edges", "meta_state",
+    "visited_nodes", "visited_edges", "meta_state", "starting_meta_state",
 )
 
+# Replay saves restore from the nearest full snapshot, so loading never replays
+# more than this many decisions.
+REPLAY_CHECKPOINT_INTERVAL = 10
+
 
 _LEGACY_REPO_META_PROGRESS_PATH = Path(__file__).resolve().parents[1] / ".oakrest_meta_state.json"
 
@@ -60,14 +75,7 @@ def _primary_meta_progress_path() -> Path:
     Use a per-user directory rather than a repo dotfile. This avoids failures on
     synced/read-only folders and makes persistence consistent across launches.
     """
-    base = os.environ.get("LOCALAPPDATA") or os.environ.get("APPDATA")
-    root = Path(base) if base else Path.home()
-    return root / "choice-game" / "meta_state.json"
-
-
-def _meta_progress_paths() -> list[Path]:
-    """Ordered list of supported meta-state locations (newest first)."""
-    return [_primary_meta_progress_path(), _LEGACY_REPO_META_PROGRESS_PATH]
+    return user_data_dir() / "meta_state.json"
 
 
 def _get_default(key: str) -> Any:
@@ -134,51 +142,253 @@ def _merge_meta_state(existing: Dict[str, Any], incoming: Dict[str, Any]) -> Dic
     }
 
 
+# Parsed meta files keyed by path, validated against (mtime_ns, size) so an
+# unchanged file costs a single stat per read.
+_META_FILE_CACHE: Dict[Path, tuple[int, int, Dict[str, list[str]]]] = {}
+
+
+def _read_meta_file(path: Path) -> Optional[Dict[str, list[str]]]:
+    """Return the normalized content of a meta file, or None if unreadable."""
+    try:
+        stat = path.stat()
+    except OSError:
+        _META_FILE_CACHE.pop(path, None)
+        return None
+    cached = _META_FILE_CACHE.get(path)
+    if cached is not None and cached[:2] == (stat.st_mtime_ns, stat.st_size):
+        return cached[2]
+    try:
+        payload = normalize_meta_state(json.loads(path.read_text(encoding="utf-8")))
+    except (OSError, json.JSONDecodeError):
+        _META_FILE_CACHE.pop(path, None)
+        return None
+    _META_FILE_CACHE[path] = (stat.st_mtime_ns, stat.st_size, payload)
+    if path == _primary_meta_progress_path():
+        _META_WRITER.mark_persisted(payload)
+    return payload
+
+
+def _invalidate_meta_file_cache(path: Path) -> None:
+    _META_FILE_CACHE.pop(path, None)
+
+
+# Set once the legacy repo dotfile has been read (and migrated) by this process.
+_LEGACY_META_CHECKED = False
+
+
 def _load_persistent_meta_state() -> Dict[str, list[str]]:
+    """Return meta progression on disk; an unchanged primary file costs one stat."""
+    global _LEGACY_META_CHECKED
     if not _meta_persistence_enabled():
         return normalize_meta_state(None)
-    merged = normalize_meta_state(None)
-    loaded_any = False
-    for path in _meta_progress_paths():
-        if not path.exists():
-            continue
+    primary = _read_meta_file(_primary_meta_progress_path())
+    merged = primary or normalize_meta_state(None)
+    if not _LEGACY_META_CHECKED:
+        _LEGACY_META_CHECKED = True
+        legacy = _read_meta_file(_LEGACY_REPO_META_PROGRESS_PATH)
+        # Migrate legacy progress to the primary path once, and only if it adds something.
+        if legacy is not None and not _meta_covered_by(legacy, primary):
+            merged = _merge_meta_state(merged, legacy)
+            _META_WRITER.schedule(merged)
+    return merged
+
+
+@contextmanager
+def _exclusive_file_lock(lock_path: Path) -> Iterator[None]:
+    """Hold an advisory, cross-process lock on ``lock_path`` for the block."""
+    lock_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(lock_path, "a+b") as handle:
+        if os.name == "nt":  # pragma: no cover - exercised on Windows only
+            import msvcrt
+
+            handle.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(handle.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    continue  # LK_LOCK gives up after ~10s; keep waiting.
+            try:
+                yield
+            finally:
+                handle.seek(0)
+                msvcrt.locking(handle.fileno(), msvcrt.LK_UNLCK, 1)
+        else:
+            import fcntl
+
+            fcntl.flock(handle.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(handle.fileno(), fcntl.LOCK_UN)
+
+
+class MetaStateStore:
+    """Meta progression file shared safely between processes.
+
+    Meta progression only ever grows (both lists are sets of unlocks), so
+    concurrent writers never conflict: each write takes an advisory lock,
+    re-reads the file, unions its content in and atomically replaces the file.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = Path(path)
+        self.lock_path = self.path.with_suffix(self.path.suffix + ".lock")
+
+    def read(self) -> Dict[str, list[str]]:
+        """Return the file's normalized content, empty if missing or unreadable."""
         try:
-            payload = json.loads(path.read_text(encoding="utf-8"))
+            return normalize_meta_state(json.loads(self.path.read_text(encoding="utf-8")))
         except (OSError, json.JSONDecodeError):
-            continue
-        merged = _merge_meta_state(merged, payload)
-        loaded_any = True
+            return normalize_meta_state(None)
 
-    # If we successfully loaded from any legacy location, opportunistically
-    # migrate to the primary path so future loads are stable.
-    if loaded_any:
-        persist_meta_state(merged)
-    return merged
+    def merge_write(self, meta_state: Dict[str, Any]) -> Dict[str, list[str]]:
+        """Merge ``meta_state`` into the file and return the combined content."""
+        with _exclusive_file_lock(self.lock_path):
+            on_disk = self.read()
+            merged = _merge_meta_state(on_disk, meta_state)
+            if merged != on_disk or not self.path.exists():
+                tmp = self.path.with_name(f"{self.path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+                tmp.write_text(json.dumps(merged, indent=2), encoding="utf-8")
+                tmp.replace(self.path)
+        return merged
 
 
-def persist_meta_state(meta_state: Dict[str, Any]) -> None:
-    """Persist cross-run legacy progression to disk."""
-    normalized = normalize_meta_state(meta_state)
-    st.session_state.meta_state = normalized
-    if not _meta_persistence_enabled():
-        return
+def _meta_covered_by(meta_state: Dict[str, list[str]], other: Optional[Dict[str, list[str]]]) -> bool:
+    """Return whether merging ``meta_state`` into ``other`` would change nothing."""
+    if other is None:
+        return False
+    return all(set(meta_state[key]) <= set(other[key]) for key in ("unlocked_items", "removed_nodes"))
+
+
+def _write_meta_state_files(normalized: Dict[str, list[str]]) -> Optional[Dict[str, list[str]]]:
+    """Merge ``normalized`` into the meta files; returns what is on disk, or None if the write failed."""
     primary = _primary_meta_progress_path()
     try:
-        primary.parent.mkdir(parents=True, exist_ok=True)
-        tmp = primary.with_suffix(primary.suffix + ".tmp")
-        tmp.write_text(json.dumps(normalized, indent=2), encoding="utf-8")
-        tmp.replace(primary)
+        merged = MetaStateStore(primary).merge_write(normalized)
     except OSError:
         # Keep silent in normal gameplay; failing to persist should not crash a run.
-        pass
+        return None
+    finally:
+        _invalidate_meta_file_cache(primary)
 
     # Best-effort backwards compatibility: if the legacy repo dotfile already
     # exists, keep it updated. Don't create it unprompted (it clutters repos).
     if _LEGACY_REPO_META_PROGRESS_PATH.exists():
         try:
-            _LEGACY_REPO_META_PROGRESS_PATH.write_text(json.dumps(normalized, indent=2), encoding="utf-8")
+            _LEGACY_REPO_META_PROGRESS_PATH.write_text(json.dumps(merged, indent=2), encoding="utf-8")
         except OSError:
-            return
+            pass
+        finally:
+            _invalidate_meta_file_cache(_LEGACY_REPO_META_PROGRESS_PATH)
+    return merged
+
+
+class _MetaStateWriter:
+    """Dirty-checked, debounced writer for on-disk meta progression.
+
+    Content already contained in what is on disk (or already pending) is
+    dropped; changes arriving within ``delay`` seconds of each other are
+    unioned into a single write. ``write`` returns the content now on disk,
+    or None if it failed; failed content stays pending and is retried with
+    the next change (or at exit). Writes run outside the writer's lock, so
+    `schedule` never waits on disk I/O.
+    """
+
+    def __init__(
+        self,
+        write: Callable[[Dict[str, list[str]]], Optional[Dict[str, list[str]]]],
+        delay: float,
+    ) -> None:
+        self._write = write
+        self.delay = delay
+        self._lock = threading.Lock()
+        # Serializes writes; never taken while holding ``_lock``.
+        self._write_lock = threading.Lock()
+        self._pending: Optional[Dict[str, list[str]]] = None
+        self._last_written: Optional[Dict[str, list[str]]] = None
+        self._timer: Optional[threading.Timer] = None
+
+    def mark_persisted(self, meta_state: Dict[str, list[str]]) -> None:
+        """Record content known to be on disk so redundant writes are skipped."""
+        with self._lock:
+            self._last_written = copy.deepcopy(meta_state)
+
+    def schedule(self, meta_state: Dict[str, list[str]]) -> None:
+        """Queue ``meta_state`` for writing unless it adds nothing new."""
+        with self._lock:
+            if _meta_covered_by(meta_state, self._last_written):
+                return
+            if not _meta_covered_by(meta_state, self._pending):
+                self._pending = _merge_meta_state(self._pending or {}, meta_state)
+            # Also restarts the timer for content left pending by a failed write.
+            if self._timer is None:
+                self._timer = threading.Timer(self.delay, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def flush(self) -> None:
+        """Write any pending change now."""
+        with self._write_lock:
+            with self._lock:
+                pending, self._pending = self._pending, None
+                if self._timer is not None:
+                    self._timer.cancel()
+                    self._timer = None
+                if pending is None or _meta_covered_by(pending, self._last_written):
+                    return
+            written = self._write(pending)
+            with self._lock:
+                if written is not None:
+                    self._last_written = written
+                else:
+                    self._pending = _merge_meta_state(self._pending or {}, pending)
+
+
+# Seconds to coalesce meta-state changes before they are written to disk.
+META_PERSIST_DEBOUNCE_SECONDS = 1.0
+
+_META_WRITER = _MetaStateWriter(_write_meta_state_files, META_PERSIST_DEBOUNCE_SECONDS)
+atexit.register(_META_WRITER.flush)
+
+
+@contextmanager
+def suspend_persistence() -> Iterator[None]:
+    """Keep this session's meta progression and autosaves off disk within the block.
+
+    Used while rebuilding a run (e.g. replaying a save) whose intermediate
+    states must not outlive a failed attempt.
+    """
+    previous = st.session_state.get("_persistence_suspended", False)
+    st.session_state["_persistence_suspended"] = True
+    try:
+        yield
+    finally:
+        st.session_state["_persistence_suspended"] = previous
+
+
+def persistence_suspended() -> bool:
+    """Return whether `suspend_persistence` is active for this session."""
+    return bool(st.session_state.get("_persistence_suspended", False))
+
+
+def persist_meta_state(meta_state: Dict[str, Any]) -> None:
+    """Persist cross-run legacy progression to disk.
+
+    Writes happen in the background and only when the content changed; call
+    `flush_meta_state` to force pending changes out. Under
+    `suspend_persistence` only the session copy is updated.
+    """
+    normalized = normalize_meta_state(meta_state)
+    st.session_state.meta_state = normalized
+    if not _meta_persistence_enabled() or persistence_suspended():
+        return
+    _META_WRITER.schedule(normalized)
+
+
+def flush_meta_state() -> None:
+    """Write pending meta progression to disk immediately."""
+    _META_WRITER.flush()
 
 
 def reset_game_state() -> None:
@@ -191,14 +401,32 @@ def reset_game_state() -> None:
     st.session_state.meta_state = meta_state
     persist_meta_state(meta_state)
 
-def start_game(player_class: str) -> None:
-    """Initialize game state from class template and enter first node."""
-    template = CLASS_TEMPLATES[player_class]
+def start_game(player_class: str, campaign_id: Optional[str] = None) -> None:
+    """Initialize game state from class template and enter first node.
+
+    The session stays bound to ``campaign_id`` (None for the default
+    campaign) until the next new game.
+    """
+    get_campaign(campaign_id)  # unknown ids fail here, before any state changes
+    st.session_state.campaign_id = None if campaign_id == DEFAULT_CAMPAIGN_ID else campaign_id
     persisted_meta = _load_persistent_meta_state()
     session_meta = st.session_state.get("meta_state", {"unlocked_items": [], "removed_nodes": []})
     meta_state = _merge_meta_state(persisted_meta, session_meta)
     st.session_state.meta_state = meta_state
     persist_meta_state(meta_state)
+    begin_run(player_class, meta_state)
+
+
+def begin_run(player_class: str, meta_state: Dict[str, Any]) -> None:
+    """Reset run state for ``player_class`` carrying ``meta_state`` forward.
+
+    A run is fully determined by these inputs plus its decisions, which is what
+    replay saves rely on to rebuild state without storing it.
+    """
+    template = CLASS_TEMPLATES[player_class]
+    meta_state = normalize_meta_state(meta_state)
+    st.session_state.meta_state = meta_state
+    st.session_state.starting_meta_state = copy.deepcopy(meta_state)
     st.session_state.player_class = player_class
     st.session_state.current_node = INTRO_NODE_BY_CLASS.get(player_class, "village_square")
     st.session_state.stats = {
@@ -224,6 +452,7 @@ def start_game(player_class: str) -> None:
     if meta_state.get("unlocked_items"):
         add_log(f"Legacy items carried forward: {', '.join(meta_state['unlocked_items'])}.")
     st.session_state.history = []
+    st.session_state.replay_checkpoints = []
     st.session_state.pending_choice_confirmation = None
     st.session_state.show_locked_choices = False
     st.session_state.show_path_map = False
@@ -231,108 +460,23 @@ def start_game(player_class: str) -> None:
     st.session_state.visited_edges = []
 
 
-def validate_snapshot(snapshot: Dict[str, Any]) -> tuple[bool, list[str]]:
-    """Validate a snapshot payload for save/load safety."""
-    errors: list[str] = []
-    required_keys = {
-        "player_class",
-        "current_node",
-        "stats",
-        "inventory",
-        "flags",
-        "event_log",
-        "traits",
-        "seen_events",
-        "factions",
-        "decision_history",
-        "last_choice_feedback",
-    }
-    missing = required_keys - set(snapshot)
-    if missing:
-        errors.append(f"Missing required keys: {', '.join(sorted(missing))}.")
-        return False, errors
-
-    if snapshot["player_class"] not in CLASS_TEMPLATES:
-        errors.append("Unknown player_class in save payload.")
-    if snapshot["current_node"] not in STORY_NODES:
-        errors.append("Current node does not exist in story.")
-
-    stats = snapshot.get("stats", {})
-    if not isinstance(stats, dict) or any(stat not in stats for stat in STAT_KEYS):
-        errors.append("Stats payload is missing required stat keys.")
-
-    traits = snapshot.get("traits", {})
-    if not isinstance(traits, dict) or any(trait not in traits for trait in TRAIT_KEYS):
-        errors.append("Traits payload is missing required trait keys.")
-
-    factions = snapshot.get("factions", {})
-    if not isinstance(factions, dict) or any(faction not in factions for faction in FACTION_KEYS):
-        errors.append("Factions payload is missing required faction keys.")
-
-    if not isinstance(snapshot.get("inventory"), list):
-        errors.append("Inventory payload must be a list.")
-    if not isinstance(snapshot.get("flags"), dict):
-        errors.append("Flags payload must be an object.")
-    if not isinstance(snapshot.get("seen_events"), list):
-        errors.append("Seen events payload must be a list.")
-    if not isinstance(snapshot.get("decision_history"), list):
-        errors.append("Decision history payload must be a list.")
-    if not isinstance(snapshot.get("last_choice_feedback"), list):
-        errors.append("Choice feedback payload must be a list.")
-    if not isinstance(snapshot.get("event_log"), list):
-        errors.append("Event log payload must be a list.")
-
-    if "visited_nodes" in snapshot and not isinstance(snapshot["visited_nodes"], list):
-        errors.append("Visited nodes payload must be a list.")
-    if "visited_edges" in snapshot and not isinstance(snapshot["visited_edges"], list):
-        errors.append("Visited edges payload must be a list.")
-    if isinstance(snapshot.get("visited_edges"), list):
-        for edge in snapshot["visited_edges"]:
-            if not isinstance(edge, dict):
-                errors.append("Visited edges entries must be objects.")
-                break
-            if "from" not in edge or "to" not in edge:
-                errors.append("Visited edges entries must include 'from' and 'to'.")
-                break
-            if not isinstance(edge["from"], str) or not isinstance(edge["to"], str):
-                errors.append("Visited edge endpoints must be strings.")
-                break
-
-    if "history" in snapshot and not isinstance(snapshot["history"], list):
-        errors.append("History payload must be a list.")
-
-    if "pending_choice_confirmation" in snapshot:
-        pending = snapshot["pending_choice_confirmation"]
-        if pending is not None and not isinstance(pending, dict):
-            errors.append("Pending choice confirmation must be an object or null.")
-        elif isinstance(pending, dict):
-            if "node" in pending and not isinstance(pending["node"], str):
-                errors.append("Pending choice confirmation node must be a string.")
-            if "choice_index" in pending and not isinstance(pending["choice_index"], int):
-                errors.append("Pending choice confirmation choice_index must be an integer.")
-            if "label" in pending and not isinstance(pending["label"], str):
-                errors.append("Pending choice confirmation label must be a string.")
-            if "warnings" in pending and not isinstance(pending["warnings"], list):
-                errors.append("Pending choice confirmation warnings must be a list.")
-
-    if "auto_event_summary" in snapshot and not isinstance(snapshot["auto_event_summary"], list):
-        errors.append("Auto event summary payload must be a list.")
-
-    if "last_outcome_summary" in snapshot:
-        summary = snapshot["last_outcome_summary"]
-        if summary is not None and not isinstance(summary, dict):
-            errors.append("Last outcome summary payload must be an object or null.")
+def session_campaign() -> Campaign:
+    """Return the campaign this session is bound to; wrap a run in `use_campaign` with it."""
+    try:
+        return get_campaign(st.session_state.get("campaign_id"))
+    except KeyError:
+        # The campaign was unregistered since; keep the session playable on the default.
+        st.session_state.campaign_id = None
+        return get_campaign(None)
 
-    if "meta_state" in snapshot:
-        meta = snapshot["meta_state"]
-        if not isinstance(meta, dict):
-            errors.append("Meta state payload must be an object.")
-        else:
-            if "unlocked_items" in meta and not isinstance(meta["unlocked_items"], list):
-                errors.append("Meta state unlocked_items must be a list.")
-            if "removed_nodes" in meta and not isinstance(meta["removed_nodes"], list):
-                errors.append("Meta state removed_nodes must be a list.")
 
+def validate_snapshot(snapshot: Dict[str, Any]) -> tuple[bool, list[str]]:
+    """Validate a snapshot payload for save/load safety.
+
+    Older save versions are migrated before validation, so any payload that can
+    be imported passes. Use `prepare_snapshot` to get the migrated payload.
+    """
+    _, errors = prepare_snapshot(snapshot)
     return not errors, errors
 
 def add_log(message: str) -> None:
@@ -342,12 +486,32 @@ def add_log(message: str) -> None:
 
 def snapshot_state() -> Dict[str, Any]:
     """Capture game state for backtracking and save export."""
-    return {
+    snapshot = {
         key: copy.deepcopy(
             st.session_state.get(key, _get_default(key))
         )
         for key in _SNAPSHOT_FIELDS
     }
+    snapshot["save_version"] = SNAPSHOT_VERSION
+    return snapshot
+
+def record_replay_checkpoint(snapshot: Optional[Dict[str, Any]] = None) -> None:
+    """Keep a full snapshot every ``REPLAY_CHECKPOINT_INTERVAL`` decisions.
+
+    Called right before a decision is recorded, with the snapshot already
+    taken of the current state if there is one. Checkpoints at or beyond the
+    current decision count belong to an undone branch and are dropped.
+    """
+    decision_count = len(st.session_state.get("decision_history", []))
+    if decision_count % REPLAY_CHECKPOINT_INTERVAL:
+        return
+    checkpoints = [
+        checkpoint
+        for checkpoint in st.session_state.get("replay_checkpoints", [])
+        if checkpoint["decision_index"] < decision_count
+    ]
+    checkpoints.append({"decision_index": decision_count, "state": snapshot if snapshot is not None else snapshot_state()})
+    st.session_state.replay_checkpoints = checkpoints
 
 def load_snapshot(snapshot: Dict[str, Any]) -> None:
     """Restore game state from a validated snapshot."""
@@ -365,10 +529,18 @@ def load_snapshot(snapshot: Dict[str, Any]) -> None:
         st.session_state.meta_state = _merge_meta_state(existing_meta, incoming_meta)
         persist_meta_state(st.session_state.meta_state)
 
+def _offer_autosave_restore() -> None:
+    # Deferred import: the saves package builds on this module.
+    from game.saves.autosave import find_autosave_offer
+
+    st.session_state.autosave_offer = find_autosave_offer()
+
+
 def ensure_session_state() -> None:
     """Initialize session state keys on first load."""
     if "player_class" not in st.session_state:
         reset_game_state()
+        _offer_autosave_restore()
     for key in _DEFAULT_STATE_FIELDS:
         if key not in st.session_state:
             setattr(st.session_state, key, _get_default(key))
@@ -0,0 +1,316 @@
+"""Per-node presentation plans, compiled once per node content.
+
+Everything `render_node` needs that does not depend on the player is worked
+out the first time a node is shown and cached by the node's content hash and
+the string table its prose lives in (a hot reload can compile equal content
+into a new table and release the old one):
+
+- the narrative variant table, in order, with each variant's requirements
+  compiled to a predicate and its text and dialogue fragments ready to use;
+- the static grouping structure of the choices: explicit ``group`` buckets,
+  destinations and which choices loop back to the node.
+
+A rerun then only evaluates the predicates against the current state and
+buckets the currently available choices. The resolved narrative and its HTML
+are cached too, keyed by the node hash and the state fields the variants
+read, so a node reached in an equivalent state (or prefetched for one, see
+`prefetch`) paints without decoding or formatting anything.
+"""
+
+from __future__ import annotations
+
+from collections.abc import Mapping
+from dataclasses import dataclass
+from html import escape
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from game.content.strings import TextRef, story_text
+from game.data import STORY_NODES, get_node_hashes
+from game.engine.cache import CacheStats, LRUCache
+from game.engine.requirements import RequirementPredicate, StateProjection, compile_requirements, requirements_projection
+from game.engine.state import GameState
+
+# Plans kept; content-addressed, so entries never go stale, only unused.
+_PLAN_CACHE_LIMIT = 512
+# Resolved narratives kept, across every session in the process.
+_FRAGMENT_CACHE_SIZE = 2048
+
+DialogueLines = Tuple[Mapping[str, Any], ...]
+
+
+@dataclass(frozen=True, slots=True)
+class NarrativeVariant:
+    """One ``conditional_narrative`` entry with its requirements compiled."""
+
+    applies: RequirementPredicate
+    text_replace: Optional[Any] = None
+    text_append: Optional[Any] = None
+    dialogue_replace: Optional[DialogueLines] = None
+    dialogue_append: DialogueLines = ()
+
+
+@dataclass(frozen=True, slots=True)
+class ChoiceSlot:
+    """Static grouping facts for the choice at the same position in ``choices``."""
+
+    group_label: Optional[str]
+    destination: Optional[str]
+    self_loop: bool
+
+
+@dataclass(frozen=True, slots=True)
+class NodePlan:
+    """Precompiled narrative and choice layout of one node."""
+
+    text: Any
+    dialogue: DialogueLines
+    variants: Tuple[NarrativeVariant, ...]
+    slots: Tuple[ChoiceSlot, ...]
+    narrative_projection: StateProjection
+
+
+@dataclass(frozen=True, slots=True)
+class NarrativeFragment:
+    """A node's narrative resolved for one state: decoded text and dialogue, and their HTML."""
+
+    text: str
+    dialogue: Tuple[Mapping[str, str], ...]
+    html: str
+
+
+_PLANS = LRUCache(_PLAN_CACHE_LIMIT)
+_FRAGMENTS = LRUCache(_FRAGMENT_CACHE_SIZE)
+
+
+def _dialogue(lines: Any) -> DialogueLines:
+    return tuple(line for line in lines or () if isinstance(line, Mapping))
+
+
+def compile_node_plan(node_id: str, node: Mapping[str, Any]) -> NodePlan:
+    """Build the presentation plan of ``node``; see `node_plan` for the cached lookup."""
+    variants = []
+    raw_variants = node.get("conditional_narrative", ()) or ()
+    for variant in raw_variants:
+        variants.append(
+            NarrativeVariant(
+                applies=compile_requirements(variant.get("requirements")),
+                text_replace=variant.get("text_replace"),
+                text_append=variant.get("text_append") or None,
+                dialogue_replace=_dialogue(variant["dialogue_replace"]) if variant.get("dialogue_replace") is not None else None,
+                dialogue_append=_dialogue(variant.get("dialogue_append")),
+            )
+        )
+    slots = tuple(
+        ChoiceSlot(choice.get("group") or None, choice.get("next"), choice.get("next") == node_id)
+        for choice in node.get("choices", ())
+    )
+    return NodePlan(
+        node.get("text", ""),
+        _dialogue(node.get("dialogue")),
+        tuple(variants),
+        slots,
+        requirements_projection(variant.get("requirements") for variant in raw_variants),
+    )
+
+
+def _prose_refs(node: Mapping[str, Any]):
+    yield node.get("text")
+    for line in node.get("dialogue") or ():
+        yield line.get("line") if isinstance(line, Mapping) else None
+    for variant in node.get("conditional_narrative", ()) or ():
+        yield variant.get("text_replace")
+        yield variant.get("text_append")
+        for key in ("dialogue_replace", "dialogue_append"):
+            for line in variant.get(key) or ():
+                yield line.get("line") if isinstance(line, Mapping) else None
+
+
+def _string_table_key(node: Mapping[str, Any]) -> Optional[str]:
+    """Return the string table the node's prose resolves through (one per compiled node)."""
+    for value in _prose_refs(node):
+        if isinstance(value, TextRef):
+            return value.table
+    return None
+
+
+def _plan_key(node_id: str, node: Mapping[str, Any]) -> Optional[Tuple[str, Optional[str]]]:
+    hashes = get_node_hashes(node_id) if STORY_NODES.get(node_id) is node else None
+    if hashes is None:
+        return None
+    return hashes.node, _string_table_key(node)
+
+
+def node_plan(node_id: str, node: Mapping[str, Any]) -> NodePlan:
+    """Return the cached plan of a story node (compiled uncached for nodes outside the story)."""
+    key = _plan_key(node_id, node)
+    if key is None:
+        return compile_node_plan(node_id, node)
+    plan = _PLANS.get(key)
+    if plan is None:
+        plan = compile_node_plan(node_id, node)
+        _PLANS.put(key, plan)
+    return plan
+
+
+def _decode_dialogue(lines: DialogueLines) -> List[Dict[str, str]]:
+    """Copy dialogue lines, decoding their text from the story's string table."""
+    return [{**line, "line": story_text(line.get("line", ""))} for line in lines]
+
+
+def resolve_narrative(plan: NodePlan, state: GameState) -> tuple[str, List[Dict[str, str]]]:
+    """Apply the variants whose requirements ``state`` meets, in order."""
+    text = story_text(plan.text)
+    dialogue = _decode_dialogue(plan.dialogue)
+    for variant in plan.variants:
+        if not variant.applies(state):
+            continue
+        if variant.text_replace is not None:
+            text = story_text(variant.text_replace)
+        if variant.text_append is not None:
+            addition = story_text(variant.text_append)
+            text = f"{text}\n\n{addition}" if text else addition
+        if variant.dialogue_replace is not None:
+            dialogue = _decode_dialogue(variant.dialogue_replace)
+        if variant.dialogue_append:
+            dialogue.extend(_decode_dialogue(variant.dialogue_append))
+    return text, dialogue
+
+
+def _escape_html(text: Any) -> str:
+    return escape(str(text), quote=True).replace("\n", "<br/>")
+
+
+def render_narrative_html(text: str, dialogue: Sequence[Mapping[str, Any]]) -> str:
+    """Return the narrative panel's HTML, left open so the caller can append and close it."""
+    html = f"""
+    <div style="
+        padding: 1rem 1.2rem;
+        border: 1px solid rgba(30, 45, 74, 0.6);
+        border-radius: 12px;
+        background:
+            linear-gradient(135deg, rgba(14, 20, 35, 0.8) 0%, rgba(8, 12, 22, 0.9) 100%);
+        margin-bottom: 0.7rem;
+        line-height: 1.75;
+        font-family: 'Crimson Text', Georgia, serif;
+        font-size: 1.05rem;
+        color: #c8cdd8;
+        position: relative;
+        overflow: hidden;
+        box-shadow: 0 4px 16px rgba(0,0,0,0.2), inset 0 1px 0 rgba(255,255,255,0.02);
+        backdrop-filter: blur(4px);
+        -webkit-backdrop-filter: blur(4px);
+        animation: fadeIn 0.5s ease-out;
+    ">
+        <div style="
+            position: absolute; top: 0; left: 0; bottom: 0; width: 3px;
+            background: linear-gradient(180deg, rgba(212, 168, 67, 0.3), rgba(212, 168, 67, 0.05));
+            border-radius: 3px 0 0 3px;
+        "></div>
+        <p style="margin:0 0 0.6rem 0; padding-left: 0.2rem;">{_escape_html(text)}</p>
+    """
+
+    for line in dialogue:
+        speaker = _escape_html(line.get("speaker", "Unknown"))
+        quote = _escape_html(line.get("line", ""))
+        html += (
+            f'<div style="'
+            f'margin:0.6rem 0;'
+            f'padding:0.5rem 0 0.5rem 1rem;'
+            f'border-left:2px solid rgba(212, 168, 67, 0.25);'
+            f'background:rgba(212, 168, 67, 0.03);'
+            f'border-radius:0 6px 6px 0;'
+            f'">'
+            f'<span style="color:#d4a843;font-family:\'Cinzel\',serif;font-size:0.82rem;font-weight:600;letter-spacing:0.03em;">{speaker}</span>'
+            f'<br/>'
+            f'<span style="color:#b0b5c2;font-style:italic;line-height:1.6;">&ldquo;{quote}&rdquo;</span>'
+            f'</div>'
+        )
+    return html
+
+
+def _build_fragment(plan: NodePlan, state: GameState) -> NarrativeFragment:
+    text, dialogue = resolve_narrative(plan, state)
+    return NarrativeFragment(text, tuple(dialogue), render_narrative_html(text, dialogue))
+
+
+def narrative_fragment_key(node_id: str, node: Mapping[str, Any], state: GameState) -> Optional[Tuple[Any, ...]]:
+    """Return the cache key of a story node's fragment for ``state`` (None for other nodes)."""
+    key = _plan_key(node_id, node)
+    if key is None:
+        return None
+    return (node_id, *key, node_plan(node_id, node).narrative_projection.project(state))
+
+
+def is_narrative_fragment_cached(key: Tuple[Any, ...]) -> bool:
+    """Return whether a fragment is cached under ``key``, without counting a lookup."""
+    return key in _FRAGMENTS
+
+
+def narrative_fragment(node_id: str, node: Mapping[str, Any], state: GameState) -> NarrativeFragment:
+    """Return the node's narrative for ``state``, shared by every state the variants cannot tell apart."""
+    key = narrative_fragment_key(node_id, node, state)
+    if key is None:
+        return _build_fragment(node_plan(node_id, node), state)
+    fragment = _FRAGMENTS.get(key)
+    if fragment is None:
+        fragment = _build_fragment(node_plan(node_id, node), state)
+        _FRAGMENTS.put(key, fragment)
+    return fragment
+
+
+def prefetch_narrative_fragment(node_id: str, node: Mapping[str, Any], state: GameState) -> bool:
+    """Build the fragment for ``state`` ahead of a visit; False if not a story node or already cached."""
+    key = narrative_fragment_key(node_id, node, state)
+    if key is None or key in _FRAGMENTS:
+        return False
+    _FRAGMENTS.put(key, _build_fragment(node_plan(node_id, node), state))
+    return True
+
+
+def get_fragment_cache_stats() -> CacheStats:
+    """Return hit, miss and eviction counts of the narrative fragment cache."""
+    return _FRAGMENTS.stats()
+
+
+def should_group_by_destination(plan: NodePlan, positions: Sequence[int], *, overflow: bool) -> bool:
+    """Group by destination when over the cap, or when many available choices loop back here."""
+    if overflow:
+        return True
+    if len(positions) < 5:
+        return False
+    return sum(1 for position in positions if plan.slots[position].self_loop) >= 3
+
+
+def group_choices(
+    plan: NodePlan,
+    indexed_choices: Sequence[tuple[int, Dict[str, Any]]],
+    *,
+    group_by_destination: bool,
+    current_node_id: Optional[str] = None,
+) -> List[Dict[str, Any]]:
+    """Bucket the available choices (``(index, evaluation)`` pairs) using the plan's static slots."""
+    groups: List[Dict[str, Any]] = []
+    seen: Dict[str, Dict[str, Any]] = {}
+    for index, entry in indexed_choices:
+        slot = plan.slots[entry["position"]]
+        if slot.group_label:
+            key = f"group::{slot.group_label}"
+        elif group_by_destination:
+            key = f"dest::{slot.destination}"
+        else:
+            key = f"choice::{index}"
+
+        group = seen.get(key)
+        if group is None:
+            display_label = slot.group_label
+            if not display_label and group_by_destination:
+                if slot.destination == current_node_id:
+                    display_label = "Preparation options"
+                else:
+                    next_title = STORY_NODES.get(slot.destination, {}).get("title", slot.destination or "Unknown")
+                    display_label = f"More options → {next_title}"
+            group = {"key": key, "label": display_label, "destination": slot.destination, "choices": []}
+            groups.append(group)
+            seen[key] = group
+        group["choices"].append((index, entry))
+    return groups
@@ -12,62 +12,32 @@ from game.logic import (
     get_choice_warnings_with_effects,
     get_node_choice_evaluations,
     resolve_choice_outcome,
+    should_force_injury_redirect,
     transition_to,
     transition_to_failure,
 )
+from game.engine.state import state_from_session
 from game.ui_components.epilogue import get_epilogue_aftermath_lines
 from game.ui_components.log_view import render_log
+from game.ui_components.node_presentation import group_choices, narrative_fragment, node_plan, should_group_by_destination
+from game.ui_components.prefetch import prefetch_destinations
 from game.ui_components.sprites import item_sprite, stat_icon_svg
 
 
-def should_force_injury_redirect(node_id: str, hp: int) -> bool:
-    """Return whether the current state should auto-redirect into the injured setback."""
-    return hp <= 0 and not node_id.startswith("failure_") and node_id != "death"
-
-
 def _escape_html(text: Any) -> str:
     """Escape arbitrary text for safe insertion into HTML blocks."""
     return escape(str(text), quote=True).replace("\n", "<br/>")
 
 
-def _resolve_conditional_narrative(node: Dict[str, Any]) -> tuple[str, List[Dict[str, str]]]:
-    """Resolve node text/dialogue variants based on current requirements state.
-
-    This is intended to deepen consequences without multiplying node count: the same
-    node can change tone, add lines, or replace dialogue based on past flags/items.
-
-    Supported node keys:
-      - conditional_narrative: List[Dict] where each dict may contain:
-        - requirements: requirements dict
-        - text_replace: str
-        - text_append: str
-        - dialogue_replace: List[DialogueLine-like dicts]
-        - dialogue_append: List[DialogueLine-like dicts]
-    """
-    text = str(node.get("text", ""))
-    dialogue: List[Dict[str, str]] = list(node.get("dialogue", []) or [])
-
-    for variant in node.get("conditional_narrative", []) or []:
-        ok, _reason = check_requirements(variant.get("requirements"))
-        if not ok:
-            continue
-        if "text_replace" in variant and variant["text_replace"] is not None:
-            text = str(variant["text_replace"])
-        if "text_append" in variant and variant["text_append"]:
-            addition = str(variant["text_append"])
-            if text:
-                text = f"{text}\n\n{addition}"
-            else:
-                text = addition
-        if "dialogue_replace" in variant and variant["dialogue_replace"] is not None:
-            dialogue = list(variant["dialogue_replace"] or [])
-        if "dialogue_append" in variant and variant["dialogue_append"]:
-            dialogue.extend(list(variant["dialogue_append"]))
-
-    return text, dialogue
-
-
-def _render_pending_confirmation(node_id: str, available_choices: List[Dict[str, Any]]) -> None:
+def _pending_entry(pending: Dict[str, Any], available_entries: List[Dict[str, Any]]) -> Dict[str, Any] | None:
+    """Find the available choice a pending confirmation refers to (by id; older saves store an index)."""
+    if pending.get("choice_id") is not None:
+        return next((entry for entry in available_entries if entry["choice_id"] == pending["choice_id"]), None)
+    choice_index = pending.get("choice_index", -1)
+    return available_entries[choice_index] if 0 <= choice_index < len(available_entries) else None
+
+
+def _render_pending_confirmation(node_id: str, available_entries: List[Dict[str, Any]]) -> None:
     pending = st.session_state.pending_choice_confirmation
     if not pending or pending.get("node") != node_id:
         return
@@ -102,10 +72,9 @@ def _render_pending_confirmation(node_id: str, available_choices: List[Dict[str,
         col_confirm, col_cancel = st.columns(2)
         with col_confirm:
             if st.button("Confirm risky choice", type="primary", key=f"confirm_{node_id}", use_container_width=True):
-                choice_index = pending["choice_index"]
-                if 0 <= choice_index < len(available_choices):
-                    selected = available_choices[choice_index]
-                    execute_choice(node_id, selected["label"], selected)
+                selected = _pending_entry(pending, available_entries)
+                if selected is not None:
+                    execute_choice(node_id, selected["choice"]["label"], selected["choice"], selected["choice_id"])
                 st.rerun()
         with col_cancel:
             if st.button("Cancel", key=f"cancel_{node_id}", use_container_width=True):
@@ -234,19 +203,14 @@ def _get_choice_cost_preview(effects: Dict[str, Any]) -> str:
     return " ".join(parts)
 
 
-def _ensure_choice_selection(node_id: str, available_count: int) -> int:
-    """Ensure a valid selected choice index exists for this node; return it."""
+def _ensure_choice_selection(node_id: str, choice_ids: List[str]) -> str | None:
+    """Ensure the selected choice for this node is one of ``choice_ids``; return its id."""
     selection = st.session_state.get("_choice_selection") or {}
-    if selection.get("node") != node_id:
-        selection = {"node": node_id, "choice_index": 0}
-        st.session_state["_choice_selection"] = selection
-    idx = int(selection.get("choice_index", 0) or 0)
-    if available_count <= 0:
-        idx = 0
-    elif idx < 0 or idx >= available_count:
-        idx = 0
-        st.session_state["_choice_selection"]["choice_index"] = idx
-    return idx
+    selected = selection.get("choice_id") if selection.get("node") == node_id else None
+    if selected not in choice_ids:
+        selected = choice_ids[0] if choice_ids else None
+        st.session_state["_choice_selection"] = {"node": node_id, "choice_id": selected}
+    return selected
 
 
 def _render_choice_selector_box(
@@ -257,12 +221,14 @@ def _render_choice_selector_box(
 ) -> None:
     """Render choices as a single boxed selector (click to select, filled circle indicates selection)."""
     available_count = len(indexed_choices)
-    selected_index = _ensure_choice_selection(node_id, available_count)
+    selected_id = _ensure_choice_selection(node_id, [entry["choice_id"] for _, entry in indexed_choices])
 
     # Keep some structure without hiding options behind per-choice "Choose" buttons.
-    has_explicit_groups = any(entry["choice"].get("group") for _, entry in indexed_choices)
-    group_by_destination = _should_group_by_destination(node_id, indexed_choices, overflow=overflow)
-    groups = _group_choices(
+    plan = node_plan(node_id, STORY_NODES[node_id])
+    positions = [entry["position"] for _, entry in indexed_choices]
+    group_by_destination = should_group_by_destination(plan, positions, overflow=overflow)
+    groups = group_choices(
+        plan,
         indexed_choices,
         group_by_destination=group_by_destination,
         current_node_id=node_id,
@@ -273,9 +239,9 @@ def _render_choice_selector_box(
             label = group.get("label")
             if label:
                 st.caption(label)
-            for index, entry in group["choices"]:
+            for _index, entry in group["choices"]:
                 choice = entry["choice"]
-                marker = "◉" if index == selected_index else "◯"
+                marker = "◉" if entry["choice_id"] == selected_id else "◯"
                 warning_hint = ""
                 effects, _ = resolve_choice_outcome(choice)
                 warnings = get_choice_warnings_with_effects(choice, effects)
@@ -283,15 +249,15 @@ def _render_choice_selector_box(
                     warning_hint = "  [! risky]"
                 if st.button(
                     f"{marker} {choice.get('label', 'Unnamed choice')}{warning_hint}",
-                    key=f"select_choice_{node_id}_{index}",
+                    key=f"select_choice_{node_id}_{entry['choice_id']}",
                     use_container_width=True,
                 ):
-                    st.session_state["_choice_selection"] = {"node": node_id, "choice_index": index}
+                    st.session_state["_choice_selection"] = {"node": node_id, "choice_id": entry["choice_id"]}
                     st.rerun()
 
         if available_count > 0:
             # Selected choice preview + execute action
-            selected_entry = next((e for i, e in indexed_choices if i == selected_index), None)
+            selected_entry = next((e for _, e in indexed_choices if e["choice_id"] == selected_id), None)
             if selected_entry is not None:
                 choice = selected_entry["choice"]
                 effects, _ = resolve_choice_outcome(choice)
@@ -310,24 +276,15 @@ def _render_choice_selector_box(
                     if warnings:
                         st.session_state.pending_choice_confirmation = {
                             "node": node_id,
-                            "choice_index": selected_index,
+                            "choice_id": selected_entry["choice_id"],
                             "label": label,
                             "warnings": warnings,
                         }
                     else:
-                        execute_choice(node_id, label, choice)
+                        execute_choice(node_id, label, choice, selected_entry["choice_id"])
                     st.rerun()
 
 
-def _should_group_by_destination(node_id: str, indexed_choices: List[tuple[int, Dict[str, Any]]], *, overflow: bool) -> bool:
-    if overflow:
-        return True
-    if len(indexed_choices) < 5:
-        return False
-    self_loop_count = sum(1 for _, entry in indexed_choices if entry["choice"].get("next") == node_id)
-    return self_loop_count >= 3
-
-
 def _render_grouped_choices(
     node_id: str,
     indexed_choices: List[tuple[int, Dict[str, Any]]],
@@ -337,46 +294,6 @@ def _render_grouped_choices(
     _render_choice_selector_box(node_id, indexed_choices, overflow=overflow)
 
 
-def _group_choices(
-    indexed_choices: List[tuple[int, Dict[str, Any]]],
-    *,
-    group_by_destination: bool,
-    current_node_id: str | None = None,
-) -> List[Dict[str, Any]]:
-    groups: List[Dict[str, Any]] = []
-    seen: Dict[str, Dict[str, Any]] = {}
-    for index, entry in indexed_choices:
-        choice = entry["choice"]
-        group_label = choice.get("group")
-        destination = choice.get("next")
-        if group_label:
-            key = f"group::{group_label}"
-        elif group_by_destination:
-            key = f"dest::{destination}"
-        else:
-            key = f"choice::{index}"
-
-        if key not in seen:
-            display_label = group_label
-            if not display_label and group_by_destination:
-                if destination == current_node_id:
-                    display_label = "Preparation options"
-                else:
-                    next_title = STORY_NODES.get(destination, {}).get("title", destination or "Unknown")
-                    display_label = f"More options \u2192 {next_title}"
-            groups.append(
-                {
-                    "key": key,
-                    "label": display_label,
-                    "destination": destination,
-                    "choices": [],
-                }
-            )
-            seen[key] = groups[-1]
-        seen[key]["choices"].append((index, entry))
-    return groups
-
-
 def render_node() -> None:
     """Render current node, narrative, choices, and edge-case handling."""
     node_id = st.session_state.current_node
@@ -440,58 +357,13 @@ def render_node() -> None:
     _render_auto_events()
     render_log()
 
-    # Build narrative text with dialogue woven in
-    resolved_text, dialogue = _resolve_conditional_narrative(node)
-    narrative_text = _escape_html(resolved_text)
+    # Narrative text with dialogue woven in, cached per node and relevant state
+    fragment = narrative_fragment(node_id, node, state_from_session(st.session_state))
     ending_aftermath = []
     if node_id.startswith("ending_"):
         ending_aftermath = get_epilogue_aftermath_lines(max_lines=None)
 
-    # Build the combined narrative + dialogue HTML
-    narrative_html = f"""
-    <div style="
-        padding: 1rem 1.2rem;
-        border: 1px solid rgba(30, 45, 74, 0.6);
-        border-radius: 12px;
-        background:
-            linear-gradient(135deg, rgba(14, 20, 35, 0.8) 0%, rgba(8, 12, 22, 0.9) 100%);
-        margin-bottom: 0.7rem;
-        line-height: 1.75;
-        font-family: 'Crimson Text', Georgia, serif;
-        font-size: 1.05rem;
-        color: #c8cdd8;
-        position: relative;
-        overflow: hidden;
-        box-shadow: 0 4px 16px rgba(0,0,0,0.2), inset 0 1px 0 rgba(255,255,255,0.02);
-        backdrop-filter: blur(4px);
-        -webkit-backdrop-filter: blur(4px);
-        animation: fadeIn 0.5s ease-out;
-    ">
-        <div style="
-            position: absolute; top: 0; left: 0; bottom: 0; width: 3px;
-            background: linear-gradient(180deg, rgba(212, 168, 67, 0.3), rgba(212, 168, 67, 0.05));
-            border-radius: 3px 0 0 3px;
-        "></div>
-        <p style="margin:0 0 0.6rem 0; padding-left: 0.2rem;">{narrative_text}</p>
-    """
-
-    if dialogue:
-        for line in dialogue:
-            speaker = _escape_html(line.get("speaker", "Unknown"))
-            quote = _escape_html(line.get("line", ""))
-            narrative_html += (
-                f'<div style="'
-                f'margin:0.6rem 0;'
-                f'padding:0.5rem 0 0.5rem 1rem;'
-                f'border-left:2px solid rgba(212, 168, 67, 0.25);'
-                f'background:rgba(212, 168, 67, 0.03);'
-                f'border-radius:0 6px 6px 0;'
-                f'">'
-                f'<span style="color:#d4a843;font-family:\'Cinzel\',serif;font-size:0.82rem;font-weight:600;letter-spacing:0.03em;">{speaker}</span>'
-                f'<br/>'
-                f'<span style="color:#b0b5c2;font-style:italic;line-height:1.6;">&ldquo;{quote}&rdquo;</span>'
-                f'</div>'
-            )
+    narrative_html = fragment.html
 
     if ending_aftermath:
         narrative_html += (
@@ -626,7 +498,7 @@ def render_node() -> None:
         unsafe_allow_html=True,
     )
 
-    _render_pending_confirmation(node_id, available_choices)
+    _render_pending_confirmation(node_id, available_entries)
     indexed_choices = list(enumerate(available_entries))
     _render_grouped_choices(node_id, indexed_choices, overflow=overflow)
 
@@ -639,3 +511,6 @@ def render_node() -> None:
             transition_to_failure("resource_loss")
             st.rerun()
 
+    # The page is built; warm the caches for where the player may go next while they read.
+    prefetch_destinations(available_entries)
+
@@ -0,0 +1,124 @@
+"""Background prefetch of the nodes a player may visit next.
+
+Once `render_node` has drawn a node, the player spends a while reading it.
+Meanwhile a small thread pool takes each available choice, predicts the
+state it leads to (`fork_state` applies the choice's resolved effects to a
+copy of the current state) and prepares its destination for that state:
+
+- the destination's choice evaluations, into the shared evaluation cache;
+- its compiled node plan and resolved narrative fragment (decoded text,
+  dialogue and HTML), into the presentation caches.
+
+Both caches are keyed by the state fields the content actually reads, so a
+prediction only has to agree on those to be used, and a wrong one (auto
+events, failure routing, surprises) costs a wasted background evaluation,
+never a wrong result. Workers never touch the session.
+
+Speculative work must never crowd out real reruns, so it is kept small:
+predictions sharing both cache keys are queued once, destinations already
+cached are skipped, at most `MAX_PREFETCH_IN_FLIGHT` tasks are queued or
+running across all sessions (further ones are dropped), and a session's
+rerun cancels whatever its previous rerun queued that has not started yet.
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Sequence
+
+from game.content.campaign import Campaign, current_campaign, use_campaign
+from game.data import STORY_NODES
+from game.engine.state import GameState, fork_state, state_from_session
+from game.logic import is_shared_choice_eval_cached, prefetch_choice_evaluations, shared_choice_eval_key
+from game.streamlit_compat import st
+from game.ui_components.node_presentation import (
+    is_narrative_fragment_cached,
+    narrative_fragment_key,
+    prefetch_narrative_fragment,
+)
+
+PREFETCH_ENV = "CHOICE_GAME_PREFETCH_WORKERS"
+DEFAULT_PREFETCH_WORKERS = 2
+# Tasks queued or running at once, across every session in the process.
+MAX_PREFETCH_IN_FLIGHT = 8
+
+_EXECUTOR: Optional[ThreadPoolExecutor] = None
+_EXECUTOR_LOCK = threading.Lock()
+_IN_FLIGHT = threading.BoundedSemaphore(MAX_PREFETCH_IN_FLIGHT)
+
+
+def _prefetch_workers() -> int:
+    """Worker threads from `CHOICE_GAME_PREFETCH_WORKERS`; 0 turns prefetching off."""
+    try:
+        return max(0, int(os.environ[PREFETCH_ENV]))
+    except (KeyError, ValueError):
+        return DEFAULT_PREFETCH_WORKERS
+
+
+def _executor() -> Optional[ThreadPoolExecutor]:
+    global _EXECUTOR
+    workers = _prefetch_workers()
+    if not workers:
+        return None
+    with _EXECUTOR_LOCK:
+        if _EXECUTOR is None:
+            _EXECUTOR = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="choice-prefetch")
+        return _EXECUTOR
+
+
+def _prefetch_node(campaign: Campaign, node_id: str, node: Dict[str, Any], state: GameState) -> bool:
+    with use_campaign(campaign):
+        evaluated = prefetch_choice_evaluations(node_id, node, state)
+        rendered = prefetch_narrative_fragment(node_id, node, state)
+        return evaluated or rendered
+
+
+def _release_slot(future: Future) -> None:
+    # Runs when the task finishes or is cancelled.
+    _IN_FLIGHT.release()
+
+
+def cancel_pending_prefetch() -> None:
+    """Cancel this session's queued prefetch tasks that have not started yet."""
+    for future in st.session_state.get("_prefetch_futures") or ():
+        future.cancel()
+    st.session_state["_prefetch_futures"] = []
+
+
+def prefetch_destinations(available_entries: Sequence[Dict[str, Any]]) -> List[Future]:
+    """Queue the destinations of ``available_entries`` (the current node's choice evaluations) for prefetch.
+
+    Cancels what this session queued on its previous rerun first. Returns
+    the queued futures (each resolves to whether it filled a cache); nothing
+    is queued when prefetching is turned off.
+    """
+    cancel_pending_prefetch()
+    executor = _executor()
+    if executor is None:
+        return []
+    state = state_from_session(st.session_state)
+    futures: List[Future] = []
+    seen = set()
+    # Self-loops (shops, training) are included: the node comes back in a new state.
+    for entry in available_entries:
+        destination = entry["resolved_next"]
+        node = STORY_NODES.get(destination) if destination else None
+        if node is None:
+            continue
+        predicted = fork_state(state, entry["resolved_effects"])
+        evaluation_key = shared_choice_eval_key(destination, node, predicted)
+        fragment_key = narrative_fragment_key(destination, node, predicted)
+        if evaluation_key is None or fragment_key is None or (evaluation_key, fragment_key) in seen:
+            continue
+        seen.add((evaluation_key, fragment_key))
+        if is_shared_choice_eval_cached(evaluation_key) and is_narrative_fragment_cached(fragment_key):
+            continue
+        if not _IN_FLIGHT.acquire(blocking=False):
+            break
+        future = executor.submit(_prefetch_node, current_campaign(), destination, node, predicted)
+        future.add_done_callback(_release_slot)
+        futures.append(future)
+    st.session_state["_prefetch_futures"] = futures
+    return futures
@@ -1,12 +1,15 @@
+import copy
 import json
 from html import escape
 
 from game.streamlit_compat import st
 
-from game.data import CLASS_TEMPLATES, FACTION_KEYS, STORY_NODES, TRAIT_KEYS
+from game.data import CLASS_TEMPLATES, FACTION_KEYS, STORY_NODES, TRAIT_KEYS, get_story_indexes
 from game.engine.state_machine import get_phase
-from game.logic import apply_morality_flags
-from game.state import add_log, load_snapshot, normalize_meta_state, reset_game_state, snapshot_state, validate_snapshot
+from game.logic import apply_morality_flags, get_choice_eval_cache_stats, get_shared_choice_eval_cache_stats
+from game.saves import build_replay_save, get_save_store, is_replay_save, load_replay_save, session_id
+from game.snapshot_schema import prepare_snapshot
+from game.state import add_log, load_snapshot, normalize_meta_state, reset_game_state, snapshot_state
 from game.ui_components.path_map import render_path_map
 from game.ui_components.sprites import class_icon_svg, item_sprite, stat_icon_svg
 
@@ -246,6 +249,8 @@ def _render_save_load_controls() -> None:
     with st.expander("Save / Load", expanded=False):
         if st.button("Export current state", use_container_width=True):
             st.session_state.save_blob = json.dumps(snapshot_state(), indent=2)
+        if st.button("Export compact replay save", use_container_width=True):
+            st.session_state.save_blob = json.dumps(build_replay_save(), separators=(",", ":"))
 
         save_text = st.text_area(
             "State JSON",
@@ -256,17 +261,73 @@ def _render_save_load_controls() -> None:
         if st.button("Import state", use_container_width=True):
             try:
                 payload = json.loads(save_text)
-                is_valid, errors = validate_snapshot(payload)
-                if not is_valid:
+                if is_replay_save(payload):
+                    is_valid, errors = load_replay_save(payload)
+                    if not is_valid:
+                        st.error("Invalid save: " + " ".join(errors))
+                    else:
+                        st.success("State imported successfully.")
+                        st.rerun()
+                    return
+                snapshot, errors = prepare_snapshot(payload)
+                if snapshot is None:
                     st.error("Invalid save: " + " ".join(errors))
                 else:
-                    load_snapshot(payload)
+                    load_snapshot(snapshot)
                     apply_morality_flags(st.session_state.flags)
                     st.success("State imported successfully.")
                     st.rerun()
             except json.JSONDecodeError:
                 st.error("Invalid JSON. Please paste a valid exported state.")
 
+        _render_save_slots()
+
+
+def _render_save_slots() -> None:
+    st.markdown("**Save slots**")
+    # Slots belong to the browser session, not to a typed-in name anyone could reuse.
+    player_key = session_id()
+    st.caption("Slots belong to this browser session; reopen this page's URL to get back to them. Anyone with the URL can too.")
+    store = get_save_store()
+
+    slot_name = st.text_input("Slot name", key="save_slot_name").strip()
+    if st.button("Save to slot", use_container_width=True, disabled=not slot_name):
+        store.save_slot(player_key, slot_name, snapshot_state())
+        st.success(f"Saved to slot '{slot_name}'.")
+
+    slots = store.list_slots(player_key)
+    if not slots:
+        st.caption("No saved slots yet.")
+        return
+    labels = {
+        slot.slot_name: (
+            f"{slot.slot_name} - {slot.player_class or '?'}, "
+            f"{_PHASE_LABELS.get(slot.phase or '', 'Unknown')}, {slot.decision_count} decisions"
+        )
+        for slot in slots
+    }
+    selected = st.selectbox(
+        "Saved slots",
+        options=list(labels),
+        format_func=labels.get,
+        key="save_slot_selected",
+    )
+    col_load, col_delete = st.columns(2)
+    with col_load:
+        if st.button("Load slot", use_container_width=True):
+            snapshot, errors = prepare_snapshot(store.load_slot(player_key, selected))
+            if snapshot is None:
+                st.error("Invalid save: " + " ".join(errors))
+            else:
+                load_snapshot(snapshot)
+                apply_morality_flags(st.session_state.flags)
+                st.success(f"Loaded slot '{selected}'.")
+                st.rerun()
+    with col_delete:
+        if st.button("Delete slot", use_container_width=True):
+            store.delete_slot(player_key, selected)
+            st.rerun()
+
 
 def _render_system_controls(*, button_prefix: str) -> None:
     # Put the restart button first so we can safely reset session state before
@@ -288,7 +349,7 @@ def _render_system_controls(*, button_prefix: str) -> None:
 
     if st.session_state.get("dev_mode"):
         with st.expander("Developer Tools", expanded=True):
-            ending_targets = sorted([nid for nid in STORY_NODES.keys() if str(nid).startswith("ending_")])
+            ending_targets = list(get_story_indexes()["ending_nodes"])
             quick_targets = [
                 "final_confrontation",
                 "ending_good",
@@ -335,6 +396,18 @@ def _render_system_controls(*, button_prefix: str) -> None:
                             st.rerun()
             else:
                 st.info("No ending nodes found to jump to.")
+
+            stats = get_choice_eval_cache_stats()
+            st.caption(
+                f"Choice evaluation cache: {stats.size}/{stats.capacity} entries, "
+                f"{stats.hits} hits, {stats.misses} misses ({stats.hit_rate:.0%} hit rate), "
+                f"{stats.evictions} evictions."
+            )
+            shared = get_shared_choice_eval_cache_stats()
+            st.caption(
+                f"Shared across sessions: {shared.size}/{shared.capacity} entries, "
+                f"{shared.hits} hits, {shared.misses} misses ({shared.hit_rate:.0%} hit rate)."
+            )
     st.divider()
     if st.button(
         "Back (undo last choice)",
@@ -342,7 +415,8 @@ def _render_system_controls(*, button_prefix: str) -> None:
         use_container_width=True,
         disabled=not st.session_state.history,
     ):
-        previous = st.session_state.history.pop()
+        # Undo snapshots are shared with checkpoints and queued autosaves; play on a copy.
+        previous = copy.deepcopy(st.session_state.history.pop())
         load_snapshot(previous)
         add_log("You retrace your steps and reconsider your decision.")
         st.rerun()
@@ -1,8 +1,18 @@
 from __future__ import annotations
 
+from dataclasses import dataclass
 from typing import Any, Dict, Iterable, List, Set
 
-from game.content import CLASS_TEMPLATES, FACTION_KEYS, STAT_KEYS, STORY_NODES, TRAIT_KEYS
+from game.content import (
+    CLASS_TEMPLATES,
+    FACTION_KEYS,
+    STAT_KEYS,
+    STORY_NODES,
+    TRAIT_KEYS,
+    get_reverse_index,
+    get_story_graph,
+)
+from game.content.graph import StoryGraph, strongly_connected_components
 
 ALLOWED_REQUIREMENT_KEYS = {
     "class",
@@ -57,26 +67,11 @@ def _iter_choice_entries(node: Dict[str, Any]) -> List[tuple[str, Dict[str, Any]
 
 def _collect_story_metadata() -> tuple[set[str], set[str]]:
     """Collect known flags and obtainable items."""
-    known_flags = set(SYSTEM_FLAG_KEYS)
-    obtainable_items: set[str] = set()
-
+    index = get_reverse_index()
+    known_flags = set(SYSTEM_FLAG_KEYS) | set(index.flag_setters)
+    obtainable_items = set(index.item_granters)
     for template in CLASS_TEMPLATES.values():
-        for item in template.get("inventory", []):
-            obtainable_items.add(item)
-
-    for node in STORY_NODES.values():
-        for choice in _iter_all_choices(node):
-            effects = choice.get("effects", {})
-            obtainable_items.update(effects.get("add_items", []))
-            if effects.get("set_flags"):
-                known_flags.update(effects["set_flags"].keys())
-
-            for variant in choice.get("conditional_effects", []):
-                variant_effects = variant.get("effects", {})
-                obtainable_items.update(variant_effects.get("add_items", []))
-                if variant_effects.get("set_flags"):
-                    known_flags.update(variant_effects["set_flags"].keys())
-
+        obtainable_items.update(template.get("inventory", []))
     return known_flags, obtainable_items
 
 
@@ -104,21 +99,12 @@ def _possible_stat_caps() -> dict[str, dict[str, int]]:
             return set(req_classes) & pool
         return set(pool)
 
-    for node in STORY_NODES.values():
-        for choice in _iter_all_choices(node):
-            eligible = eligible_classes(choice.get("requirements"), known_classes)
-            effects = choice.get("effects", {})
-            for stat in STAT_KEYS:
-                if stat in effects and effects[stat] > 0:
-                    for cls in eligible:
-                        max_gains[cls][stat] += effects[stat]
-            for variant in choice.get("conditional_effects", []):
-                variant_eligible = eligible_classes(variant.get("requirements"), eligible)
-                variant_effects = variant.get("effects", {})
-                for stat in STAT_KEYS:
-                    if stat in variant_effects and variant_effects[stat] > 0:
-                        for cls in variant_eligible:
-                            max_gains[cls][stat] += variant_effects[stat]
+    for gain in get_reverse_index().stat_gains:
+        eligible = known_classes
+        for requirements in gain.requirements:
+            eligible = eligible_classes(requirements, eligible)
+        for cls in eligible:
+            max_gains[cls][gain.stat] += gain.amount
     return max_gains
 
 
@@ -185,227 +171,189 @@ def _any_choice_possible_for_class(
     return False
 
 
-def _find_sccs_iterative(edges: dict[str, set[str]], nodes: set[str]) -> list[set[str]]:
-    """Tarjan's SCC algorithm, fully iterative (no recursion limit needed).
+@dataclass(slots=True)
+class ValidationContext:
+    """Story-wide facts the per-node checks compare against."""
 
-    Returns SCCs with more than one node (multi-node cycles).
-    """
-    index_counter = 0
-    stack: list[str] = []
-    on_stack: set[str] = set()
-    index_map: dict[str, int] = {}
-    lowlink: dict[str, int] = {}
-    sccs: list[set[str]] = []
+    known_flags: Set[str]
+    obtainable_items: Set[str]
+    known_classes: Set[str]
+    max_stats: Dict[str, Dict[str, int]]
 
-    for root in nodes:
-        if root in index_map:
-            continue
-        # Iterative DFS using an explicit call stack.
-        # Each frame is (node, iterator_over_neighbors, is_initial_visit).
-        call_stack: list[tuple[str, list[str], int]] = []
-        index_map[root] = lowlink[root] = index_counter
-        index_counter += 1
-        stack.append(root)
-        on_stack.add(root)
-        call_stack.append((root, list(edges.get(root, set())), 0))
-
-        while call_stack:
-            v, neighbors, ni = call_stack[-1]
-            if ni < len(neighbors):
-                call_stack[-1] = (v, neighbors, ni + 1)
-                w = neighbors[ni]
-                if w not in index_map:
-                    index_map[w] = lowlink[w] = index_counter
-                    index_counter += 1
-                    stack.append(w)
-                    on_stack.add(w)
-                    call_stack.append((w, list(edges.get(w, set())), 0))
-                elif w in on_stack:
-                    lowlink[v] = min(lowlink[v], index_map[w])
-            else:
-                if lowlink[v] == index_map[v]:
-                    scc: set[str] = set()
-                    while True:
-                        w = stack.pop()
-                        on_stack.discard(w)
-                        scc.add(w)
-                        if w == v:
-                            break
-                    if len(scc) > 1:
-                        sccs.append(scc)
-                call_stack.pop()
-                if call_stack:
-                    parent = call_stack[-1][0]
-                    lowlink[parent] = min(lowlink[parent], lowlink[v])
-
-    return sccs
 
-
-def validate_story_nodes() -> List[str]:
-    """Run strict validation over story structure, links, and choice schemas."""
-    warnings: List[str] = []
+def validation_context() -> ValidationContext:
+    """Collect known flags, obtainable items and per-class stat caps for the story."""
     known_flags, obtainable_items = _collect_story_metadata()
-    known_classes = set(CLASS_TEMPLATES.keys())
-    max_stats = _max_stats_for_class()
+    return ValidationContext(known_flags, obtainable_items, set(CLASS_TEMPLATES.keys()), _max_stats_for_class())
 
-    for node_id, node in STORY_NODES.items():
-        if node.get("id") != node_id:
-            warnings.append(f"Node key '{node_id}' does not match its id field '{node.get('id')}'.")
-
-        if not _node_is_terminal(node_id, node):
-            if not _iter_all_choices(node):
-                warnings.append(f"Node '{node_id}' has no choices and is not marked as terminal.")
-
-        for idx, (choice_source, choice) in enumerate(_iter_choice_entries(node), start=1):
-            label = choice.get("label", f"unnamed-{idx}")
-            next_id = choice.get("next")
-            # Standard player-selectable choices must transition somewhere.
-            # Auto choices can be log/effect-only events with no transition.
-            if choice_source == "choices" and next_id not in STORY_NODES:
-                warnings.append(f"Choice '{label}' in node '{node_id}' points to missing node '{next_id}'.")
-            if choice_source == "auto_choices" and next_id is not None and next_id not in STORY_NODES:
-                warnings.append(f"Choice '{label}' in node '{node_id}' points to missing node '{next_id}'.")
-
-            requirements = choice.get("requirements", {})
-            if "class" in requirements:
-                unknown_classes = sorted(set(requirements["class"]) - known_classes)
-                if unknown_classes:
+
+def validate_node(node_id: str, node: Dict[str, Any], context: ValidationContext) -> List[str]:
+    """Validate one node's structure, links, and choice schemas."""
+    warnings: List[str] = []
+    known_flags = context.known_flags
+    obtainable_items = context.obtainable_items
+    known_classes = context.known_classes
+    max_stats = context.max_stats
+
+    if node.get("id") != node_id:
+        warnings.append(f"Node key '{node_id}' does not match its id field '{node.get('id')}'.")
+
+    if not _node_is_terminal(node_id, node):
+        if not _iter_all_choices(node):
+            warnings.append(f"Node '{node_id}' has no choices and is not marked as terminal.")
+
+    for idx, (choice_source, choice) in enumerate(_iter_choice_entries(node), start=1):
+        label = choice.get("label", f"unnamed-{idx}")
+        next_id = choice.get("next")
+        # Standard player-selectable choices must transition somewhere.
+        # Auto choices can be log/effect-only events with no transition.
+        if choice_source == "choices" and next_id not in STORY_NODES:
+            warnings.append(f"Choice '{label}' in node '{node_id}' points to missing node '{next_id}'.")
+        if choice_source == "auto_choices" and next_id is not None and next_id not in STORY_NODES:
+            warnings.append(f"Choice '{label}' in node '{node_id}' points to missing node '{next_id}'.")
+
+        requirements = choice.get("requirements", {})
+        if "class" in requirements:
+            unknown_classes = sorted(set(requirements["class"]) - known_classes)
+            if unknown_classes:
+                warnings.append(
+                    f"Choice '{label}' in node '{node_id}' has unknown classes: {', '.join(unknown_classes)}."
+                )
+        if "any_of" in requirements:
+            for option in requirements["any_of"]:
+                unknown_any_of = sorted(set(option) - ALLOWED_REQUIREMENT_KEYS)
+                if unknown_any_of:
                     warnings.append(
-                        f"Choice '{label}' in node '{node_id}' has unknown classes: {', '.join(unknown_classes)}."
+                        f"Choice '{label}' in node '{node_id}' has unknown requirement keys: {', '.join(unknown_any_of)}."
                     )
-            if "any_of" in requirements:
-                for option in requirements["any_of"]:
-                    unknown_any_of = sorted(set(option) - ALLOWED_REQUIREMENT_KEYS)
-                    if unknown_any_of:
-                        warnings.append(
-                            f"Choice '{label}' in node '{node_id}' has unknown requirement keys: {', '.join(unknown_any_of)}."
-                        )
-            unknown_req_keys = sorted(set(requirements) - ALLOWED_REQUIREMENT_KEYS)
-            if unknown_req_keys:
+        unknown_req_keys = sorted(set(requirements) - ALLOWED_REQUIREMENT_KEYS)
+        if unknown_req_keys:
+            warnings.append(
+                f"Choice '{label}' in node '{node_id}' has unknown requirement keys: {', '.join(unknown_req_keys)}."
+            )
+
+        effects = choice.get("effects", {})
+        unknown_effect_keys = sorted(set(effects) - ALLOWED_EFFECT_KEYS)
+        if unknown_effect_keys:
+            warnings.append(
+                f"Choice '{label}' in node '{node_id}' has unknown effect keys: {', '.join(unknown_effect_keys)}."
+            )
+
+        for item in requirements.get("items", []):
+            if item not in obtainable_items:
                 warnings.append(
-                    f"Choice '{label}' in node '{node_id}' has unknown requirement keys: {', '.join(unknown_req_keys)}."
+                    f"Choice '{label}' in node '{node_id}' requires item '{item}' that is never granted."
                 )
-
-            effects = choice.get("effects", {})
-            unknown_effect_keys = sorted(set(effects) - ALLOWED_EFFECT_KEYS)
-            if unknown_effect_keys:
+        for item in effects.get("remove_items", []):
+            if item not in obtainable_items:
+                warnings.append(
+                    f"Choice '{label}' in node '{node_id}' removes item '{item}' that is never granted."
+                )
+        for item in requirements.get("missing_items", []):
+            if item not in obtainable_items:
                 warnings.append(
-                    f"Choice '{label}' in node '{node_id}' has unknown effect keys: {', '.join(unknown_effect_keys)}."
+                    f"Choice '{label}' in node '{node_id}' checks missing item '{item}' that is never granted."
                 )
 
-            for item in requirements.get("items", []):
-                if item not in obtainable_items:
-                    warnings.append(
-                        f"Choice '{label}' in node '{node_id}' requires item '{item}' that is never granted."
-                    )
-            for item in effects.get("remove_items", []):
-                if item not in obtainable_items:
-                    warnings.append(
-                        f"Choice '{label}' in node '{node_id}' removes item '{item}' that is never granted."
-                    )
-            for item in requirements.get("missing_items", []):
-                if item not in obtainable_items:
-                    warnings.append(
-                        f"Choice '{label}' in node '{node_id}' checks missing item '{item}' that is never granted."
-                    )
+        for flag in requirements.get("flag_true", []):
+            if flag not in known_flags:
+                warnings.append(
+                    f"Choice '{label}' in node '{node_id}' requires flag '{flag}' that is never set."
+                )
+        for flag in requirements.get("flag_false", []):
+            if flag not in known_flags:
+                warnings.append(
+                    f"Choice '{label}' in node '{node_id}' checks flag '{flag}' that is never set."
+                )
 
-            for flag in requirements.get("flag_true", []):
-                if flag not in known_flags:
-                    warnings.append(
-                        f"Choice '{label}' in node '{node_id}' requires flag '{flag}' that is never set."
-                    )
-            for flag in requirements.get("flag_false", []):
-                if flag not in known_flags:
-                    warnings.append(
-                        f"Choice '{label}' in node '{node_id}' checks flag '{flag}' that is never set."
-                    )
+        if "trait_delta" in effects:
+            unknown_traits = sorted(set(effects["trait_delta"]) - set(TRAIT_KEYS))
+            if unknown_traits:
+                warnings.append(
+                    f"Choice '{label}' in node '{node_id}' uses unknown traits in trait_delta: {', '.join(unknown_traits)}."
+                )
 
-            if "trait_delta" in effects:
-                unknown_traits = sorted(set(effects["trait_delta"]) - set(TRAIT_KEYS))
-                if unknown_traits:
-                    warnings.append(
-                        f"Choice '{label}' in node '{node_id}' uses unknown traits in trait_delta: {', '.join(unknown_traits)}."
-                    )
+        if "faction_delta" in effects:
+            unknown_factions = sorted(set(effects["faction_delta"]) - set(FACTION_KEYS))
+            if unknown_factions:
+                warnings.append(
+                    f"Choice '{label}' in node '{node_id}' uses unknown factions in faction_delta: {', '.join(unknown_factions)}."
+                )
 
-            if "faction_delta" in effects:
-                unknown_factions = sorted(set(effects["faction_delta"]) - set(FACTION_KEYS))
-                if unknown_factions:
+        for stat_key in ("min_hp", "min_gold", "min_strength", "min_dexterity"):
+            if stat_key in requirements:
+                required_value = requirements[stat_key]
+                required_classes: Iterable[str] = requirements.get("class", known_classes)
+                if all(required_value > max_stats[class_name][stat_key.replace("min_", "")] for class_name in required_classes):
                     warnings.append(
-                        f"Choice '{label}' in node '{node_id}' uses unknown factions in faction_delta: {', '.join(unknown_factions)}."
+                        f"Choice '{label}' in node '{node_id}' requires {stat_key}={required_value}, which is unreachable for all valid classes."
                     )
 
-            for stat_key in ("min_hp", "min_gold", "min_strength", "min_dexterity"):
-                if stat_key in requirements:
-                    required_value = requirements[stat_key]
-                    required_classes: Iterable[str] = requirements.get("class", known_classes)
-                    if all(required_value > max_stats[class_name][stat_key.replace("min_", "")] for class_name in required_classes):
+        for variant in choice.get("conditional_effects", []):
+            variant_req = variant.get("requirements", {})
+            if "any_of" in variant_req:
+                for option in variant_req["any_of"]:
+                    unknown_any_of = sorted(set(option) - ALLOWED_REQUIREMENT_KEYS)
+                    if unknown_any_of:
                         warnings.append(
-                            f"Choice '{label}' in node '{node_id}' requires {stat_key}={required_value}, which is unreachable for all valid classes."
+                            f"Choice '{label}' in node '{node_id}' has unknown requirement keys: {', '.join(unknown_any_of)}."
                         )
+            unknown_variant_req = sorted(set(variant_req) - ALLOWED_REQUIREMENT_KEYS)
+            if unknown_variant_req:
+                warnings.append(
+                    f"Choice '{label}' in node '{node_id}' has unknown requirement keys: {', '.join(unknown_variant_req)}."
+                )
+            variant_effects = variant.get("effects", {})
+            unknown_variant_effects = sorted(set(variant_effects) - ALLOWED_EFFECT_KEYS)
+            if unknown_variant_effects:
+                warnings.append(
+                    f"Choice '{label}' in node '{node_id}' has unknown effect keys: {', '.join(unknown_variant_effects)}."
+                )
+            if "next" in variant and variant["next"] not in STORY_NODES:
+                warnings.append(
+                    f"Choice '{label}' in node '{node_id}' has conditional next pointing to missing node '{variant['next']}'."
+                )
 
-            for variant in choice.get("conditional_effects", []):
-                variant_req = variant.get("requirements", {})
-                if "any_of" in variant_req:
-                    for option in variant_req["any_of"]:
-                        unknown_any_of = sorted(set(option) - ALLOWED_REQUIREMENT_KEYS)
-                        if unknown_any_of:
-                            warnings.append(
-                                f"Choice '{label}' in node '{node_id}' has unknown requirement keys: {', '.join(unknown_any_of)}."
-                            )
-                unknown_variant_req = sorted(set(variant_req) - ALLOWED_REQUIREMENT_KEYS)
-                if unknown_variant_req:
-                    warnings.append(
-                        f"Choice '{label}' in node '{node_id}' has unknown requirement keys: {', '.join(unknown_variant_req)}."
-                    )
-                variant_effects = variant.get("effects", {})
-                unknown_variant_effects = sorted(set(variant_effects) - ALLOWED_EFFECT_KEYS)
-                if unknown_variant_effects:
-                    warnings.append(
-                        f"Choice '{label}' in node '{node_id}' has unknown effect keys: {', '.join(unknown_variant_effects)}."
-                    )
-                if "next" in variant and variant["next"] not in STORY_NODES:
-                    warnings.append(
-                        f"Choice '{label}' in node '{node_id}' has conditional next pointing to missing node '{variant['next']}'."
-                    )
+        if "class" in requirements and not requirements["class"]:
+            warnings.append(f"Choice '{label}' in node '{node_id}' has empty class requirements list.")
 
-            if "class" in requirements and not requirements["class"]:
-                warnings.append(f"Choice '{label}' in node '{node_id}' has empty class requirements list.")
+    if node_id.startswith(INTRO_NODE_PREFIX):
+        return warnings
 
-        if node_id.startswith(INTRO_NODE_PREFIX):
-            continue
+    if _iter_all_choices(node):
+        for class_name in known_classes:
+            if not _any_choice_possible_for_class(node, class_name, obtainable_items, max_stats[class_name]):
+                warnings.append(
+                    f"Node '{node_id}' appears to lock out the {class_name} class with its current requirements."
+                )
+    return warnings
 
-        if _iter_all_choices(node):
-            for class_name in known_classes:
-                if not _any_choice_possible_for_class(node, class_name, obtainable_items, max_stats[class_name]):
-                    warnings.append(
-                        f"Node '{node_id}' appears to lock out the {class_name} class with its current requirements."
-                    )
 
+def cycle_warnings(graph: StoryGraph) -> List[str]:
+    """Report nodes caught in loops with no way out."""
     # Graph cycle detection: find strongly connected components (SCCs) with
     # no exit edge — these are true dead-end loops the player cannot escape.
     # Hub loops (village ↔ camp) are intentional and have exits, so they pass.
-    all_edges: dict[str, set[str]] = {}
-    for nid, node in STORY_NODES.items():
-        targets: set[str] = set()
-        for choice in _iter_all_choices(node):
-            next_id = choice.get("next")
-            if next_id and next_id in STORY_NODES:
-                targets.add(next_id)
-        all_edges[nid] = targets
-
-    sccs = _find_sccs_iterative(all_edges, set(STORY_NODES))
-
-    for scc in sccs:
-        has_exit = any(
-            target not in scc
-            for nid in scc
-            for target in all_edges.get(nid, set())
-        )
+    warnings: List[str] = []
+    for component in strongly_connected_components(graph):
+        if len(component) < 2:
+            continue
+        members = set(component)
+        has_exit = any(target not in members for node in component for target in graph.successors(node))
         if not has_exit:
-            for nid in sorted(scc):
+            for nid in sorted(graph.ids(component)):
                 if not _node_is_terminal(nid, STORY_NODES[nid]):
                     warnings.append(
                         f"Node '{nid}' is in a cycle with no exit (potential inescapable loop)."
                     )
+    return warnings
+
 
+def validate_story_nodes() -> List[str]:
+    """Run strict validation over story structure, links, and choice schemas."""
+    context = validation_context()
+    warnings: List[str] = []
+    for node_id, node in STORY_NODES.items():
+        warnings.extend(validate_node(node_id, node, context))
+    warnings.extend(cycle_warnings(get_story_graph()))
     return warnings
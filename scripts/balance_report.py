@@ -1,14 +1,19 @@
 from __future__ import annotations
 
+import argparse
 from collections import defaultdict
 from pathlib import Path
+import pickle
 import sys
 
 REPO_ROOT = Path(__file__).resolve().parents[1]
 if str(REPO_ROOT) not in sys.path:
     sys.path.insert(0, str(REPO_ROOT))
 
-from game.content import CLASS_TEMPLATES, STORY_NODES
+from game.content import CLASS_TEMPLATES, STORY_NODES, get_node_hashes, get_story_graph, get_story_merkle_root
+from game.content.graph import reachable
+from game.paths import user_cache_dir
+from game.state import INTRO_NODE_BY_CLASS
 from game.validation import _collect_story_metadata, _max_stats_for_class
 
 
@@ -30,9 +35,46 @@ def _choice_possible_for_class(choice: dict, class_name: str, obtainable_items:
     return True
 
 
+def _cache_path() -> Path:
+    return user_cache_dir() / "balance-report.pickle"
+
+
+def _load_cache() -> dict:
+    try:
+        with _cache_path().open("rb") as handle:
+            cache = pickle.load(handle)
+    except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ImportError):
+        return {}
+    return cache if isinstance(cache, dict) else {}
+
+
+def _save_cache(cache: dict) -> None:
+    try:
+        _cache_path().parent.mkdir(parents=True, exist_ok=True)
+        with _cache_path().open("wb") as handle:
+            pickle.dump(cache, handle)
+    except OSError:
+        pass
+
+
 def main() -> None:
-    _, obtainable_items = _collect_story_metadata()
-    max_stats = _max_stats_for_class()
+    parser = argparse.ArgumentParser(description="Class viability, resource-pressure and reachability report.")
+    parser.add_argument("--no-cache", action="store_true", help="Recompute everything instead of reusing results for unchanged content.")
+    args = parser.parse_args()
+
+    # Story-wide facts only change when the story's Merkle root does; per-choice
+    # viability only changes when that choice's requirement hash (or those facts) do.
+    cache = {} if args.no_cache else _load_cache()
+    root = get_story_merkle_root()
+    if cache.get("root") == root:
+        obtainable_items, max_stats = cache["context"]
+    else:
+        _, obtainable_items = _collect_story_metadata()
+        max_stats = _max_stats_for_class()
+    context = (obtainable_items, max_stats)
+    viability = cache.get("viability", {}) if cache.get("context") == context else {}
+    reused = 0
+    graph = get_story_graph()
 
     for class_name, template in CLASS_TEMPLATES.items():
         totals = defaultdict(int)
@@ -42,11 +84,17 @@ def main() -> None:
             choices = node.get("choices", [])
             if not choices:
                 continue
-            possible_choices = [
-                choice
-                for choice in choices
-                if _choice_possible_for_class(choice, class_name, obtainable_items, max_stats[class_name])
-            ]
+            possible_choices = []
+            for choice, requirement_hash in zip(choices, get_node_hashes(node_id).requirements):
+                key = (class_name, requirement_hash)
+                possible = viability.get(key)
+                if possible is None:
+                    possible = _choice_possible_for_class(choice, class_name, obtainable_items, max_stats[class_name])
+                    viability[key] = possible
+                else:
+                    reused += 1
+                if possible:
+                    possible_choices.append(choice)
             if not possible_choices:
                 locked_nodes.append(node_id)
             for choice in possible_choices:
@@ -62,6 +110,12 @@ def main() -> None:
         print(f"Estimated max stats: {max_stats[class_name]}")
         print(f"Nodes with choices evaluated: {totals['nodes']}")
         print(f"Total viable choices: {totals['choices']}")
+        intro = INTRO_NODE_BY_CLASS.get(class_name)
+        if intro in graph.index:
+            # Link reachability only; requirements and non-choice transitions (death) are ignored.
+            seen = reachable(graph, [graph.index[intro]])
+            endings = [node_id for node_id, hit in zip(graph.node_ids, seen) if hit and node_id.startswith("ending_")]
+            print(f"Scenes linked from {intro}: {sum(seen)}/{graph.node_count} ({len(endings)} endings)")
         if locked_nodes:
             print("Locked nodes (no viable choices):")
             for node_id in locked_nodes:
@@ -72,6 +126,10 @@ def main() -> None:
                 print(f"  - {node_id}: {label}")
         print()
 
+    if not args.no_cache:
+        _save_cache({"root": root, "context": context, "viability": viability})
+    print(f"Reused cached viability for {reused} choice checks.")
+
 
 if __name__ == "__main__":
     main()
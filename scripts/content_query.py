@@ -0,0 +1,45 @@
+from __future__ import annotations
+
+import argparse
+import sys
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(REPO_ROOT))
+
+from game.content import STORY_NODES, get_reverse_index  # noqa: E402
+from game.content.reverse_index import ContentRef  # noqa: E402
+
+_QUERIES = {
+    "sets-flag": ("setters", "Choices that set flag"),
+    "reads-flag": ("readers", "Choices that check flag"),
+    "grants-item": ("granters", "Choices that grant item"),
+    "removes-item": ("removers", "Choices that remove item"),
+    "requires-item": ("requirers", "Choices that require item"),
+    "leads-to": ("sources", "Choices leading into node"),
+}
+
+
+def _describe(ref: ContentRef) -> str:
+    if ref.choice is None:
+        return f"{ref.node_id} (node requirements)"
+    node = STORY_NODES[ref.node_id]
+    choices = list(node.get("choices", ())) + list(node.get("auto_choices", ()))
+    return f"{ref.node_id}: {choices[ref.choice].get('label', '(unnamed)')}"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Look up story content through the compiled reverse indexes.")
+    parser.add_argument("query", choices=sorted(_QUERIES))
+    parser.add_argument("name", help="Flag, item or node id to look up.")
+    args = parser.parse_args()
+
+    method, title = _QUERIES[args.query]
+    refs = getattr(get_reverse_index(), method)(args.name)
+    print(f"{title} '{args.name}': {len(refs)}")
+    for ref in refs:
+        print(f"  - {_describe(ref)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,25 @@
+from __future__ import annotations
+
+import argparse
+from pathlib import Path
+import sys
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
+
+from game.content.campaign import builtin_campaign, export_campaign
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Export the built-in story as a data-file campaign (JSON acts + indexed manifest).")
+    parser.add_argument("out_dir", type=Path)
+    args = parser.parse_args()
+
+    manifest = export_campaign(builtin_campaign(use_bundles=False), args.out_dir)
+    print(f"Wrote {manifest}")
+    print(f"Play it with: CHOICE_GAME_CAMPAIGN={manifest} streamlit run app.py")
+
+
+if __name__ == "__main__":
+    main()
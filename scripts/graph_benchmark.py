@@ -0,0 +1,58 @@
+from __future__ import annotations
+
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(REPO_ROOT))
+
+from game.content.graph import build_story_graph, reachable, strongly_connected_components  # noqa: E402
+
+
+def synthetic_story(node_count: int, choices_per_node: int, seed: int) -> Dict[str, Dict[str, Any]]:
+    """A story-shaped graph: mostly forward links, some loops back to hubs."""
+    rng = random.Random(seed)
+    nodes: Dict[str, Dict[str, Any]] = {}
+    for position in range(node_count):
+        choices = []
+        for choice_index in range(choices_per_node):
+            if rng.random() < 0.2:
+                target = rng.randrange(max(1, position))
+            else:
+                target = min(node_count - 1, position + 1 + rng.randrange(50))
+            choices.append({"label": f"choice {choice_index}", "next": f"n{target}"})
+        nodes[f"n{position}"] = {"id": f"n{position}", "choices": choices}
+    return nodes
+
+
+def _timed(label: str, fn):
+    start = time.perf_counter()
+    result = fn()
+    print(f"{label:<28} {(time.perf_counter() - start) * 1000:9.1f} ms")
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Time the CSR story graph passes on a large synthetic story.")
+    parser.add_argument("--nodes", type=int, default=100_000)
+    parser.add_argument("--choices", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    nodes = synthetic_story(args.nodes, args.choices, args.seed)
+    graph = _timed("build CSR", lambda: build_story_graph(nodes))
+    components = _timed("strongly connected comps", lambda: strongly_connected_components(graph))
+    forward = _timed("forward reachability", lambda: reachable(graph, [0]))
+    backward = _timed("reverse reachability", lambda: reachable(graph, [graph.node_count - 1], reverse=True))
+    print(
+        f"{graph.node_count} nodes, {graph.edge_count} edges, {len(components)} components, "
+        f"{sum(forward)} reachable, {sum(backward)} reach the last node"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+from __future__ import annotations
+
+import argparse
+import json
+from pathlib import Path
+import sys
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
+
+from game.saves.bulk import migrate_save_directory, migrate_save_store
+from game.saves.store import SaveStore
+
+_DATABASE_SUFFIXES = {".sqlite3", ".sqlite", ".db"}
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Validate and migrate stored saves against the current story content.")
+    parser.add_argument("source", type=Path, help="Directory of *.json saves, or a save-slot database.")
+    parser.add_argument("--out", type=Path, help="Where to write migrated saves (directory, or database for database sources).")
+    parser.add_argument("--report", type=Path, help="Where to write the JSON report (default: print only).")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: CPU count).")
+    args = parser.parse_args()
+
+    if args.source.is_file() and args.source.suffix in _DATABASE_SUFFIXES:
+        out_store = SaveStore(args.out) if args.out else None
+        report = migrate_save_store(args.source, out_store, workers=args.workers)
+    elif args.source.is_dir():
+        report = migrate_save_directory(args.source, args.out, workers=args.workers)
+    else:
+        parser.error(f"{args.source} is neither a directory nor a save database.")
+
+    summary = report.to_dict()
+    if args.report:
+        args.report.parent.mkdir(parents=True, exist_ok=True)
+        args.report.write_text(json.dumps(summary, indent=2), encoding="utf-8")
+
+    print(f"Saves checked: {summary['total']}")
+    for status, count in sorted(summary["statuses"].items()):
+        print(f"  {status}: {count}")
+    for section in ("errors", "warnings"):
+        if summary[section]:
+            print(f"Top {section}:")
+            for entry in summary[section][:10]:
+                print(f"  - {entry['message']} ({entry['count']})")
+    return 1 if summary["statuses"].get("invalid") or summary["statuses"].get("unreadable") else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,88 @@
+from __future__ import annotations
+
+import argparse
+import os
+from pathlib import Path
+import subprocess
+import sys
+import time
+from concurrent.futures import wait
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(REPO_ROOT))
+
+
+def _walk(steps: int, prefetch: bool) -> list[float]:
+    """Play fixed routes and time the work between each click and the next node being ready to paint."""
+    from game import logic
+    from game.data import STORY_NODES
+    from game.engine.state import state_from_session
+    from game.logic import execute_choice, get_node_choice_evaluations
+    from game.state import ensure_session_state, reset_game_state, start_game
+    from game.streamlit_compat import st
+    from game.ui_components import node_presentation
+    from game.ui_components.node_presentation import narrative_fragment
+    from game.ui_components.prefetch import prefetch_destinations
+
+    timings = []
+    for player_class in ("Warrior", "Rogue", "Archer"):
+        for pick in (0, -1):
+            ensure_session_state()
+            reset_game_state()
+            start_game(player_class)
+            # Every route starts cold, as for a node no other session has reached yet.
+            st.session_state.pop("_choice_eval_cache", None)
+            logic._SHARED_CHOICE_EVAL_CACHE.clear()
+            node_presentation._FRAGMENTS.clear()
+            node_presentation._PLANS.clear()
+            for _ in range(steps):
+                node_id = st.session_state.current_node
+                node = STORY_NODES[node_id]
+                entries = [entry for entry in get_node_choice_evaluations(node_id, node) if entry["is_available"]]
+                if not entries:
+                    break
+                if prefetch:
+                    # The player reads while the pool works.
+                    wait(prefetch_destinations(entries))
+                entry = entries[pick]
+                execute_choice(node_id, entry["choice"]["label"], entry["choice"], entry["choice_id"])
+                started = time.perf_counter()
+                next_id = st.session_state.current_node
+                get_node_choice_evaluations(next_id, STORY_NODES[next_id])
+                narrative_fragment(next_id, STORY_NODES[next_id], state_from_session(st.session_state))
+                timings.append(time.perf_counter() - started)
+    return timings
+
+
+def _run_fresh(steps: int, prefetch: bool) -> list[float]:
+    env = {**os.environ, "CHOICE_GAME_PREFETCH_WORKERS": "2" if prefetch else "0"}
+    result = subprocess.run(
+        [sys.executable, __file__, "--steps", str(steps), "--worker", "on" if prefetch else "off"],
+        cwd=REPO_ROOT,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return [float(value) for value in result.stdout.split()]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compare click-to-paint work with and without background prefetch.")
+    parser.add_argument("--steps", type=int, default=25)
+    parser.add_argument("--worker", choices=("on", "off"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(" ".join(f"{seconds:.9f}" for seconds in _walk(args.steps, args.worker == "on")))
+        return
+
+    for label, prefetch in (("no prefetch", False), ("prefetch", True)):
+        timings = sorted(_run_fresh(args.steps, prefetch))
+        mean_ms = sum(timings) / len(timings) * 1000
+        p90_ms = timings[int(len(timings) * 0.9)] * 1000
+        print(f"{label:<12} {len(timings):4d} clicks  mean {mean_ms:7.3f} ms  p90 {p90_ms:7.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+from __future__ import annotations
+
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(REPO_ROOT))
+
+from game.content.story_utils import run_simplification  # noqa: E402
+
+
+def synthetic_story(node_count: int, choices_per_node: int, seed: int) -> Dict[str, Dict[str, Any]]:
+    """Nodes far over the choice cap, with duplicates, auto-applied and log-only choices."""
+    rng = random.Random(seed)
+    nodes: Dict[str, Dict[str, Any]] = {}
+    for position in range(node_count):
+        choices = []
+        for choice_index in range(choices_per_node):
+            roll = rng.random()
+            choice: Dict[str, Any] = {"label": f"choice {choice_index}", "next": f"n{rng.randrange(node_count)}"}
+            if roll < 0.4:
+                choice["effects"] = {"log": "Nothing much happens."}
+            elif roll < 0.7:
+                choice["effects"] = {"gold": rng.randrange(1, 5), "set_flags": {f"f{rng.randrange(100)}": True}}
+                choice["requirements"] = {"min_hp": rng.randrange(1, 10)}
+            elif roll < 0.75:
+                choice["auto_apply"] = True
+                choice["effects"] = {"hp": -1}
+            choices.append(choice)
+        nodes[f"n{position}"] = {"id": f"n{position}", "text": "...", "choices": choices}
+    return nodes
+
+
+def _run(label: str, nodes: Dict[str, Dict[str, Any]], workers: int) -> None:
+    start = time.perf_counter()
+    result = run_simplification(nodes, workers=workers)
+    elapsed = (time.perf_counter() - start) * 1000
+    passes = "  ".join(f"{name} {seconds * 1000:.0f}" for name, seconds in result.timings.items())
+    print(f"{label:<22} {elapsed:9.1f} ms   report lines {len(result.report):7d}   per pass (ms, summed over workers): {passes}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Time the choice simplification passes on large synthetic stories.")
+    parser.add_argument("--nodes", type=int, default=2_000)
+    parser.add_argument("--choices", type=int, default=200)
+    parser.add_argument("--wide-choices", type=int, default=50_000, help="Choices on the single-node run.")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    wide = synthetic_story(1, args.wide_choices, args.seed)
+    _run(f"1 node x {args.wide_choices}", wide, workers=1)
+
+    story = synthetic_story(args.nodes, args.choices, args.seed)
+    _run(f"{args.nodes} nodes, serial", story, workers=1)
+    _run(f"{args.nodes} nodes, parallel", story, workers=0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+from __future__ import annotations
+
+import argparse
+import os
+from pathlib import Path
+import subprocess
+import sys
+import tempfile
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+
+# Everything the app does with story content before it can render the first page.
+_FIRST_RENDER_WORK = """
+import time
+start = time.perf_counter()
+from game.data import get_story_validation_warnings, init_story_nodes
+imported = time.perf_counter()
+init_story_nodes()
+get_story_validation_warnings()
+done = time.perf_counter()
+print(f"{(imported - start) * 1000:.1f} {(done - imported) * 1000:.1f}")
+"""
+
+
+def _time_fresh_process(env: dict[str, str]) -> tuple[float, float]:
+    result = subprocess.run(
+        [sys.executable, "-c", _FIRST_RENDER_WORK],
+        cwd=REPO_ROOT,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    import_ms, load_ms = result.stdout.strip().splitlines()[-1].split()
+    return float(import_ms), float(load_ms)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Measure story load time in fresh processes, with and without a compiled bundle.")
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        env = {**os.environ, "LOCALAPPDATA": tmp, "PYTHONPATH": str(REPO_ROOT)}
+        env.pop("CHOICE_GAME_NO_STORY_CACHE", None)
+        uncached_env = {**env, "CHOICE_GAME_NO_STORY_CACHE": "1"}
+
+        uncached = [_time_fresh_process(uncached_env) for _ in range(args.runs)]
+        compile_run = _time_fresh_process(env)
+        cached = [_time_fresh_process(env) for _ in range(args.runs)]
+
+    def report(name: str, samples: list[tuple[float, float]]) -> None:
+        import_ms = min(sample[0] for sample in samples)
+        load_ms = min(sample[1] for sample in samples)
+        print(f"{name:<30} import {import_ms:7.1f} ms   story ready {load_ms:7.1f} ms   total {import_ms + load_ms:7.1f} ms")
+
+    report("No bundle (build + validate)", uncached)
+    report("First start (build + write)", [compile_run])
+    report(f"Bundle hit (best of {args.runs})", cached)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+from __future__ import annotations
+
+import argparse
+import sys
+from pathlib import Path
+from typing import Any
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(REPO_ROOT))
+
+from game.content.frozen import FrozenMap, Interner, deep_size, freeze_story_nodes, thaw  # noqa: E402
+from game.content.registry import campaign_ids, get_campaign  # noqa: E402
+
+
+def _count_containers(value: Any) -> int:
+    if isinstance(value, (dict, FrozenMap)):
+        return 1 + sum(_count_containers(item) for item in value.values())
+    if isinstance(value, (list, tuple)):
+        return 1 + sum(_count_containers(item) for item in value)
+    return 0
+
+
+def _report(campaign_id: str) -> None:
+    campaign = get_campaign(campaign_id)
+    plain = {node_id: thaw(node) for node_id, node in campaign.all_nodes().items()}
+    frozen = freeze_story_nodes(plain)
+    interner = Interner()
+    interned = freeze_story_nodes(plain, interner)
+    plain_bytes = deep_size(plain)
+    frozen_bytes = deep_size(frozen)
+    interned_bytes = deep_size(interned)
+
+    print(f"Campaign:             {campaign_id} ({campaign.name})")
+    print(f"Nodes:                {len(frozen)}")
+    print(f"Containers:           {_count_containers(plain)}")
+    print(f"Plain dicts/lists:    {plain_bytes / 1024:8.1f} KiB")
+    print(f"Frozen graph:         {frozen_bytes / 1024:8.1f} KiB")
+    print(f"Saved:                {(1 - frozen_bytes / plain_bytes) * 100:8.1f} %")
+    print(f"Interned graph:       {interned_bytes / 1024:8.1f} KiB ({interner.shared} shared fragments)")
+    print(f"Saved by interning:   {(frozen_bytes - interned_bytes) / 1024:8.1f} KiB ({(1 - interned_bytes / frozen_bytes) * 100:.1f} %)")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compare the memory held by plain dict story nodes, the frozen story graph and its interned form.")
+    parser.add_argument("campaigns", nargs="*", help="campaign ids to measure (default: every registered campaign)")
+    args = parser.parse_args()
+
+    for position, campaign_id in enumerate(args.campaigns or campaign_ids()):
+        if position:
+            print()
+        _report(campaign_id)
+
+
+if __name__ == "__main__":
+    main()
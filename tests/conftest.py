@@ -1,6 +1,12 @@
 """Shared test configuration."""
 
-from game.data import init_story_nodes
+import os
+
+# Set before any story loads: pytest_configure runs before PYTEST_CURRENT_TEST
+# exists, so the compiler's own guard cannot keep the suite out of the user cache.
+os.environ.setdefault("CHOICE_GAME_NO_STORY_CACHE", "1")
+
+from game.data import init_story_nodes  # noqa: E402
 
 
 def pytest_configure(config):
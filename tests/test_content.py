@@ -0,0 +1,758 @@
+import json
+import os
+import pickle
+import tempfile
+import threading
+import unittest
+from array import array
+from pathlib import Path
+
+from game.content.campaign import ActSource, Campaign, builtin_campaign, export_campaign, load_campaign_manifest, use_campaign
+from game.content.compiler import bundle_path, load_bundle
+from game.content.frozen import Interner, StoryChoice, StoryEffects, StoryNode, deep_size, freeze_story_nodes, thaw
+from game.content.graph import build_story_graph, reachable, strongly_connected_components
+from game.content.image import story_image_path
+from game.content.reverse_index import ContentRef, build_reverse_index
+from game.content.registry import CampaignRegistry, get_campaign
+from game.content.reload import ContentWatcher
+from game.content.story_utils import SIMPLIFICATION_PASSES, SimplificationPass, run_simplification
+from game.content.strings import (
+    StringTableBuilder,
+    TextRef,
+    open_string_table,
+    register_string_table,
+    string_table,
+    write_string_table,
+)
+from game.data import (
+    MAX_CHOICES_PER_NODE,
+    STORY_NODES,
+    get_choice_simplification_report,
+    get_node_hashes,
+    get_reverse_index,
+    get_story_content_hash,
+    get_story_graph,
+    get_story_merkle_root,
+    get_story_validation_warnings,
+)
+
+
+class StoryBundleTests(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.directory = Path(self._tmp.name)
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def _campaign(self):
+        return builtin_campaign(bundle_dir=self.directory, use_bundles=True)
+
+    def test_bundles_roundtrip_and_skip_act_loading(self):
+        cold = self._campaign()
+        self.assertEqual(cold.validation_warnings(), get_story_validation_warnings())
+
+        warm = self._campaign()
+        self.assertEqual(list(warm.node_index()), list(STORY_NODES))
+        self.assertEqual(warm.loaded_acts(), ())
+        self.assertEqual(warm.report(), get_choice_simplification_report())
+        self.assertEqual(warm.content_hash(), get_story_content_hash())
+        self.assertEqual(warm.validation_warnings(), get_story_validation_warnings())
+        self.assertIn("ending_good", warm.indexes()["ending_nodes"])
+        self.assertEqual(warm.graph().node_ids, tuple(STORY_NODES))
+        self.assertEqual(warm.reverse_index(), get_reverse_index())
+        self.assertEqual(warm.loaded_acts(), ())
+
+        self.assertEqual(warm.get_node("village_square"), STORY_NODES["village_square"])
+        self.assertEqual(warm.loaded_acts(), ("act1",))
+
+    def test_bundle_for_other_sources_is_ignored(self):
+        self._campaign().validation_warnings()
+        self.assertIsNone(load_bundle("story-builtin", "0" * 64, self.directory))
+
+    def test_corrupt_bundle_is_ignored(self):
+        source_hash = self._campaign().source_hash()
+        path = bundle_path("story-builtin", source_hash, self.directory)
+        path.write_bytes(b"not a pickle")
+        self.assertIsNone(load_bundle("story-builtin", source_hash, self.directory))
+
+        path.write_bytes(pickle.dumps({"nodes": {}}))
+        self.assertIsNone(load_bundle("story-builtin", source_hash, self.directory))
+        self.assertEqual(len(self._campaign().node_index()), len(STORY_NODES))
+
+    def test_new_bundles_replace_those_of_older_sources(self):
+        self._campaign().validation_warnings()
+        generation = sorted(path.name for path in self.directory.iterdir())
+        stale = [
+            bundle_path("act-act1", "a" * 64, self.directory),
+            bundle_path("story-builtin", "b" * 64, self.directory),
+            story_image_path("builtin", "c" * 64, self.directory),
+            self.directory / f"strings-act1-{'d' * 16}.bin",
+        ]
+        unrelated = bundle_path("act-act1-extra", "e" * 64, self.directory)
+        for path in [*stale, unrelated]:
+            path.write_bytes(b"old")
+        for path in self.directory.glob("*-builtin-*"):
+            path.unlink()
+        for path in self.directory.glob("act-act1-*"):
+            if path != unrelated:
+                path.unlink()
+
+        # A cold compile rewrites act1, the summary and the image.
+        self._campaign().validation_warnings()
+        self.assertTrue(all(not path.exists() for path in stale))
+        self.assertTrue(unrelated.exists())
+        unrelated.unlink()
+        self.assertEqual(sorted(path.name for path in self.directory.iterdir()), generation)
+
+    def test_warm_campaign_maps_the_story_image(self):
+        cold = self._campaign()
+        cold.validation_warnings()
+        self.assertTrue(story_image_path("builtin", cold.source_hash(), self.directory).exists())
+
+        warm = self._campaign()
+        graph = warm.graph()
+        self.assertIsInstance(graph.targets, memoryview)
+        self.assertEqual(list(graph.targets), list(get_story_graph().targets))
+        self.assertEqual(list(graph.reverse_edges), list(get_story_graph().reverse_edges))
+        self.assertEqual(warm.validation_warnings(), get_story_validation_warnings())
+        self.assertEqual(warm.reverse_index(), get_reverse_index())
+
+        node = warm.get_node("village_square")
+        self.assertIs(warm.get_node("village_square"), node)
+        self.assertEqual(node, STORY_NODES["village_square"])
+        self.assertEqual(warm.node_hashes("village_square"), get_node_hashes("village_square"))
+        self.assertTrue(string_table(node["text"].table).is_mapped)
+        self.assertEqual(str(node["text"]), str(STORY_NODES["village_square"]["text"]))
+        # Only the one decoded node is held privately, not the whole act.
+        self.assertLess(warm.memory_footprint(), cold.memory_footprint() / 10)
+        # Decoding a node adds its size, counting fragments shared with earlier nodes once.
+        warm.get_node("forest_crossroad")
+        seen: set[int] = set()
+        decoded = warm._loaded["act1"].decoded().values()
+        self.assertEqual(warm.memory_footprint(), sum(deep_size(node, seen) for node in decoded))
+
+    def test_corrupt_story_image_falls_back_to_bundles(self):
+        cold = self._campaign()
+        cold.validation_warnings()
+        story_image_path("builtin", cold.source_hash(), self.directory).write_bytes(b"CGSI not an image")
+
+        warm = self._campaign()
+        self.assertEqual(warm.get_node("village_square"), STORY_NODES["village_square"])
+        self.assertEqual(warm.validation_warnings(), get_story_validation_warnings())
+        self.assertIsInstance(warm.graph().targets, array)
+
+
+class DataFileCampaignTests(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.directory = Path(self._tmp.name)
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def test_exported_json_campaign_matches_builtin_and_loads_lazily(self):
+        manifest = export_campaign(builtin_campaign(use_bundles=False), self.directory / "campaign")
+        campaign = load_campaign_manifest(manifest, use_bundles=False)
+
+        self.assertEqual(list(campaign.node_index()), list(STORY_NODES))
+        self.assertEqual(campaign.loaded_acts(), ())
+        self.assertEqual(campaign.get_node("final_confrontation"), STORY_NODES["final_confrontation"])
+        self.assertEqual(campaign.loaded_acts(), ("act3",))
+        self.assertEqual(campaign.all_nodes(), dict(STORY_NODES.items()))
+        self.assertEqual(campaign.merkle_root(), get_story_merkle_root())
+
+    def test_toml_act_and_campaign_scoped_story_nodes(self):
+        (self.directory / "gate.toml").write_text(
+            """
+[gate]
+id = "gate"
+title = "The Gate"
+text = "A closed gate."
+
+[[gate.choices]]
+label = "Knock"
+next = "gate"
+effects = { log = "You knock." }
+""",
+            encoding="utf-8",
+        )
+        campaign = Campaign("tiny", [ActSource("gate", self.directory / "gate.toml")], use_bundles=False)
+
+        with use_campaign(campaign):
+            self.assertEqual(list(STORY_NODES), ["gate"])
+            self.assertEqual(STORY_NODES["gate"]["choices"][0]["label"], "Knock")
+        self.assertNotIn("gate", STORY_NODES)
+
+    def test_manifest_rejects_unknown_act_file_types(self):
+        manifest = self.directory / "campaign.json"
+        manifest.write_text(json.dumps({"acts": [{"name": "act1", "file": "act1.py"}]}), encoding="utf-8")
+        with self.assertRaises(ValueError):
+            load_campaign_manifest(manifest)
+
+
+class FrozenStoryGraphTests(unittest.TestCase):
+    def test_story_graph_is_deeply_immutable(self):
+        node = STORY_NODES["village_square"]
+        choice = node["choices"][0]
+        self.assertIsInstance(node, StoryNode)
+        self.assertIsInstance(choice, StoryChoice)
+        self.assertIsInstance(choice.effects, StoryEffects)
+        self.assertIsInstance(node["choices"], tuple)
+        with self.assertRaises(TypeError):
+            node["title"] = "Changed"
+        with self.assertRaises(TypeError):
+            choice.effects["gold"] = 99
+        with self.assertRaises(AttributeError):
+            node._values = ()
+
+    def test_merge_effects_leaves_story_content_untouched(self):
+        from game.logic import merge_effects
+
+        choice = next(
+            choice
+            for node in STORY_NODES.values()
+            for choice in node.get("choices", [])
+            if choice.get("effects", {}).get("set_flags")
+        )
+        before = thaw(choice["effects"])
+        merged = merge_effects(choice["effects"], {"set_flags": {"merge_probe": True}, "trait_delta": {"trust": 1}})
+
+        self.assertTrue(merged["set_flags"]["merge_probe"])
+        self.assertEqual(thaw(choice["effects"]), before)
+
+    def test_frozen_nodes_pickle_with_shared_layouts_and_thaw_to_plain_data(self):
+        nodes = [STORY_NODES[node_id] for node_id in list(STORY_NODES)[:5]]
+        restored = pickle.loads(pickle.dumps(nodes))
+
+        self.assertEqual(restored, nodes)
+        self.assertEqual([hash(node) for node in restored], [hash(node) for node in nodes])
+        self.assertIs(restored[0]["choices"][0]._layout, nodes[0]["choices"][0]._layout)
+        plain = thaw(nodes[0])
+        self.assertIsInstance(plain, dict)
+        self.assertIsInstance(plain["choices"], list)
+        self.assertEqual(json.loads(json.dumps(plain)), plain)
+
+
+    def test_compiled_story_shares_equal_fragments(self):
+        requirements = {}
+        for node in STORY_NODES.values():
+            for choice in node.get("choices", ()):
+                if choice.get("requirements"):
+                    requirements.setdefault(choice["requirements"], []).append(choice["requirements"])
+        shared = [instances for instances in requirements.values() if len(instances) > 1]
+        self.assertTrue(shared)
+        for instances in shared:
+            self.assertTrue(all(instance is instances[0] for instance in instances))
+
+    def test_interner_keeps_distinct_values_apart(self):
+        interner = Interner()
+        nodes = freeze_story_nodes(
+            {
+                "a": {"id": "a", "choices": [{"label": "Go", "effects": {"gold": 1}, "requirements": {"class": ["Rogue"]}}]},
+                "b": {"id": "b", "choices": [{"label": "Go", "effects": {"gold": True}, "requirements": {"class": ["Rogue"]}}]},
+                "c": {"id": "c", "choices": [{"label": "Go", "effects": {"gold": 1}, "requirements": {"class": ["Rogue"]}}]},
+            },
+            interner,
+        )
+        a, b, c = (nodes[node_id]["choices"][0] for node_id in "abc")
+
+        self.assertIs(a, c)
+        self.assertIs(a["requirements"], b["requirements"])
+        self.assertIsNot(a["effects"], b["effects"])
+        self.assertIs(b["effects"]["gold"], True)
+        self.assertGreater(interner.shared, 0)
+
+class StoryGraphTests(unittest.TestCase):
+    NODES = {
+        "hub": {"id": "hub", "choices": [{"label": "Left", "next": "left"}, {"label": "Right", "next": "right"}]},
+        "left": {
+            "id": "left",
+            "choices": [
+                {"label": "Back", "next": "hub", "conditional_effects": [{"requirements": {}, "next": "end"}]},
+                {"label": "Nowhere", "next": "missing"},
+            ],
+        },
+        "right": {"id": "right", "choices": [{"label": "Loop", "next": "trap"}]},
+        "trap": {"id": "trap", "choices": [{"label": "Round", "next": "right"}]},
+        "end": {"id": "end", "auto_choices": [{"label": "Rest", "next": None}]},
+    }
+
+    def test_csr_arrays_record_edges_choices_and_reverse_links(self):
+        graph = build_story_graph(self.NODES)
+
+        self.assertEqual(graph.node_ids, ("hub", "left", "right", "trap", "end"))
+        self.assertEqual(list(graph.offsets), [0, 2, 4, 5, 6, 6])
+        self.assertEqual(graph.ids(graph.successors(graph.index["left"])), ["hub", "end"])
+        self.assertEqual(list(graph.edge_choices), [0, 1, 0, 0, 0, 0])
+        self.assertEqual(graph.ids(graph.predecessors(graph.index["right"])), ["hub", "trap"])
+        for node in range(graph.node_count):
+            for slot in range(graph.reverse_offsets[node], graph.reverse_offsets[node + 1]):
+                self.assertEqual(graph.targets[graph.reverse_edges[slot]], node)
+
+    def test_components_and_reachability(self):
+        graph = build_story_graph(self.NODES)
+
+        components = sorted(sorted(graph.ids(component)) for component in strongly_connected_components(graph))
+        self.assertEqual(components, [["end"], ["hub", "left"], ["right", "trap"]])
+        self.assertEqual(graph.ids(node for node, hit in enumerate(reachable(graph, [graph.index["right"]])) if hit), ["right", "trap"])
+        reaches_end = reachable(graph, [graph.index["end"]], reverse=True)
+        self.assertEqual(graph.ids(node for node, hit in enumerate(reaches_end) if hit), ["hub", "left", "end"])
+
+    def test_validation_flags_loops_without_exit(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        path = Path(directory.name) / "act.json"
+        path.write_text(json.dumps(self.NODES), encoding="utf-8")
+        campaign = Campaign("graph", [ActSource("act", path)], use_bundles=False)
+
+        warnings = campaign.validation_warnings()
+        self.assertIn("Node 'trap' is in a cycle with no exit (potential inescapable loop).", warnings)
+        self.assertFalse(any("'hub' is in a cycle" in warning for warning in warnings))
+
+
+class StringTableTests(unittest.TestCase):
+    def test_table_file_is_memory_mapped_and_decoded_per_string(self):
+        with tempfile.TemporaryDirectory() as directory:
+            builder = StringTableBuilder("test-strings")
+            first = builder.add("The bell tolls.")
+            second = builder.add("Ünïcode — prose")
+            self.assertIs(builder.add("The bell tolls.").index, first.index)
+            write_string_table(builder, Path(directory))
+
+            table = open_string_table("test-strings", Path(directory))
+            self.assertTrue(table.is_mapped)
+            register_string_table(table)
+            self.assertEqual(len(table), 2)
+            self.assertEqual(str(second), "Ünïcode — prose")
+            self.assertEqual(first, "The bell tolls.")
+            self.assertEqual(hash(first), hash("The bell tolls."))
+            self.assertEqual(pickle.loads(pickle.dumps(second)), second)
+            self.assertIsNone(open_string_table("missing", Path(directory)))
+
+    def test_story_prose_is_held_as_text_refs(self):
+        from game.engine.state import state_from_session
+        from game.ui_components.node_presentation import compile_node_plan, resolve_narrative
+
+        node = STORY_NODES["village_square"]
+        self.assertIsInstance(node["text"], TextRef)
+        self.assertIsInstance(thaw(node)["text"], str)
+        text, dialogue = resolve_narrative(compile_node_plan("village_square", node), state_from_session({"flags": {}}))
+        self.assertIsInstance(text, str)
+        self.assertEqual(text, str(node["text"]))
+        self.assertTrue(all(isinstance(line["line"], str) for line in dialogue))
+
+
+class HotReloadTests(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self._tmp.cleanup)
+        self.path = Path(self._tmp.name) / "act.json"
+        self.nodes = json.loads(json.dumps(StoryGraphTests.NODES))
+        self.revision = 0
+        self._write()
+        self.watcher = ContentWatcher(Campaign("dev", [ActSource("act", self.path)], use_bundles=False))
+        self.watcher.campaign.validation_warnings()
+
+    def _write(self):
+        self.path.write_text(json.dumps(self.nodes), encoding="utf-8")
+        # Distinct mtimes, however fast the rewrites happen.
+        self.revision += 1
+        os.utime(self.path, ns=(self.revision * 1_000_000_000, self.revision * 1_000_000_000))
+
+    def _fresh_warnings(self):
+        return Campaign("dev", [ActSource("act", self.path)], use_bundles=False).validation_warnings()
+
+    def test_text_edit_recompiles_one_node_and_skips_the_graph_pass(self):
+        before = self.watcher.campaign
+        self.nodes["hub"]["text"] = "The hub, rewritten."
+        self._write()
+
+        report = self.watcher.poll()
+
+        after = self.watcher.campaign
+        self.assertEqual(report.recompiled, ("hub",))
+        self.assertEqual(report.revalidated, 1)
+        self.assertFalse(report.graph_rechecked)
+        self.assertEqual(str(after.get_node("hub")["text"]), "The hub, rewritten.")
+        self.assertIs(after.get_node("trap"), before.get_node("trap"))
+        self.assertEqual(after.validation_warnings(), self._fresh_warnings())
+        self.assertIsNone(self.watcher.poll())
+
+    def test_added_node_revalidates_nodes_that_link_to_it(self):
+        self.assertTrue(any("missing node 'missing'" in warning for warning in self.watcher.campaign.validation_warnings()))
+        self.nodes["missing"] = {"id": "missing", "choices": [{"label": "Out", "next": "hub"}]}
+        self._write()
+
+        report = self.watcher.poll()
+
+        self.assertEqual(report.recompiled, ("missing",))
+        self.assertTrue(report.graph_rechecked)
+        self.assertEqual(report.revalidated, 2)
+        warnings = self.watcher.campaign.validation_warnings()
+        self.assertFalse(any("missing node 'missing'" in warning for warning in warnings))
+        self.assertEqual(warnings, self._fresh_warnings())
+        self.assertIn("missing", self.watcher.campaign.graph().index)
+
+    def test_reload_keeps_hashes_of_untouched_nodes(self):
+        before = self.watcher.campaign
+        self.nodes["trap"]["choices"][0]["requirements"] = {"min_gold": 5}
+        self._write()
+
+        self.watcher.poll()
+
+        after = self.watcher.campaign
+        self.assertEqual(after.node_hashes("hub"), before.node_hashes("hub"))
+        self.assertNotEqual(after.node_hashes("trap").node, before.node_hashes("trap").node)
+        self.assertNotEqual(after.merkle_root(), before.merkle_root())
+        fresh = Campaign("dev", [ActSource("act", self.path)], use_bundles=False)
+        self.assertEqual(after.merkle_root(), fresh.merkle_root())
+
+    def test_reload_releases_superseded_tables_and_nodes(self):
+        self.nodes["trap"]["text"] = "A trap, once."
+        self.nodes["hub"]["text"] = "The hub, once."
+        self._write()
+        self.watcher.poll()
+        first = self.watcher.campaign
+        first_hub, first_trap = first.get_node("hub"), first.get_node("trap")
+        self.assertEqual(first_hub["text"].table, first_trap["text"].table)
+
+        self.nodes["hub"]["text"] = "The hub, twice."
+        self._write()
+        self.watcher.poll()
+        second = self.watcher.campaign
+        # The first reload's table still backs the untouched trap node.
+        self.assertIsNotNone(string_table(first_trap["text"].table))
+        self.assertEqual(str(second.get_node("trap")["text"]), "A trap, once.")
+        self.assertFalse(any(value is first_hub for value in second._interner._pool.values()))
+
+        self.nodes["trap"]["text"] = "A trap, twice."
+        self._write()
+        self.watcher.poll()
+        self.assertIsNone(string_table(first_trap["text"].table))
+        self.assertEqual(str(self.watcher.campaign.get_node("hub")["text"]), "The hub, twice.")
+        self.assertEqual(str(self.watcher.campaign.get_node("trap")["text"]), "A trap, twice.")
+
+    def test_cached_plans_survive_a_released_table(self):
+        from game.engine.state import state_from_session
+        from game.ui_components import node_presentation
+
+        state = state_from_session({"flags": {}})
+        for text in ("B", "C", "B"):
+            self.nodes["hub"]["text"] = f"The hub, {text}."
+            self._write()
+            self.watcher.poll()
+            node_presentation._FRAGMENTS.clear()
+            with use_campaign(self.watcher.campaign):
+                fragment = node_presentation.narrative_fragment("hub", STORY_NODES["hub"], state)
+            self.assertEqual(fragment.text, f"The hub, {text}.")
+
+    def test_broken_source_keeps_the_previous_campaign(self):
+        before = self.watcher.campaign
+        self.path.write_text("{not json", encoding="utf-8")
+        os.utime(self.path, ns=(1, 1))
+
+        self.assertIsNone(self.watcher.poll())
+        self.assertIs(self.watcher.campaign, before)
+        self.assertIn("act.json", self.watcher.last_error)
+
+
+class MerkleHashTests(unittest.TestCase):
+    def _campaign(self, nodes):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        path = Path(directory.name) / "act.json"
+        path.write_text(json.dumps(nodes), encoding="utf-8")
+        return Campaign("hashes", [ActSource("act", path)], use_bundles=False)
+
+    def test_requirement_edit_changes_exactly_the_enclosing_hashes(self):
+        nodes = json.loads(json.dumps(StoryGraphTests.NODES))
+        before = self._campaign(nodes)
+        nodes["hub"]["choices"][1]["requirements"] = {"min_gold": 3}
+        after = self._campaign(nodes)
+
+        old, new = before.node_hashes("hub"), after.node_hashes("hub")
+        self.assertEqual(old.requirements[0], new.requirements[0])
+        self.assertEqual(old.choices[0], new.choices[0])
+        self.assertNotEqual(old.requirements[1], new.requirements[1])
+        self.assertNotEqual(old.choices[1], new.choices[1])
+        self.assertNotEqual(old.node, new.node)
+        self.assertEqual(before.node_hashes("trap"), after.node_hashes("trap"))
+        self.assertNotEqual(before.act_root("act"), after.act_root("act"))
+        self.assertNotEqual(before.merkle_root(), after.merkle_root())
+
+    def test_choice_ids_survive_content_edits_and_reordering(self):
+        nodes = json.loads(json.dumps(StoryGraphTests.NODES))
+        nodes["hub"]["choices"].append({"label": "Left", "next": "hub"})
+        before = self._campaign(nodes).node_hashes("hub")
+        nodes["hub"]["choices"][0]["effects"] = {"gold": 2}
+        nodes["hub"]["choices"][1], nodes["hub"]["choices"][2] = nodes["hub"]["choices"][2], nodes["hub"]["choices"][1]
+        after = self._campaign(nodes).node_hashes("hub")
+
+        self.assertEqual(len(set(before.choice_ids)), 3)
+        self.assertEqual(after.choice_ids[0], before.choice_ids[0])
+        self.assertNotEqual(after.choices[0], before.choices[0])
+        # The repeated "Left" label keeps its first/second identity; the moved "Right" keeps its id.
+        self.assertEqual(after.choice_ids[1], before.choice_ids[2])
+        self.assertEqual(after.choice_ids[2], before.choice_ids[1])
+        self.assertEqual(after.choice_position(before.choice_ids[1]), 2)
+        self.assertIsNone(after.choice_position("unknown"))
+
+    def test_hashes_match_between_fresh_and_bundled_builds(self):
+        with tempfile.TemporaryDirectory() as directory:
+            cold = builtin_campaign(bundle_dir=Path(directory), use_bundles=True)
+            cold.validation_warnings()
+            root = cold.merkle_root()
+            warm = builtin_campaign(bundle_dir=Path(directory), use_bundles=True)
+            self.assertEqual(warm.merkle_root(), root)
+            self.assertEqual(warm.node_hashes("intro_warrior"), cold.node_hashes("intro_warrior"))
+        self.assertEqual(root, get_story_merkle_root())
+        self.assertEqual(get_node_hashes("intro_warrior"), cold.node_hashes("intro_warrior"))
+        self.assertIsNone(get_node_hashes("no_such_node"))
+
+
+class CampaignRegistryTests(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self._tmp.cleanup)
+        self.built = []
+
+    def _factory(self, name):
+        path = Path(self._tmp.name) / f"{name}.json"
+        path.write_text(json.dumps(StoryGraphTests.NODES), encoding="utf-8")
+
+        def build():
+            self.built.append(name)
+            return Campaign(name, [ActSource("act", path)], use_bundles=False)
+
+        return build
+
+    def test_campaigns_are_built_once_and_shared(self):
+        registry = CampaignRegistry()
+        registry.register("spring", self._factory("spring"))
+
+        self.assertIs(registry.get("spring"), registry.get("spring"))
+        self.assertEqual(self.built, ["spring"])
+        self.assertIs(registry.get(None), get_campaign("default"))
+        self.assertEqual(registry.campaign_ids(), ("default", "spring"))
+        with self.assertRaises(KeyError):
+            registry.get("winter")
+
+    def test_cached_lookups_do_not_wait_for_a_build(self):
+        registry = CampaignRegistry()
+        registry.register("spring", self._factory("spring"))
+        spring = registry.get("spring")
+        slow_factory = self._factory("slow")
+        started, release = threading.Event(), threading.Event()
+        self.addCleanup(release.set)
+
+        def slow():
+            started.set()
+            release.wait(5)
+            return slow_factory()
+
+        registry.register("slow", slow)
+        results = []
+        builders = [threading.Thread(target=lambda: results.append(registry.get("slow"))) for _ in range(2)]
+        for thread in builders:
+            thread.start()
+        self.assertTrue(started.wait(5))
+
+        lookups = []
+        lookup = threading.Thread(target=lambda: lookups.append(registry.get("spring")))
+        lookup.start()
+        lookup.join(5)
+        self.assertEqual(lookups, [spring])
+        release.set()
+        for thread in builders:
+            thread.join(5)
+        self.assertEqual(len(results), 2)
+        self.assertIs(results[0], results[1])
+        self.assertEqual(self.built.count("slow"), 1)
+
+    def test_least_recently_used_campaign_is_evicted_over_budget(self):
+        sample = self._factory("sample")()
+        sample.all_nodes()
+        registry = CampaignRegistry(memory_budget=2 * sample.memory_footprint())
+        for name in ("spring", "summer", "autumn"):
+            registry.register(name, self._factory(name))
+        for name in ("spring", "summer"):
+            registry.get(name).all_nodes()
+        registry.get("spring")
+        self.assertEqual(registry.cached_ids(), ("summer", "spring"))
+
+        # Building a third campaign is what pushes usage over the budget.
+        registry.get("autumn").all_nodes()
+
+        self.assertEqual(registry.cached_ids(), ("spring", "autumn"))
+        self.assertEqual(registry.evictions, 1)
+
+        # Lookups of cached campaigns never evict, even over budget.
+        registry.memory_budget = 0
+        registry.get("spring")
+        self.assertEqual(registry.cached_ids(), ("autumn", "spring"))
+
+        # The campaign being built is always kept, whatever the budget.
+        registry.get("summer")
+        self.assertEqual(self.built[-1], "summer")
+        self.assertEqual(registry.cached_ids(), ("summer",))
+
+    def test_campaigns_within_budget_stay_cached(self):
+        registry = CampaignRegistry()
+        for name in ("spring", "summer"):
+            registry.register(name, self._factory(name))
+            registry.get(name).all_nodes()
+
+        self.assertGreater(registry.memory_usage(), 0)
+        self.assertEqual(registry.cached_ids(), ("spring", "summer"))
+        self.assertEqual(registry.evictions, 0)
+
+
+class ReverseIndexTests(unittest.TestCase):
+    NODES = {
+        "gate": {
+            "id": "gate",
+            "requirements": {"flag_true": ["gate_open"]},
+            "choices": [
+                {"label": "Pick", "requirements": {"any_of": [{"items": ["Lockpicks"]}, {"flag_false": ["alarm"]}]}, "next": "yard"},
+                {
+                    "label": "Bribe",
+                    "effects": {"remove_items": ["Coin"], "set_flags": {"alarm": True}},
+                    "conditional_effects": [{"requirements": {"class": ["Rogue"]}, "effects": {"dexterity": 1}, "next": "yard"}],
+                    "next": "gate",
+                },
+            ],
+            "auto_choices": [{"label": "Loot", "effects": {"add_items": ["Coin"], "gold": 2}}],
+        },
+        "yard": {"id": "yard", "choices": [{"label": "Back", "effects": {"set_flags": {"gate_open": True}}, "next": "gate"}]},
+    }
+
+    def test_index_answers_reverse_lookups(self):
+        index = build_reverse_index(self.NODES, build_story_graph(self.NODES))
+
+        self.assertEqual(index.setters("alarm"), (ContentRef("gate", 1),))
+        self.assertEqual(index.readers("alarm"), (ContentRef("gate", 0),))
+        self.assertEqual(index.readers("gate_open"), (ContentRef("gate"),))
+        self.assertEqual(index.setters("gate_open"), (ContentRef("yard", 0),))
+        self.assertEqual(index.requirers("Lockpicks"), (ContentRef("gate", 0),))
+        self.assertEqual(index.granters("Coin"), (ContentRef("gate", 2),))
+        self.assertEqual(index.removers("Coin"), (ContentRef("gate", 1),))
+        self.assertEqual(index.sources("yard"), (ContentRef("gate", 0), ContentRef("gate", 1)))
+        self.assertEqual(index.sources("gate"), (ContentRef("gate", 1), ContentRef("yard", 0)))
+        self.assertEqual(index.setters("unknown"), ())
+        gains = {(gain.ref, gain.stat, gain.amount, len(gain.requirements)) for gain in index.stat_gains}
+        self.assertEqual(gains, {(ContentRef("gate", 1), "dexterity", 1, 2), (ContentRef("gate", 2), "gold", 2, 1)})
+
+    def test_story_index_matches_a_full_scan(self):
+        expected = {}
+        for node_id, node in STORY_NODES.items():
+            for position, choice in enumerate(list(node.get("choices", ())) + list(node.get("auto_choices", ()))):
+                for effects in [choice.get("effects", {})] + [variant.get("effects", {}) for variant in choice.get("conditional_effects", ())]:
+                    for flag in effects.get("set_flags", {}):
+                        refs = expected.setdefault(flag, [])
+                        if ContentRef(node_id, position) not in refs:
+                            refs.append(ContentRef(node_id, position))
+        index = get_reverse_index()
+        self.assertEqual({flag: list(refs) for flag, refs in index.flag_setters.items()}, expected)
+        graph = get_story_graph()
+        for node_id in ("final_confrontation", "village_square"):
+            self.assertEqual(
+                sorted({ref.node_id for ref in index.sources(node_id)}),
+                sorted(set(graph.ids(graph.predecessors(graph.index[node_id])))),
+            )
+
+
+class SimplificationPipelineTests(unittest.TestCase):
+    def _wide_node(self, node_id, count):
+        choices = [{"label": "Wait", "effects": {"hp": -1}, "auto_apply": True, "next": node_id}]
+        for index in range(count):
+            choices.append({"label": f"Muse {index}", "effects": {"log": f"Thought {index}"}, "next": node_id})
+            choices.append({"label": f"Go {index}", "effects": {"gold": index}, "next": "out"})
+        choices.append({"label": "Go again", "effects": {"gold": 0}, "next": "out"})
+        return {"id": node_id, "choices": choices}
+
+    def test_passes_run_in_order_with_tagged_reports_and_leave_input_untouched(self):
+        nodes = {"wide": self._wide_node("wide", 5)}
+        original = json.loads(json.dumps(nodes))
+
+        result = run_simplification(nodes, workers=1)
+
+        self.assertEqual(nodes, original)
+        self.assertEqual(list(result.timings), [simplification.name for simplification in SIMPLIFICATION_PASSES])
+        self.assertEqual(result.report[0], "wide: [auto-apply] auto-applied 'Wait'")
+        self.assertEqual(result.report[1], "wide: [dedup] removed duplicate 'Go again'")
+        self.assertIn("wide: [destination-grouping] 5 choices lead to 'out' (groupable destination)", result.report)
+        pruned = [line for line in result.report if "[low-impact-pruning]" in line]
+        choices = result.nodes["wide"]["choices"]
+        self.assertEqual(len(choices), MAX_CHOICES_PER_NODE)
+        self.assertEqual(len(pruned), 10 - MAX_CHOICES_PER_NODE)
+        self.assertEqual(pruned[0], "wide: [low-impact-pruning] pruned low-impact 'Muse 0'")
+        self.assertEqual([choice["label"] for choice in result.nodes["wide"]["auto_choices"]], ["Wait"])
+        self.assertIs(choices[-1], nodes["wide"]["choices"][-2])
+
+    def test_parallel_run_matches_serial_run(self):
+        nodes = {f"n{index}": self._wide_node(f"n{index}", index % 7) for index in range(40)}
+
+        serial = run_simplification(nodes, workers=1)
+        parallel = run_simplification(nodes, workers=2, min_parallel_choices=0)
+
+        self.assertEqual(list(parallel.nodes), list(serial.nodes))
+        self.assertEqual(parallel.nodes, serial.nodes)
+        self.assertEqual(parallel.report, serial.report)
+
+    def test_custom_pass_list(self):
+        def drop_all(node_id, node, report):
+            report.append(f"dropped {len(node['choices'])}")
+            node["choices"] = []
+
+        result = run_simplification({"wide": self._wide_node("wide", 2)}, passes=[SimplificationPass("drop", drop_all)])
+
+        self.assertEqual(result.nodes["wide"]["choices"], [])
+        self.assertEqual(result.report, ["wide: [drop] dropped 6"])
+
+
+
+class NodePresentationTests(unittest.TestCase):
+    def test_story_plans_are_cached_and_resolve_variants_per_state(self):
+        from game.engine.state import state_from_session
+        from game.ui_components.node_presentation import node_plan, resolve_narrative
+
+        node = STORY_NODES["war_council_hub"]
+        plan = node_plan("war_council_hub", node)
+        self.assertIs(node_plan("war_council_hub", node), plan)
+        self.assertEqual(len(plan.variants), len(node["conditional_narrative"]))
+
+        plain_text, plain_dialogue = resolve_narrative(plan, state_from_session({"flags": {}}))
+        merciful_text, merciful_dialogue = resolve_narrative(plan, state_from_session({"flags": {"mercy_reputation": True}}))
+        self.assertEqual(plain_text, str(node["text"]))
+        self.assertTrue(merciful_text.startswith(plain_text + "\n\n"))
+        self.assertEqual(merciful_dialogue[-1]["line"], "Mercy is a strategy too. It makes people choose you twice.")
+        self.assertEqual(len(merciful_dialogue), len(plain_dialogue) + 1)
+
+    def test_grouping_uses_static_slots(self):
+        from game.ui_components.node_presentation import group_choices, node_plan, should_group_by_destination
+
+        node = {
+            "choices": [
+                {"label": "Sharpen", "next": "camp"},
+                {"label": "Rest", "next": "camp"},
+                {"label": "Pray", "next": "camp"},
+                {"label": "Haggle", "next": "camp", "group": "Market"},
+                {"label": "March", "next": "village_square"},
+            ]
+        }
+        plan = node_plan("camp", node)
+        available = [{"position": position, "choice": choice} for position, choice in enumerate(node["choices"]) if position != 1]
+        indexed = list(enumerate(available))
+
+        self.assertFalse(should_group_by_destination(plan, [entry["position"] for entry in available], overflow=False))
+        self.assertTrue(should_group_by_destination(plan, range(5), overflow=False))
+
+        groups = group_choices(plan, indexed, group_by_destination=True, current_node_id="camp")
+        self.assertEqual([group["label"] for group in groups], ["Preparation options", "Market", f"More options → {STORY_NODES['village_square']['title']}"])
+        self.assertEqual([index for index, _ in groups[0]["choices"]], [0, 1])
+        ungrouped = group_choices(plan, indexed, group_by_destination=False, current_node_id="camp")
+        self.assertEqual([group["key"] for group in ungrouped], ["choice::0", "choice::1", "group::Market", "choice::3"])
+
+if __name__ == "__main__":
+    unittest.main()
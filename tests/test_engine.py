@@ -463,6 +463,93 @@ class AnyOfRequirementTests(unittest.TestCase):
         self.assertEqual(reason, "")
 
 
+class CompiledRequirementTests(unittest.TestCase):
+    def _story_requirements(self):
+        for node in STORY_NODES.values():
+            yield node.get("requirements")
+            for choice in list(node.get("choices", ())) + list(node.get("auto_choices", ())):
+                yield choice.get("requirements")
+                for variant in choice.get("conditional_effects", ()) or ():
+                    yield variant.get("requirements")
+            for variant in node.get("conditional_narrative", ()) or ():
+                yield variant.get("requirements")
+
+    def test_compiled_predicates_agree_with_check_requirements(self):
+        from game.engine.requirements import check_requirements as check_engine
+        from game.engine.requirements import compile_requirements
+
+        states = [
+            {"player_class": "Warrior", "stats": {"hp": 10, "gold": 8, "strength": 4, "dexterity": 2}, "inventory": [], "flags": {}, "traits": {}},
+            {
+                "player_class": "Rogue",
+                "stats": {"hp": 1, "gold": 40, "strength": 1, "dexterity": 6},
+                "inventory": ["Lockpicks", "Rope", "Torch"],
+                "flags": {"met_elder": True, "mine_cleared": True, "bandits_allied": True},
+                "traits": {"reputation": 4, "ember_tide": -2, "trust": 3},
+                "meta_state": {"unlocked_items": ["Echo Locket"], "removed_nodes": ["echo_shrine"]},
+            },
+            {"player_class": "Archer", "stats": {"hp": 25, "gold": 0, "strength": 9, "dexterity": 9}, "inventory": ["Healing Herbs"], "flags": {}, "traits": {"reputation": -5, "ember_tide": 5}},
+        ]
+        checked = 0
+        for raw_state in states:
+            state = state_from_session(raw_state)
+            for requirements in self._story_requirements():
+                self.assertEqual(compile_requirements(requirements)(state), check_engine(requirements, state)[0], requirements)
+                checked += 1
+        self.assertGreater(checked, 100)
+
+    def test_state_projection_covers_only_the_fields_read(self):
+        from game.engine.requirements import check_requirements as check_engine
+        from game.engine.requirements import requirements_projection
+
+        requirements = [
+            {"min_gold": 3, "missing_items": ["Rope"]},
+            {"any_of": [{"class": ["Rogue"]}, {"flag_true": ["met_elder"], "min_reputation": 2}]},
+        ]
+        projection = requirements_projection(requirements)
+        self.assertTrue(projection.player_class)
+        self.assertEqual(projection.stats, ("gold",))
+        self.assertEqual(projection.traits, ("reputation",))
+        self.assertEqual(projection.items, ("Rope",))
+        self.assertEqual(projection.flags, ("met_elder",))
+
+        base = {"player_class": "Warrior", "stats": {"hp": 10, "gold": 8}, "inventory": [], "flags": {}, "traits": {"reputation": 1}}
+        unread = {**base, "stats": {"hp": 2, "gold": 8, "strength": 9}, "inventory": ["Torch"], "flags": {"mine_cleared": True}}
+        read = {**base, "inventory": ["Rope"]}
+        key = projection.project(state_from_session(base))
+        self.assertEqual(projection.project(state_from_session(unread)), key)
+        self.assertNotEqual(projection.project(state_from_session(read)), key)
+        for entry in requirements:
+            self.assertEqual(check_engine(entry, state_from_session(unread)), check_engine(entry, state_from_session(base)))
+
+
+    def test_fork_state_matches_applied_effects(self):
+        from game.engine.state import fork_state
+
+        ensure_session_state()
+        reset_game_state()
+        st.session_state.player_class = "Warrior"
+        st.session_state.stats = {"hp": 3, "gold": 8, "strength": 4, "dexterity": 2}
+        st.session_state.inventory = ["Rope"]
+        st.session_state.flags = {}
+        st.session_state.traits = {"trust": 0, "reputation": 0, "alignment": 0}
+        effects = {
+            "hp": -5,
+            "gold": 2,
+            "add_items": ["Torch"],
+            "remove_items": ["Rope"],
+            "set_flags": {"morality": "merciful", "branch_mine_completed": True},
+            "trait_delta": {"reputation": 2, "unknown_trait": 1},
+        }
+        before = state_from_session(st.session_state)
+        forked = fork_state(before, effects)
+        apply_effects(effects, trigger_surprises=False)
+        after = state_from_session(st.session_state)
+        for field in ("stats", "inventory", "flags", "traits"):
+            self.assertEqual(getattr(forked, field), getattr(after, field), field)
+        self.assertEqual(before.inventory, ["Rope"])
+
+
 class AutoChoiceDeathTests(unittest.TestCase):
     def setUp(self):
         ensure_session_state()
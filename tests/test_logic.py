@@ -1,10 +1,14 @@
 import unittest
 
-from game.data import init_story_nodes
+from game.data import STORY_NODES, init_story_nodes
+from game.engine.cache import LRUCache
 from game.logic import (
     apply_effects,
     check_requirements,
     get_available_choices,
+    get_choice_eval_cache_stats,
+    get_node_choice_evaluations,
+    get_shared_choice_eval_cache_stats,
     resolve_choice_outcome,
     transition_to,
     validate_story_nodes,
@@ -125,5 +129,77 @@ class LogicTests(unittest.TestCase):
         self.assertEqual(st.session_state.current_node, "failure_captured")
 
 
+
+class LRUCacheTests(unittest.TestCase):
+    def test_evicts_least_recently_used_and_counts(self):
+        cache = LRUCache(2)
+        cache.put("a", 1)
+        cache.put("b", 2)
+        self.assertEqual(cache.get("a"), 1)
+        cache.put("c", 3)
+
+        self.assertNotIn("b", cache)
+        self.assertIsNone(cache.get("b"))
+        stats = cache.stats()
+        self.assertEqual((stats.size, stats.hits, stats.misses, stats.evictions), (2, 1, 1, 1))
+        self.assertEqual(stats.hit_rate, 0.5)
+
+        cache.resize(1)
+        self.assertEqual((len(cache), "c" in cache), (1, True))
+        self.assertEqual(cache.stats().evictions, 2)
+
+
+class ChoiceEvaluationCacheTests(unittest.TestCase):
+    def setUp(self):
+        ensure_session_state()
+        reset_game_state()
+        st.session_state.pop("_choice_eval_cache", None)
+        st.session_state.player_class = "Warrior"
+        st.session_state.stats = {"hp": 10, "gold": 8, "strength": 4, "dexterity": 2}
+
+    def test_views_share_results_and_revisited_states_hit(self):
+        node = STORY_NODES["village_square"]
+        first = get_node_choice_evaluations("village_square", node)
+        self.assertIs(get_node_choice_evaluations("village_square", node), first)
+
+        # Leaving and coming back to the earlier state (undo, hub loops) still hits.
+        st.session_state.stats = {**st.session_state.stats, "gold": 9}
+        get_node_choice_evaluations("village_square", node)
+        st.session_state.stats = {**st.session_state.stats, "gold": 8}
+        self.assertIs(get_node_choice_evaluations("village_square", node), first)
+
+        stats = get_choice_eval_cache_stats()
+        self.assertEqual((stats.hits, stats.misses, stats.evictions), (2, 2, 0))
+
+    def test_session_cache_ignores_fields_the_node_never_reads(self):
+        node = STORY_NODES["village_square"]
+        first = get_node_choice_evaluations("village_square", node)
+
+        st.session_state.stats = {**st.session_state.stats, "hp": 4}
+        st.session_state.flags = {**st.session_state.flags, "unrelated_flag": True}
+        st.session_state.event_log.append("unrelated")
+        self.assertIs(get_node_choice_evaluations("village_square", node), first)
+        stats = get_choice_eval_cache_stats()
+        self.assertEqual((stats.hits, stats.misses), (1, 1))
+
+    def test_sessions_share_evaluations_when_read_fields_match(self):
+        node = STORY_NODES["village_square"]
+        first = get_node_choice_evaluations("village_square", node)
+        shared_hits = get_shared_choice_eval_cache_stats().hits
+
+        # A new session whose state differs only in fields the node never reads.
+        st.session_state.pop("_choice_eval_cache", None)
+        st.session_state.player_class = "Rogue"
+        st.session_state.stats = {"hp": 3, "gold": 8, "strength": 1, "dexterity": 6}
+        self.assertIs(get_node_choice_evaluations("village_square", node), first)
+        self.assertEqual(get_shared_choice_eval_cache_stats().hits, shared_hits + 1)
+
+        # Gold gates the shop choices, so a poorer session gets its own results.
+        st.session_state.pop("_choice_eval_cache", None)
+        st.session_state.stats = {**st.session_state.stats, "gold": 1}
+        poorer = get_node_choice_evaluations("village_square", node)
+        self.assertIsNot(poorer, first)
+        self.assertEqual([entry["is_available"] for entry in poorer], [False, False, False, False, True, True])
+
 if __name__ == "__main__":
     unittest.main()
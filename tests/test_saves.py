@@ -0,0 +1,397 @@
+import copy
+import json
+import os
+import tempfile
+import threading
+import unittest
+from pathlib import Path
+
+from game.content.campaign import ActSource, Campaign, use_campaign
+from game.data import STORY_NODES
+from game.logic import execute_choice, get_node_choice_evaluations
+from game.saves import AutosaveService, SaveStore, build_replay_save, content_hashes, load_replay_save
+from game.saves.autosave import AUTOSAVE_COMPACT_EVERY, AUTOSAVE_DECISION_KEY, read_journal
+from game.saves.bulk import migrate_save_directory, migrate_save_store
+from game.saves.replay import _settle_current_node, restore_autosave
+from game.snapshot_schema import prepare_snapshot
+from game.state import (
+    REPLAY_CHECKPOINT_INTERVAL,
+    ensure_session_state,
+    persistence_suspended,
+    reset_game_state,
+    snapshot_state,
+    start_game,
+)
+from game.streamlit_compat import st
+
+
+def _play(decisions: int) -> None:
+    """Take the last available choice repeatedly, as a player clicking through would."""
+    for _ in range(decisions):
+        _settle_current_node()
+        node_id = st.session_state.current_node
+        available = [entry for entry in get_node_choice_evaluations(node_id, STORY_NODES[node_id]) if entry["is_available"]]
+        if not available:
+            break
+        execute_choice(node_id, available[-1]["choice"]["label"], available[-1]["choice"], available[-1]["choice_id"])
+    _settle_current_node()
+
+
+class ReplaySaveTests(unittest.TestCase):
+    def setUp(self):
+        ensure_session_state()
+        reset_game_state()
+        start_game("Warrior")
+
+    def test_replay_roundtrip_restores_state(self):
+        _play(REPLAY_CHECKPOINT_INTERVAL + 3)
+        expected = snapshot_state()
+        save = json.loads(json.dumps(build_replay_save()))
+
+        reset_game_state()
+        start_game("Rogue")
+        ok, errors = load_replay_save(save)
+
+        self.assertTrue(ok, errors)
+        for key in ("current_node", "stats", "inventory", "flags", "traits", "decision_history", "visited_edges"):
+            self.assertEqual(st.session_state[key], expected[key])
+
+    def test_replay_uses_nearest_checkpoint(self):
+        _play(2 * REPLAY_CHECKPOINT_INTERVAL + 2)
+        save = build_replay_save()
+        self.assertEqual(len(save["checkpoints"]), 1)
+        nearest = max(entry["decision_index"] for entry in save["checkpoints"])
+        self.assertLessEqual(len(save["decisions"]) - nearest, REPLAY_CHECKPOINT_INTERVAL)
+        self.assertNotIn("decision_history", save["checkpoints"][0]["state"])
+
+    def test_replay_rejects_changed_content(self):
+        _play(3)
+        save = build_replay_save()
+        save["content_hashes"]["story"] = "0" * 64
+        before = snapshot_state()
+
+        ok, errors = load_replay_save(save)
+
+        self.assertFalse(ok)
+        self.assertTrue(any("hash mismatch" in error for error in errors))
+        self.assertEqual(snapshot_state()["decision_history"], before["decision_history"])
+
+    def test_replay_hash_ignores_source_formatting(self):
+        nodes = {"start": {"id": "start", "text": "Begin.", "choices": [{"label": "Go", "next": "end"}]}, "end": {"id": "end"}}
+        with tempfile.TemporaryDirectory() as directory:
+            compact, spaced = Path(directory) / "compact.json", Path(directory) / "spaced.json"
+            compact.write_text(json.dumps(nodes), encoding="utf-8")
+            spaced.write_text(json.dumps(nodes, indent=4), encoding="utf-8")
+            campaigns = [Campaign("fmt", [ActSource("act", path)], use_bundles=False) for path in (compact, spaced)]
+            self.assertNotEqual(campaigns[0].content_hash(), campaigns[1].content_hash())
+            digests = []
+            for campaign in campaigns:
+                with use_campaign(campaign):
+                    digests.append(content_hashes()["story"])
+        self.assertEqual(digests[0], digests[1])
+
+    def test_replay_matches_decisions_by_choice_id(self):
+        _play(3)
+        expected = snapshot_state()
+        save = copy.deepcopy(build_replay_save())
+        save["checkpoints"] = []
+        self.assertTrue(all("choice_id" in decision for decision in save["decisions"]))
+
+        reset_game_state()
+        start_game("Warrior")
+        ok, errors = load_replay_save(save)
+        self.assertTrue(ok, errors)
+        self.assertEqual(st.session_state.decision_history, expected["decision_history"])
+
+    def test_replay_of_decisions_recorded_without_ids(self):
+        reset_game_state()
+        start_game("Warrior")
+        for _ in range(3):
+            _settle_current_node()
+            node_id = st.session_state.current_node
+            entry = [entry for entry in get_node_choice_evaluations(node_id, STORY_NODES[node_id]) if entry["is_available"]][0]
+            execute_choice(node_id, entry["choice"]["label"], entry["choice"])
+        _settle_current_node()
+        expected = snapshot_state()
+        save = copy.deepcopy(build_replay_save())
+        save["checkpoints"] = []
+
+        reset_game_state()
+        start_game("Warrior")
+        ok, errors = load_replay_save(save)
+        self.assertTrue(ok, errors)
+        self.assertEqual(st.session_state.decision_history, expected["decision_history"])
+        self.assertTrue(all("choice_id" not in decision for decision in st.session_state.decision_history))
+
+    def test_replay_rolls_back_on_divergence(self):
+        _play(3)
+        save = copy.deepcopy(build_replay_save())
+        save["checkpoints"] = []
+        save["decisions"][-1]["choice"] = "A choice that never existed"
+        save["decisions"][-1]["choice_id"] = "0" * 10
+        before = snapshot_state()
+
+        ok, errors = load_replay_save(save)
+
+        self.assertFalse(ok)
+        self.assertIn("diverged", errors[0])
+        self.assertEqual(st.session_state.current_node, before["current_node"])
+
+    def test_failed_replay_leaves_meta_state_untouched(self):
+        _play(3)
+        save = copy.deepcopy(build_replay_save())
+        save["checkpoints"] = []
+        # The replayed run unlocks a legacy item, then ends in the wrong state.
+        save["starting_meta_state"] = {"unlocked_items": ["Echo Locket"], "removed_nodes": []}
+        before = copy.deepcopy(st.session_state.meta_state)
+
+        ok, errors = load_replay_save(save)
+
+        self.assertFalse(ok)
+        self.assertIn("different state", errors[0])
+        self.assertEqual(st.session_state.meta_state, before)
+        self.assertFalse(persistence_suspended())
+
+
+class SaveStoreTests(unittest.TestCase):
+    def setUp(self):
+        ensure_session_state()
+        reset_game_state()
+        start_game("Warrior")
+        self._tmp = tempfile.TemporaryDirectory()
+        self.store = SaveStore(Path(self._tmp.name) / "saves.sqlite3")
+
+    def tearDown(self):
+        self.store.close()
+        self._tmp.cleanup()
+
+    def test_slot_roundtrip_and_metadata(self):
+        _play(3)
+        snapshot = snapshot_state()
+        info = self.store.save_slot("ana", "before boss", snapshot)
+
+        self.assertEqual(info.decision_count, len(snapshot["decision_history"]))
+        self.assertEqual(info.current_node, snapshot["current_node"])
+        self.assertEqual(self.store.load_slot("ana", "before boss"), json.loads(json.dumps(snapshot)))
+        self.assertEqual([slot.slot_name for slot in self.store.list_slots("ana")], ["before boss"])
+        self.assertEqual(self.store.list_slots("someone else"), [])
+
+    def test_overwrite_and_delete(self):
+        self.store.save_slot("ana", "main", snapshot_state())
+        _play(2)
+        self.store.save_slot("ana", "main", snapshot_state())
+
+        self.assertEqual(len(self.store.list_slots("ana")), 1)
+        self.assertEqual(self.store.load_slot("ana", "main")["current_node"], st.session_state.current_node)
+        self.assertTrue(self.store.delete_slot("ana", "main"))
+        self.assertIsNone(self.store.load_slot("ana", "main"))
+        self.assertFalse(self.store.delete_slot("ana", "main"))
+
+    def test_concurrent_writers(self):
+        snapshot = snapshot_state()
+        errors = []
+
+        def write(worker: int) -> None:
+            try:
+                for slot in range(5):
+                    self.store.save_slot(f"player{worker}", f"slot{slot}", snapshot)
+            except Exception as exc:  # pragma: no cover - surfaced by the assertion below
+                errors.append(exc)
+            finally:
+                self.store.close()
+
+        threads = [threading.Thread(target=write, args=(worker,)) for worker in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        for worker in range(4):
+            self.assertEqual(len(self.store.list_slots(f"player{worker}")), 5)
+
+
+class AutosaveTests(unittest.TestCase):
+    def setUp(self):
+        ensure_session_state()
+        reset_game_state()
+        start_game("Warrior")
+        self._tmp = tempfile.TemporaryDirectory()
+        self.service = AutosaveService(Path(self._tmp.name), flush_interval=0.01)
+
+    def tearDown(self):
+        self.service.flush(timeout=5)
+        self._tmp.cleanup()
+
+    def _journal_entries(self, key):
+        lines = self.service.journal_path(key).read_text(encoding="utf-8").splitlines()
+        return [json.loads(line) for line in lines]
+
+    def test_journal_appends_deltas_and_restores_latest(self):
+        self.service.submit("session:a", snapshot_state())
+        self.assertTrue(self.service.flush(timeout=5))
+        _play(2)
+        self.service.submit("session:a", snapshot_state())
+        self.assertTrue(self.service.flush(timeout=5))
+
+        entries = self._journal_entries("session:a")
+        self.assertEqual([entry["op"] for entry in entries], ["base", "delta"])
+        self.assertIn("decision_history", entries[1]["extend"])
+        self.assertNotIn("stats", entries[1].get("extend", {}))
+        restored, _ = self.service.latest("session:a")
+        self.assertEqual(restored, json.loads(json.dumps(snapshot_state())))
+
+    def test_journal_compacts_after_many_deltas(self):
+        self.service.submit("session:a", snapshot_state())
+        self.service.flush(timeout=5)
+        for step in range(AUTOSAVE_COMPACT_EVERY + 1):
+            st.session_state.event_log.append(f"step {step}")
+            self.service.submit("session:a", snapshot_state())
+            self.service.flush(timeout=5)
+
+        entries = self._journal_entries("session:a")
+        self.assertEqual(entries[0]["op"], "base")
+        self.assertLess(len(entries), AUTOSAVE_COMPACT_EVERY)
+        self.assertEqual(read_journal(self.service.journal_path("session:a"))["event_log"][-1], f"step {AUTOSAVE_COMPACT_EVERY}")
+
+    def test_restore_retakes_the_decision_saved_with_the_undo_snapshot(self):
+        _play(2)
+        _settle_current_node()
+        node_id = st.session_state.current_node
+        entry = [entry for entry in get_node_choice_evaluations(node_id, STORY_NODES[node_id]) if entry["is_available"]][-1]
+        execute_choice(node_id, entry["choice"]["label"], entry["choice"], entry["choice_id"])
+        expected = snapshot_state()
+        undo_snapshot = st.session_state.history[-1]
+        decision = expected["decision_history"][-1]
+        self.service.submit("session:a", {**undo_snapshot, AUTOSAVE_DECISION_KEY: decision})
+        self.assertTrue(self.service.flush(timeout=5))
+
+        reset_game_state()
+        restored, _ = self.service.latest("session:a")
+        snapshot, errors = prepare_snapshot(restored)
+        self.assertEqual(errors, [])
+        restore_autosave(snapshot)
+
+        for key in ("current_node", "stats", "inventory", "flags", "decision_history", "visited_edges"):
+            self.assertEqual(st.session_state[key], expected[key])
+
+    def test_tracking_is_bounded_and_forgotten_sessions_rewrite_a_base(self):
+        service = AutosaveService(Path(self._tmp.name), flush_interval=0.01, tracked_sessions=2)
+        for key in ("session:a", "session:b", "session:c"):
+            service.submit(key, snapshot_state())
+            self.assertTrue(service.flush(timeout=5))
+        self.assertEqual(len(service._journals), 2)
+        self.assertNotIn("session:a", service._journals)
+
+        st.session_state.event_log.append("after eviction")
+        service.submit("session:a", snapshot_state())
+        self.assertTrue(service.flush(timeout=5))
+        entries = self._journal_entries("session:a")
+        self.assertEqual([entry["op"] for entry in entries], ["base"])
+        restored, _ = service.latest("session:a")
+        self.assertEqual(restored, json.loads(json.dumps(snapshot_state())))
+
+    def test_stale_journals_are_pruned(self):
+        for key in ("session:old", "session:new"):
+            self.service.submit(key, snapshot_state())
+        self.assertTrue(self.service.flush(timeout=5))
+        stale = self.service.journal_path("session:old")
+        past = stale.stat().st_mtime - self.service.max_age - 60
+        os.utime(stale, (past, past))
+
+        self.assertEqual(self.service.prune_journals(), 1)
+        self.assertFalse(stale.exists())
+        self.assertTrue(self.service.journal_path("session:new").exists())
+
+        _play(1)
+        self.service.submit("session:old", snapshot_state())
+        self.assertTrue(self.service.flush(timeout=5))
+        self.assertEqual([entry["op"] for entry in self._journal_entries("session:old")], ["base"])
+
+    def test_torn_final_line_is_ignored(self):
+        self.service.submit("session:a", snapshot_state())
+        self.service.flush(timeout=5)
+        path = self.service.journal_path("session:a")
+        with path.open("a", encoding="utf-8") as handle:
+            handle.write('{"op": "delta", "set": {"current_no')
+
+        self.assertEqual(read_journal(path)["current_node"], st.session_state.current_node)
+
+    def test_discard_removes_journal(self):
+        self.service.submit("session:a", snapshot_state())
+        self.service.discard("session:a")
+        self.service.flush(timeout=5)
+
+        self.assertIsNone(self.service.latest("session:a"))
+
+
+class BulkMigrationTests(unittest.TestCase):
+    def setUp(self):
+        ensure_session_state()
+        reset_game_state()
+        start_game("Warrior")
+        _play(2)
+        self._tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self._tmp.name)
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def _write(self, relative, payload):
+        path = self.root / "in" / relative
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(payload if isinstance(payload, str) else json.dumps(payload), encoding="utf-8")
+
+    def test_directory_report_and_outputs(self):
+        current = snapshot_state()
+        legacy = {key: value for key, value in current.items() if key not in ("save_version", "visited_edges", "starting_meta_state")}
+        stale = dict(current, current_node="removed_node", flags={**current["flags"], "retired_flag": True})
+        self._write("a/current.json", current)
+        self._write("a/legacy.json", legacy)
+        self._write("b/stale.json", stale)
+        self._write("b/broken.json", "{not json")
+
+        report = migrate_save_directory(self.root / "in", self.root / "out", workers=2).to_dict()
+
+        self.assertEqual(report["total"], 4)
+        self.assertEqual(report["statuses"], {"ok": 1, "migrated": 1, "invalid": 1, "unreadable": 1})
+        self.assertTrue(any("does not exist in story" in entry["message"] for entry in report["errors"]))
+        migrated = json.loads((self.root / "out" / "a" / "legacy.json").read_text(encoding="utf-8"))
+        self.assertEqual(migrated["visited_edges"], [])
+        self.assertFalse((self.root / "out" / "b" / "stale.json").exists())
+
+    def test_valid_replay_saves_are_copied_to_the_output(self):
+        _play(3)
+        replay = build_replay_save()
+        self._write("replay.json", replay)
+
+        report = migrate_save_directory(self.root / "in", self.root / "out", workers=1).to_dict()
+
+        self.assertEqual(report["statuses"], {"ok": 1})
+        copied = json.loads((self.root / "out" / "replay.json").read_text(encoding="utf-8"))
+        self.assertEqual(copied, json.loads(json.dumps(replay)))
+
+    def test_unknown_flags_are_reported_as_warnings(self):
+        self._write("flagged.json", dict(snapshot_state(), flags={"class": "Warrior", "retired_flag": True}))
+
+        report = migrate_save_directory(self.root / "in", None, workers=1).to_dict()
+
+        self.assertEqual(report["statuses"], {"ok": 1})
+        self.assertEqual(report["warnings"][0]["message"], "$.flags.retired_flag: Flag is not set anywhere in the story.")
+
+    def test_save_store_source(self):
+        source = SaveStore(self.root / "in.sqlite3")
+        source.save_slot("ana", "main", snapshot_state())
+        source.save_slot("ana", "broken", {"player_class": "Nobody"})
+        source.close()
+        target = SaveStore(self.root / "out.sqlite3")
+
+        report = migrate_save_store(self.root / "in.sqlite3", target, workers=2).to_dict()
+
+        self.assertEqual(report["statuses"], {"ok": 1, "invalid": 1})
+        self.assertEqual([slot.slot_name for slot in target.list_slots("ana")], ["main"])
+        target.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
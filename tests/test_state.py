@@ -1,14 +1,29 @@
+import json
+import multiprocessing
+import os
+import tempfile
+import threading
 import unittest
+from pathlib import Path
 
 from game.state import (
+    MetaStateStore,
+    _MetaStateWriter,
+    _invalidate_meta_file_cache,
+    _read_meta_file,
     ensure_session_state,
     load_snapshot,
     normalize_meta_state,
     reset_game_state,
+    session_campaign,
     snapshot_state,
     start_game,
     validate_snapshot,
 )
+from game.content.campaign import ActSource, Campaign, use_campaign
+from game.content.registry import campaign_registry
+from game.data import STORY_NODES
+from game.snapshot_schema import SNAPSHOT_VERSION, prepare_snapshot
 from game.streamlit_compat import st
 
 
@@ -62,6 +77,255 @@ class StateTests(unittest.TestCase):
         start_game("Warrior")
         self.assertIn("Echo Locket", st.session_state.inventory)
 
+    def test_prepare_snapshot_migrates_legacy_payload(self):
+        start_game("Warrior")
+        snap = snapshot_state()
+        for key in ("save_version", "visited_nodes", "visited_edges", "starting_meta_state"):
+            snap.pop(key)
+        snap["meta_state"] = {"legacy_items": ["Echo Locket"], "removed_locations": ["echo_shrine"]}
+
+        migrated, errors = prepare_snapshot(snap)
+
+        self.assertEqual(errors, [])
+        self.assertEqual(migrated["save_version"], SNAPSHOT_VERSION)
+        self.assertEqual(migrated["visited_nodes"], [snap["current_node"]])
+        self.assertEqual(migrated["visited_edges"], [])
+        self.assertEqual(migrated["meta_state"], {"unlocked_items": ["Echo Locket"], "removed_nodes": ["echo_shrine"]})
+        self.assertIn("legacy_items", snap["meta_state"])
+
+    def test_prepare_snapshot_coerces_scalar_legacy_meta_values(self):
+        start_game("Warrior")
+        snap = snapshot_state()
+        snap.pop("save_version")
+        snap["meta_state"] = {"legacy_items": "Echo Locket", "removed_locations": {"echo_shrine": True}}
+
+        migrated, errors = prepare_snapshot(snap)
+
+        self.assertEqual(errors, [])
+        self.assertEqual(migrated["meta_state"], {"unlocked_items": ["Echo Locket"], "removed_nodes": ["echo_shrine"]})
+        load_snapshot(migrated)
+        self.assertIn("Echo Locket", st.session_state.meta_state["unlocked_items"])
+
+    def test_prepare_snapshot_coerces_loosely_typed_legacy_values(self):
+        start_game("Warrior")
+        snap = snapshot_state()
+        snap.pop("save_version")
+        snap["stats"] = {**snap["stats"], "hp": "9", "gold": 4.0, "strength": True}
+        snap["inventory"] = ["Rope", 7, None]
+        snap["event_log"] = ["Started.", 3]
+        snap["decision_history"] = ["legacy entry", {"node": "intro", "choice": "Go"}]
+
+        migrated, errors = prepare_snapshot(snap)
+
+        self.assertEqual(errors, [])
+        self.assertEqual((migrated["stats"]["hp"], migrated["stats"]["gold"], migrated["stats"]["strength"]), (9, 4, 1))
+        self.assertEqual(migrated["inventory"], ["Rope", "7"])
+        self.assertEqual(migrated["event_log"], ["Started.", "3"])
+        self.assertEqual(migrated["decision_history"], [{"node": "intro", "choice": "Go"}])
+
+    def test_prepare_snapshot_rejects_booleans_as_numbers(self):
+        start_game("Warrior")
+        snap = snapshot_state()
+        snap["stats"]["hp"] = True
+
+        migrated, errors = prepare_snapshot(snap)
+
+        self.assertIsNone(migrated)
+        self.assertEqual(errors, ["$.stats.hp: Stat value must be an integer."])
+
+    def test_prepare_snapshot_reports_every_error_with_path(self):
+        start_game("Warrior")
+        snap = snapshot_state()
+        snap["stats"]["hp"] = "full"
+        snap["inventory"] = ["Rope", 7]
+        snap["visited_edges"] = [{"from": "a", "to": 3}]
+
+        migrated, errors = prepare_snapshot(snap)
+
+        self.assertIsNone(migrated)
+        self.assertEqual(
+            [error.split(":")[0] for error in errors],
+            ["$.stats.hp", "$.inventory[1]", "$.visited_edges[0].to"],
+        )
+
+    def test_session_binds_to_its_campaign_and_saves_record_it(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        path = Path(tmp.name) / "act.json"
+        path.write_text(json.dumps({"intro_rogue": {"id": "intro_rogue", "text": "A seasonal night.", "choices": []}}), encoding="utf-8")
+        campaign_registry().register("season", lambda: Campaign("season", [ActSource("act", path)], use_bundles=False))
+        self.addCleanup(campaign_registry().unregister, "season")
+
+        start_game("Rogue", "season")
+        with use_campaign(session_campaign()):
+            self.assertEqual(list(STORY_NODES), ["intro_rogue"])
+        self.assertIn("village_square", STORY_NODES)
+
+        snapshot = snapshot_state()
+        self.assertEqual(snapshot["campaign_id"], "season")
+        snapshot["visited_nodes"] = ["intro_rogue"]
+        self.assertEqual(prepare_snapshot(snapshot)[1], [])
+        snapshot["current_node"] = "village_square"
+        self.assertIn("$.current_node: Current node does not exist in story.", prepare_snapshot(snapshot)[1])
+        snapshot["campaign_id"] = "winter"
+        self.assertIn("$.campaign_id: Campaign is not a registered campaign.", prepare_snapshot(snapshot)[1])
+
+        start_game("Rogue")
+        self.assertIsNone(st.session_state.campaign_id)
+        with self.assertRaises(KeyError):
+            start_game("Rogue", "winter")
+
+    def test_prepare_snapshot_rejects_newer_versions(self):
+        snap = snapshot_state()
+        snap["save_version"] = SNAPSHOT_VERSION + 1
+        migrated, errors = prepare_snapshot(snap)
+        self.assertIsNone(migrated)
+        self.assertIn("newer", errors[0])
+
+
+class MetaStateWriterTests(unittest.TestCase):
+    def setUp(self):
+        self.writes = []
+        self.fail_writes = False
+        # A long delay keeps the timer out of the way; tests flush explicitly.
+        self.writer = _MetaStateWriter(self._write, delay=60)
+
+    def _write(self, meta_state):
+        if self.fail_writes:
+            return None
+        self.writes.append(meta_state)
+        return meta_state
+
+    def tearDown(self):
+        self.writer.flush()
+
+    def test_unchanged_content_is_not_written(self):
+        meta = normalize_meta_state({"unlocked_items": ["Echo Locket"]})
+        self.writer.mark_persisted(meta)
+        self.writer.schedule(normalize_meta_state({"unlocked_items": ["Echo Locket"]}))
+        self.writer.flush()
+        self.assertEqual(self.writes, [])
+
+    def test_changes_are_coalesced_into_one_write(self):
+        for items in (["A"], ["A", "B"], ["A", "B", "C"]):
+            self.writer.schedule(normalize_meta_state({"unlocked_items": items}))
+        self.writer.flush()
+        self.writer.flush()
+        self.assertEqual(self.writes, [{"unlocked_items": ["A", "B", "C"], "removed_nodes": []}])
+
+    def test_content_already_on_disk_is_not_rewritten(self):
+        self.writer.mark_persisted(normalize_meta_state({"unlocked_items": ["A", "B"], "removed_nodes": ["echo_shrine"]}))
+        self.writer.schedule(normalize_meta_state({"unlocked_items": ["B"]}))
+        self.writer.flush()
+        self.assertEqual(self.writes, [])
+
+    def test_pending_changes_from_several_sessions_are_unioned(self):
+        self.writer.schedule(normalize_meta_state({"unlocked_items": ["A"]}))
+        self.writer.schedule(normalize_meta_state({"removed_nodes": ["echo_shrine"]}))
+        self.writer.flush()
+        self.assertEqual(self.writes, [{"unlocked_items": ["A"], "removed_nodes": ["echo_shrine"]}])
+
+
+    def test_failed_write_stays_pending_and_is_retried(self):
+        self.fail_writes = True
+        self.writer.schedule(normalize_meta_state({"unlocked_items": ["A"]}))
+        self.writer.flush()
+        self.assertEqual(self.writes, [])
+
+        self.fail_writes = False
+        self.writer.flush()
+        self.assertEqual(self.writes, [{"unlocked_items": ["A"], "removed_nodes": []}])
+
+    def test_schedule_does_not_wait_for_a_running_write(self):
+        started, release = threading.Event(), threading.Event()
+        self.addCleanup(release.set)
+
+        def slow_write(meta_state):
+            started.set()
+            release.wait(5)
+            return meta_state
+
+        writer = _MetaStateWriter(slow_write, delay=60)
+        writer.schedule(normalize_meta_state({"unlocked_items": ["A"]}))
+        flushing = threading.Thread(target=writer.flush)
+        flushing.start()
+        self.assertTrue(started.wait(5))
+        scheduling = threading.Thread(target=writer.schedule, args=(normalize_meta_state({"unlocked_items": ["B"]}),))
+        scheduling.start()
+        scheduling.join(5)
+        self.assertFalse(scheduling.is_alive())
+        release.set()
+        flushing.join(5)
+        writer.flush()
+
+
+def _unlock_many(path: str, worker: int, count: int) -> None:
+    store = MetaStateStore(Path(path))
+    for index in range(count):
+        store.merge_write({"unlocked_items": [f"item-{worker}-{index}"], "removed_nodes": [f"node-{worker}"]})
+
+
+class MetaStateStoreTests(unittest.TestCase):
+    def test_concurrent_writer_processes_lose_no_unlocks(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "meta_state.json"
+            workers, count = 8, 15
+            processes = [
+                multiprocessing.Process(target=_unlock_many, args=(str(path), worker, count))
+                for worker in range(workers)
+            ]
+            for process in processes:
+                process.start()
+            for process in processes:
+                process.join(timeout=60)
+                self.assertEqual(process.exitcode, 0)
+
+            stored = MetaStateStore(path).read()
+            self.assertEqual(len(stored["unlocked_items"]), workers * count)
+            self.assertEqual(sorted(stored["removed_nodes"]), sorted(f"node-{worker}" for worker in range(workers)))
+
+    def test_merge_write_returns_union_with_disk(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            store = MetaStateStore(Path(tmp) / "meta_state.json")
+            store.merge_write({"unlocked_items": ["A"]})
+            merged = store.merge_write({"unlocked_items": ["B"]})
+            self.assertEqual(merged["unlocked_items"], ["A", "B"])
+            self.assertEqual(store.read(), merged)
+
+
+class MetaFileCacheTests(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.path = Path(self._tmp.name) / "meta_state.json"
+
+    def tearDown(self):
+        _invalidate_meta_file_cache(self.path)
+        self._tmp.cleanup()
+
+    def _write(self, items, *, keep_stat=None):
+        self.path.write_text(json.dumps({"unlocked_items": items}), encoding="utf-8")
+        if keep_stat is not None:
+            os.utime(self.path, ns=(keep_stat.st_atime_ns, keep_stat.st_mtime_ns))
+
+    def test_unchanged_stat_skips_reading(self):
+        self._write(["A"])
+        self.assertEqual(_read_meta_file(self.path)["unlocked_items"], ["A"])
+        # Same size and mtime: the cached parse is trusted without reading.
+        self._write(["B"], keep_stat=self.path.stat())
+        self.assertEqual(_read_meta_file(self.path)["unlocked_items"], ["A"])
+
+        _invalidate_meta_file_cache(self.path)
+        self.assertEqual(_read_meta_file(self.path)["unlocked_items"], ["B"])
+
+    def test_changed_file_is_reread(self):
+        self._write(["A"])
+        _read_meta_file(self.path)
+        self._write(["A", "Longer item"])
+        self.assertEqual(_read_meta_file(self.path)["unlocked_items"], ["A", "Longer item"])
+
+    def test_missing_file_returns_none(self):
+        self.assertIsNone(_read_meta_file(self.path))
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -1,7 +1,17 @@
 import unittest
+from concurrent.futures import wait
 
+from game import logic
+from game.data import STORY_NODES
+from game.engine.state import state_from_session
+from game.logic import execute_choice, get_node_choice_evaluations, get_shared_choice_eval_cache_stats
+from game.state import ensure_session_state, reset_game_state, start_game
+from game.streamlit_compat import st
 from game.ui import format_requirement_tooltip, should_force_injury_redirect
+from game.ui_components import node_presentation
+from game.ui_components.node_presentation import get_fragment_cache_stats, narrative_fragment
 from game.ui_components.path_map import _escape_svg_text
+from game.ui_components.prefetch import prefetch_destinations
 from game.ui_components.sprites import sprite_svg
 
 
@@ -63,5 +73,38 @@ class UiLogicTests(unittest.TestCase):
         self.assertIn("&lt;script&gt;alert(&quot;x&quot;)&lt;/script&gt;", svg)
 
 
+class PrefetchTests(unittest.TestCase):
+    def setUp(self):
+        ensure_session_state()
+        reset_game_state()
+        start_game("Warrior")
+        # Start cold, so results can only come from this test's prefetch.
+        logic._SHARED_CHOICE_EVAL_CACHE.clear()
+        logic._choice_eval_cache().clear()
+        node_presentation._FRAGMENTS.clear()
+
+    def test_prefetched_destination_is_served_from_the_caches(self):
+        node_id = st.session_state.current_node
+        entries = [entry for entry in get_node_choice_evaluations(node_id, STORY_NODES[node_id]) if entry["is_available"]]
+        futures = prefetch_destinations(entries)
+        # Choices predicted to reach the same cached content are queued once.
+        self.assertLess(len(futures), len(entries))
+        wait(futures)
+        self.assertTrue(all(future.result() for future in futures))
+        # Everything is cached now, so a rerun queues nothing.
+        self.assertEqual(prefetch_destinations(entries), [])
+
+        entry = entries[-1]
+        execute_choice(node_id, entry["choice"]["label"], entry["choice"], entry["choice_id"])
+        next_id = st.session_state.current_node
+        self.assertEqual(next_id, entry["resolved_next"])
+        evaluation_hits = get_shared_choice_eval_cache_stats().hits
+        fragment_hits = get_fragment_cache_stats().hits
+        get_node_choice_evaluations(next_id, STORY_NODES[next_id])
+        narrative_fragment(next_id, STORY_NODES[next_id], state_from_session(st.session_state))
+        self.assertEqual(get_shared_choice_eval_cache_stats().hits, evaluation_hits + 1)
+        self.assertEqual(get_fragment_cache_stats().hits, fragment_hits + 1)
+
+
 if __name__ == "__main__":
     unittest.main()